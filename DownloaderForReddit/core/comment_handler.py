@@ -42,43 +42,52 @@ class CommentHandler(Runner):
 
     @verify_run
     def extract_comments(self, session):
+        """
+        Stores the submission's comment forest one level at a time.  Every comment at a level is stored with a single
+        bulk insert, and the ids of the stored comments are kept in memory as the parent ids of the next level.
+        """
         self.submission.comment_sort = self.sort_order
         self.submission.comment_limit = self.significant_ro.comment_limit
         self.submission.comments.replace_more(limit=0)
-        for praw_comment in self.submission.comments:
-            comment_id = self.handle_found_comment(praw_comment, session)
-            if comment_id is not None:
-                self.working_comments[praw_comment] = comment_id
-        while len(self.working_comments) > 0:
+        found_comments = [(praw_comment, None) for praw_comment in self.submission.comments]
+        self.working_comments = self.handle_found_comments(found_comments, session) or {}
+        while len(self.working_comments) > 0 and self.continue_run:
             self.cascade_comments(session)
 
     @verify_run
     def cascade_comments(self, session):
         self.depth += 1
         if self.depth < self.significant_ro.comment_depth:
-            next_level_comments = {}
+            found_comments = []
             for praw_comment, comment_id in self.working_comments.items():
                 praw_comment.reply_sort = self.sort_order
                 # TODO: try adding replace more here
                 praw_comment.replies.replace_more(limit=0)
                 for reply in praw_comment.replies[: self.significant_ro.comment_reply_limit]:
-                    reply_id = self.handle_found_comment(reply, session, comment_id)
-                    if reply_id is not None:
-                        next_level_comments[reply] = reply_id
-            self.working_comments = next_level_comments
+                    found_comments.append((reply, comment_id))
+            self.working_comments = self.handle_found_comments(found_comments, session) or {}
         else:
             self.working_comments.clear()
 
     @verify_run
-    def handle_found_comment(self, praw_comment, session, parent_id=None):
-        if self.comment_filter.filter_extraction(praw_comment, self.significant_ro) and \
-                self.comment_filter.filter_score_limit(praw_comment, self.significant_ro):
-            comment = SubmittableCreator.create_comment(praw_comment, self.post, session, self.download_session_id,
-                                                        parent_comment_id=parent_id)
-            if comment is not None:
-                if self.comment_filter.filter_download(praw_comment, self.significant_ro):
-                    self.comments_to_download.append(comment)
-                if self.comment_filter.filter_content_download(praw_comment, self.significant_ro):
-                    self.comments_to_extract_links.append(comment)
-                return comment.id
-        return None
+    def handle_found_comments(self, found_comments, session):
+        """
+        Filters and stores the supplied comments.
+        :param found_comments: Tuples of praw comments and the database ids of their parent comments.
+        :param session: The session that the comments are stored with.
+        :return: A dict of the praw comments that were stored mapped to their database ids.
+        """
+        accepted = [(praw_comment, parent_id) for praw_comment, parent_id in found_comments
+                    if self.comment_filter.filter_extraction(praw_comment, self.significant_ro) and
+                    self.comment_filter.filter_score_limit(praw_comment, self.significant_ro)]
+        if not accepted:
+            return {}
+        stored = {}
+        for praw_comment, comment in SubmittableCreator.create_comments(accepted, self.post, session,
+                                                                        self.download_session_id):
+            if self.comment_filter.filter_download(praw_comment, self.significant_ro):
+                self.comments_to_download.append(comment)
+            if self.comment_filter.filter_content_download(praw_comment, self.significant_ro):
+                self.comments_to_extract_links.append(comment)
+            stored[praw_comment] = comment.id
+        return stored
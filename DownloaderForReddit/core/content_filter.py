@@ -1,8 +1,6 @@
-from sqlalchemy.orm.exc import MultipleResultsFound
-
 from . import const
 from ..database.models import Content
-from ..utils import injector
+from ..utils import injector, url_utils
 
 
 class ContentFilter:
@@ -25,14 +23,11 @@ class ContentFilter:
         return dup_passes and vid_passes and ext_passes
 
     def filter_duplicate(self, post, url):
-        try:
-            if post.significant_reddit_object.avoid_duplicates:
-                session = post.get_session()
-                return session.query(Content.id).filter(Content.url == url).scalar() is None
-            else:
+        if post.significant_reddit_object.avoid_duplicates:
+            if not injector.get_seen_filter().might_contain_content_url(url_utils.url_hash(url)):
                 return True
-        except MultipleResultsFound:
-            return False
+            return not Content.url_exists(url, post.get_session())
+        return True
 
     def filter_reddit_video(self, post):
         return self.settings_manager.download_reddit_hosted_videos or post.domain != 'v.redd.it'
@@ -1,3 +1,20 @@
-# A dict comprised of they key value being a content's id, and the value being a dict of header information that needs
-# to be sent with the download request in order to get a successful response.
+from urllib.parse import urlsplit
+from typing import Optional
+
+# A dict comprised of they key value being a host name, and the value being a dict of header information that needs
+# to be sent with download requests to that host and its sub-domains in order to get a successful response.
 HEADERS = {}
+
+
+def get_headers(url: str) -> Optional[dict]:
+    """
+    Returns the headers in the HEADERS dict for the host of the supplied url, or for the closest parent domain of that
+    host that has an entry, or None if there are none.
+    """
+    host = urlsplit(url).hostname
+    while host:
+        headers = HEADERS.get(host)
+        if headers is not None:
+            return headers
+        host = host.partition('.')[2]
+    return None
@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import aiohttp
+
+from .downloader import Downloader
+from .partial_download import PartialDownload, get_total_size
+from .download_job import DownloadJob
+from DownloaderForReddit.utils import system_util
+
+
+class AsyncDownloader(Downloader):
+
+    """
+    A download engine that drives every in-flight download from a single asyncio event loop instead of dedicating an
+    OS thread to each file.  This allows many more downloads to be active at once, which is useful when a download
+    session is bound by network latency rather than bandwidth.  The queue protocol and the content bookkeeping are the
+    same as those of the thread pool based Downloader.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, download_queue, download_session_id, stop_run):
+        super().__init__(download_queue, download_session_id, stop_run)
+        self.concurrency = self.get_concurrency()
+        self.loop = None
+        self.http_session = None
+        self.semaphore = None
+        # blocking work (reading the download queue, multi-part downloads, and file and database work) is handed off
+        # to these threads so that it does not stall the event loop
+        self.queue_executor = None
+        self.blocking_executor = None
+
+    def get_concurrency(self) -> int:
+        concurrency = self.settings_manager.async_download_concurrency
+        if not isinstance(concurrency, int) or concurrency < 1:
+            return 100
+        return concurrency
+
+    @property
+    def max_in_flight(self) -> int:
+        return self.get_concurrency()
+
+    def run(self):
+        """
+        Creates an event loop for this thread and runs the download loop on it until the download queue signals that
+        the session is finished.
+        """
+        self.logger.debug('Async downloader running')
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self.run_async())
+        finally:
+            self.loop.close()
+        self.logger.debug('Async downloader exiting')
+
+    def make_executor(self) -> None:
+        self.queue_executor = ThreadPoolExecutor(1)
+        self.blocking_executor = ThreadPoolExecutor(self.thread_count)
+        self.range_pool = self.make_range_pool()
+
+    async def run_async(self):
+        """
+        Removes content ids from the download queue and hands them to the host scheduler, which releases them as
+        download tasks as their hosts have capacity.  The number of downloads that are active at any one time is
+        limited by the async download concurrency setting.
+        """
+        self.make_executor()
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_event_loop()
+        async with self.make_client_session() as http_session:
+            self.http_session = http_session
+            while self.continue_run:
+                item = await loop.run_in_executor(self.queue_executor, self.get_next_item, self.get_queue_timeout())
+                if item is not None:
+                    if item == 'HOLD':
+                        self.hold = True
+                    elif item == 'RELEASE_HOLD':
+                        self.hold = False
+                    elif item != 'EMPTY':
+                        self.schedule(item)
+                    if self.should_resolve_jobs():
+                        await loop.run_in_executor(self.queue_executor, self.resolve_jobs)
+                    self.dispatch()
+                else:
+                    break
+            await loop.run_in_executor(self.queue_executor, self.resolve_jobs)
+            while self.continue_run and (self.scheduler.pending_count > 0 or self.futures):
+                self.dispatch()
+                await asyncio.sleep(min(self.scheduler.time_until_ready() or 0.1, 0.5))
+            if self.futures:
+                await asyncio.gather(*self.futures, return_exceptions=True)
+        self.queue_executor.shutdown(wait=False)
+        self.blocking_executor.shutdown(wait=True)
+        self.range_pool.shutdown(cancel_pending=not self.continue_run)
+        self.status_writer.close()
+
+    async def run_blocking(self, function, *args):
+        """
+        Runs the supplied blocking function on the blocking executor and waits for its result without stalling the
+        event loop, so that file and database work for one download does not hold up the socket reads of the others.
+        """
+        return await asyncio.get_event_loop().run_in_executor(self.blocking_executor, function, *args)
+
+    def submit_download(self, job: DownloadJob):
+        return self.loop.create_task(self.download_async(self.http_session, job))
+
+    def make_client_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=10)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def download_async(self, http_session: aiohttp.ClientSession, job: DownloadJob):
+        """
+        Connects to the job's url and streams the content to the job's file path.
+        :param http_session: The aiohttp session that is shared by every download made by this downloader.
+        :param job: The download job for the content item that is to be downloaded.
+        """
+        async with self.semaphore:
+            if not self.continue_run:
+                self.release_path(job.file_path)
+                return
+            try:
+                partial = await self.run_blocking(PartialDownload.load, job.file_path, job.url)
+                headers = self.get_request_headers(job, partial)
+                async with http_session.get(job.url, headers=headers) as response:
+                    await self.handle_async_response(job, response, partial)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError, ConnectionError):
+                self.handle_connection_error(job)
+            except:
+                self.handle_unknown_error(job)
+            finally:
+                self.release_path(job.file_path)
+
+    async def handle_async_response(self, job: DownloadJob, response: aiohttp.ClientResponse,
+                                    partial: Optional[PartialDownload] = None) -> None:
+        """
+        Routes the response received for the supplied job to the appropriate download method.  This mirrors the
+        Downloader's handle_response method for responses returned by the async client.
+        """
+        resuming = response.status == 206 and partial is not None
+        if response.status == 200 or resuming:
+            file_size = get_total_size(response.status, response.headers)
+            if file_size <= system_util.KB:
+                # If the file size is less than one KB, it is a strong indicator that the content has been deleted and
+                # what we are about to download is only a placeholder image.  So we abort download
+                self.handle_deleted_content_error(job)
+                return
+            if partial is None:
+                partial = PartialDownload(job.file_path, job.url)
+            await self.run_blocking(partial.start, response.headers, resuming)
+            if self.should_resume_multi_part(partial, resuming) or self.should_use_multi_part(file_size):
+                # the multi-part downloader is thread based, so it is run outside of the event loop
+                await self.run_blocking(self.download_with_multipart, job, file_size, partial)
+            else:
+                md5_hash = await self.stream_to_file(response, job.use_hash, partial)
+                await self.run_blocking(self.finish_download, job, md5_hash)
+        else:
+            if partial is not None and response.status == 416:
+                await self.run_blocking(partial.discard)
+            if response.status == 429:
+                self.throttle_host(job, response.headers)
+            self.handle_unsuccessful_response(job, response.status)
+
+    async def stream_to_file(self, response: aiohttp.ClientResponse, use_hash: bool,
+                             partial: PartialDownload) -> Optional[str]:
+        """
+        Writes the body of the supplied response to the partial file as it is received, calculating the md5 hash of the
+        file along the way if the content's significant reddit object calls for it.  The partial file is moved to its
+        final file path once complete, or kept to be resumed if the download is stopped.
+        :return: The md5 hash of the file if it was hashed, otherwise None.
+        """
+        md5 = hashlib.md5() if use_hash else None
+        if md5 is not None and partial.offset > 0:
+            await self.run_blocking(partial.hash_existing, md5)
+        file = await self.run_blocking(partial.open)
+        try:
+            async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                if self.hard_stop:
+                    break
+                # each chunk is written before the next is read, so the writes of one file stay in order
+                await self.run_blocking(self.write_chunk, file, md5, chunk)
+                partial.offset += len(chunk)
+        finally:
+            await self.run_blocking(file.close)
+        if not self.hard_stop:
+            await self.run_blocking(partial.complete)
+        else:
+            await self.run_blocking(partial.save)
+        if md5 is not None:
+            return md5.hexdigest()
+        return None
+
+    @staticmethod
+    def write_chunk(file, md5, chunk: bytes) -> None:
+        if md5 is not None:
+            md5.update(chunk)
+        file.write(chunk)
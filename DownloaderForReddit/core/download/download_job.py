@@ -0,0 +1,72 @@
+from collections import namedtuple
+from typing import Optional
+
+from sqlalchemy.orm import joinedload
+
+from DownloaderForReddit.database.models import Content, Post
+
+
+_DownloadJobBase = namedtuple(
+    'DownloadJobBase',
+    'content_id url download_title file_path headers use_hash modified_time title post_title submission_id user_name '
+    'subreddit_name'
+)
+
+
+class DownloadJob(_DownloadJobBase):
+
+    """
+    An immutable snapshot of everything that is needed to download a single content item.  Jobs are built from the
+    database in batches before any downloads are started so that no database session needs to be held open while a
+    file is being downloaded.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_content(cls, content: Content, download_title: str, headers: Optional[dict], use_hash: bool,
+                     match_date_modified: bool) -> 'DownloadJob':
+        """
+        Creates a job for the supplied content.
+        :param content: The content item that is to be downloaded.  The content's post, user, and subreddit should be
+                        loaded along with it.
+        :param download_title: The title that the content's file will be saved under.
+        :param headers: Any headers that the content's host requires to be sent with the download request.
+        :param use_hash: True if the content's file should be hashed for duplicate detection.
+        :param match_date_modified: True if the file's modified date should be set to the date of the content's post.
+        """
+        post = content.post
+        modified_time = None
+        if match_date_modified and post is not None and post.date_posted is not None:
+            modified_time = post.date_posted.timestamp()
+        return cls(
+            content_id=content.id,
+            url=content.url,
+            download_title=download_title,
+            file_path=content.get_full_file_path(download_title),
+            headers=headers,
+            use_hash=use_hash,
+            modified_time=modified_time,
+            title=content.title,
+            post_title=post.title if post is not None else None,
+            submission_id=post.reddit_id if post is not None else None,
+            user_name=content.user.name if content.user is not None else None,
+            subreddit_name=content.subreddit.name if content.subreddit is not None else None,
+        )
+
+
+def query_job_content(session, content_ids: list) -> list:
+    """
+    Loads the content items with the supplied ids, along with every relationship that is needed to build their download
+    jobs, in a single query.  The content is returned in the same order as the supplied ids.
+    """
+    contents = session.query(Content) \
+        .options(
+            joinedload(Content.post).joinedload(Post.significant_reddit_object),
+            joinedload(Content.user),
+            joinedload(Content.subreddit)
+        ) \
+        .filter(Content.id.in_(content_ids)) \
+        .all()
+    order = {content_id: index for index, content_id in enumerate(content_ids)}
+    return sorted(contents, key=lambda x: order[x.id])
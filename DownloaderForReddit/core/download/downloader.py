@@ -1,11 +1,19 @@
 import hashlib
 import logging
+import time
 from concurrent.futures import ThreadPoolExecutor
+from queue import Empty
+from threading import RLock
+from typing import Optional
 import requests
 
 from DownloaderForReddit.core.runner import Runner, verify_run
-from .multipart_downloader import MultipartDownloader
-from . import HEADERS
+from .multipart_downloader import MultipartDownloader, RangeFetchPool
+from .host_scheduler import HostScheduler
+from .partial_download import PartialDownload, get_total_size
+from .download_job import DownloadJob, query_job_content
+from .status_writer import DownloadStatusWriter
+from . import get_headers, session_pool
 from DownloaderForReddit.core.errors import Error
 from DownloaderForReddit.utils import injector, system_util, general_utils
 from DownloaderForReddit.database import Content
@@ -17,8 +25,15 @@ class Downloader(Runner):
 
     """
     The class that is responsible for the actual downloading of content.
+
+    Content ids taken from the download queue are resolved into immutable download jobs in batches, using one short
+    database session per batch.  The downloads themselves never touch the database; their results are handed to a
+    status writer, which passes them to the persistence queue to be written in batches from a single thread.
     """
 
+    # the most content ids that are resolved into download jobs with a single query
+    JOB_BATCH_SIZE = 100
+
     def __init__(self, download_queue, download_session_id, stop_run):
         """
         Initializes the Downloader class.
@@ -35,8 +50,15 @@ class Downloader(Runner):
 
         self.thread_count = self.settings_manager.download_thread_count
         self.executor = None
-        self.multi_part_executor = ThreadPoolExecutor(8)
+        self.range_pool = None
         self.futures = []
+        self.scheduler = self.make_scheduler()
+        self.status_writer = DownloadStatusWriter(download_session_id)
+        self.unresolved = []
+        # the file paths claimed by jobs that have been resolved but have not yet finished downloading
+        self.reserved_paths = set()
+        self.path_lock = RLock()
+        self.dispatch_lock = RLock()
         self.hold = False
         self.hard_stop = False
         self.download_count = 0
@@ -45,186 +67,410 @@ class Downloader(Runner):
     @property
     def running(self):
         if self.hold:
-            return len(self.futures) > 0
+            return len(self.futures) > 0 or self.scheduler.pending_count > 0 or len(self.unresolved) > 0
         return True
 
+    @property
+    def max_in_flight(self) -> int:
+        """The number of downloads that may be active at one time."""
+        return self.thread_count
+
+    def make_scheduler(self) -> HostScheduler:
+        """
+        Creates the scheduler that orders queued content by host so that hosts which are at their concurrency or rate
+        limit do not hold up downloads from other hosts.
+        """
+        settings = self.settings_manager
+        default_limit = settings.download_host_default_limit
+        if not isinstance(default_limit, int) or default_limit < 1:
+            default_limit = self.max_in_flight
+        host_limits = settings.download_host_limits
+        host_rates = settings.download_host_rate_limits
+        return HostScheduler(
+            default_limit,
+            host_limits=host_limits if isinstance(host_limits, dict) else None,
+            host_rates=host_rates if isinstance(host_rates, dict) else None
+        )
+
     def run(self):
         """
-        Removes content from the queue and sends it to the thread pool executor for download until it is told to stop.
+        Removes content from the queue and hands it to the host scheduler, which releases it to the thread pool
+        executor for download as the content's host has capacity, until it is told to stop.
         """
         self.logger.debug('Downloader running')
         self.make_executor()
         while self.continue_run:
-            item = self.download_queue.get()
+            item = self.get_next_item(self.get_queue_timeout())
             if item is not None:
                 if item == 'HOLD':
                     self.hold = True
                 elif item == 'RELEASE_HOLD':
                     self.hold = False
-                else:
-                    future = self.executor.submit(self.download, content_id=item)
-                    future.add_done_callback(self.remove_future)
-                    self.futures.append(future)
+                elif item != 'EMPTY':
+                    self.schedule(item)
+                if self.should_resolve_jobs():
+                    self.resolve_jobs()
+                self.dispatch()
             else:
                 break
+        self.resolve_jobs()
+        self.drain_scheduler()
         self.executor.shutdown(wait=True)
-        HEADERS.clear()
+        self.range_pool.shutdown(cancel_pending=not self.continue_run)
+        self.status_writer.close()
         self.logger.debug('Downloader exiting')
 
     def make_executor(self) -> None:
         """
         Initializes a thread pool executor with the number of threads defined by the
-        `thread_count` attribute in the settings manager.
+        `thread_count` attribute in the settings manager, and the range fetch pool that is shared by every multi-part
+        download made during the session.
         """
         self.executor = ThreadPoolExecutor(self.thread_count)
+        self.range_pool = self.make_range_pool()
+
+    def make_range_pool(self) -> RangeFetchPool:
+        thread_count = self.settings_manager.multi_part_thread_count
+        if not isinstance(thread_count, int) or thread_count < 1:
+            thread_count = 4
+        return RangeFetchPool(thread_count)
+
+    def get_next_item(self, timeout: Optional[float] = None):
+        """
+        Returns the next item from the download queue.  If the timeout expires before an item is available, 'EMPTY' is
+        returned so that the scheduler can be checked for hosts that have come off of their rate limit.
+        """
+        try:
+            return self.download_queue.get(timeout=timeout)
+        except Empty:
+            return 'EMPTY'
+
+    def get_queue_timeout(self) -> Optional[float]:
+        """
+        Returns how long the download queue should be waited on before checking the scheduler again.  The queue is only
+        waited on indefinitely when the scheduler has no pending work.  Otherwise the wait is limited so that hosts
+        coming off of their rate limit are not left waiting for the next item to be queued.
+        """
+        if self.scheduler.pending_count == 0:
+            return None
+        wait = self.scheduler.time_until_ready()
+        if wait is None:
+            wait = 1.0
+        return min(max(wait, 0.05), 1.0)
+
+    def schedule(self, content_id: int) -> None:
+        """Holds the supplied content id until it is resolved into a download job along with the rest of its batch."""
+        self.unresolved.append(content_id)
+
+    def should_resolve_jobs(self) -> bool:
+        """
+        Content ids are resolved once a full batch has been collected, or as soon as the download queue has been
+        emptied so that content is never left waiting on more content to be queued.
+        """
+        if not self.unresolved:
+            return False
+        return len(self.unresolved) >= self.JOB_BATCH_SIZE or self.download_queue.empty()
+
+    def resolve_jobs(self) -> None:
+        """
+        Loads the content for every held content id in one query, creates a download job for each, and hands the jobs
+        to the host scheduler.  This is the only point at which the downloader reads content from the database.
+        """
+        if not self.unresolved:
+            return
+        content_ids = self.unresolved
+        self.unresolved = []
+        with self.db.get_scoped_session() as session:
+            for content in query_job_content(session, content_ids):
+                try:
+                    job = self.make_job(content)
+                    self.scheduler.add(job, job.url)
+                except:
+                    self.logger.error('Failed to create download job', extra={'content_id': content.id},
+                                      exc_info=True)
+
+    def make_job(self, content: Content) -> DownloadJob:
+        with self.path_lock:
+            download_title = general_utils.ensure_content_download_path(content, reserved_paths=self.reserved_paths)
+            file_path = content.get_full_file_path(download_title)
+            self.reserved_paths.add(file_path)
+        return DownloadJob.from_content(
+            content,
+            download_title=download_title,
+            headers=self.check_headers(content),
+            use_hash=self.should_use_hash(content),
+            match_date_modified=self.settings_manager.match_file_modified_to_post_date
+        )
+
+    def release_path(self, file_path: str) -> None:
+        with self.path_lock:
+            self.reserved_paths.discard(file_path)
+
+    def dispatch(self) -> None:
+        """
+        Starts downloads for as many scheduled content items as there is capacity for.  Called by the run loop and by
+        each download as it finishes, so it is locked to keep the capacity accounting correct.  The lock is re-entrant
+        because a download that has already finished runs its done callback as soon as the callback is added.
+        """
+        with self.dispatch_lock:
+            while self.continue_run and len(self.futures) < self.max_in_flight:
+                ready = self.scheduler.pop_ready()
+                if ready is None:
+                    break
+                job, host = ready
+                future = self.submit_download(job)
+                self.futures.append(future)
+                future.add_done_callback(lambda f, h=host: self.finish_future(f, h))
+
+    def submit_download(self, job: DownloadJob):
+        return self.executor.submit(self.download, job=job)
+
+    def finish_future(self, future, host: str) -> None:
+        self.remove_future(future)
+        self.scheduler.release(host)
+        self.dispatch()
+
+    def drain_scheduler(self) -> None:
+        """
+        Waits for the content that is still held by the scheduler to be dispatched once the download queue has been
+        closed.  Content that is still pending when the run is stopped is not downloaded.
+        """
+        while self.continue_run and self.scheduler.pending_count > 0:
+            self.dispatch()
+            time.sleep(min(self.scheduler.time_until_ready() or 0.1, 0.5))
 
     def remove_future(self, future):
         self.futures.remove(future)
 
     @verify_run
-    def download(self, content_id: int):
+    def download(self, job: DownloadJob):
         """
-        Connects to the content url and downloads the content item to the file path specified by the content item.
-        :param content_id: The id of the content item which is to be queried from the database, then downloaded.
+        Connects to the job's url and downloads the content to the job's file path.  If a previous attempt to download
+        the content was interrupted, the download is resumed from where it left off.
+        :param job: The download job for the content item that is to be downloaded.
         """
         try:
-            with self.db.get_scoped_session() as session:
-                content = session.query(Content).get(content_id)
-                content.download_title = general_utils.ensure_content_download_path(content)
-                response = requests.get(content.url, stream=True, timeout=10, headers=self.check_headers(content))
-                if response.status_code == 200:
-                    file_size = int(response.headers['Content-Length'])
-                    if file_size <= system_util.KB:
-                        # If the file size is less than one KB, it is a strong indicator that the content has been
-                        # deleted and what we are about to download is only a placeholder image.  So we abort download
-                        self.handle_deleted_content_error(content)
-                        return
-                    if self.should_use_multi_part(file_size):
-                        self.download_with_multipart(content, content.get_full_file_path(), file_size)
-                    else:
-                        if self.should_use_hash(content):
-                            self.download_with_hash(content, response)
-                        else:
-                            self.download_without_hash(content, response)
-                        self.finish_download(content)
-                else:
-                    self.handle_unsuccessful_response(content, response.status_code)
+            partial = PartialDownload.load(job.file_path, job.url)
+            headers = self.get_request_headers(job, partial)
+            response = session_pool.get(job.url, stream=True, timeout=10, headers=headers)
+            # the response is closed so that its connection is released back to the host's pool even when the body is
+            # not consumed (multi-part downloads, deleted content, unsuccessful responses)
+            with response:
+                self.handle_response(job, response, partial)
         except ConnectionError:
-            self.handle_connection_error(content)
+            self.handle_connection_error(job)
         except:
-            self.handle_unknown_error(content)
+            self.handle_unknown_error(job)
+        finally:
+            self.release_path(job.file_path)
+
+    def get_request_headers(self, job: DownloadJob, partial: Optional[PartialDownload]) -> Optional[dict]:
+        """
+        Combines the headers that the content's host requires with the range headers needed to resume a partial
+        download if there is one.
+        """
+        headers = job.headers
+        if partial is not None:
+            headers = {**(headers or {}), **partial.get_range_headers()}
+        return headers
+
+    def handle_response(self, job: DownloadJob, response: requests.Response,
+                        partial: Optional[PartialDownload] = None) -> None:
+        """
+        Routes the response received for the supplied job to the appropriate download method based on the response's
+        status and the size of the file being downloaded.
+        :param job: The download job for the content that is being downloaded.
+        :param response: The streaming response returned from the content's url.
+        :param partial: The partial download that is being resumed, if there is one.
+        """
+        resuming = response.status_code == 206 and partial is not None
+        if response.status_code == 200 or resuming:
+            file_size = get_total_size(response.status_code, response.headers)
+            if file_size <= system_util.KB:
+                # If the file size is less than one KB, it is a strong indicator that the content has been
+                # deleted and what we are about to download is only a placeholder image.  So we abort download
+                self.handle_deleted_content_error(job)
+                return
+            if partial is None:
+                partial = PartialDownload(job.file_path, job.url)
+            partial.start(response.headers, resuming)
+            if self.should_resume_multi_part(partial, resuming) or self.should_use_multi_part(file_size):
+                self.download_with_multipart(job, file_size, partial)
+            else:
+                if job.use_hash:
+                    md5_hash = self.download_with_hash(job, response, partial)
+                else:
+                    md5_hash = self.download_without_hash(job, response, partial)
+                self.finish_download(job, md5_hash)
+        else:
+            if partial is not None and response.status_code == 416:
+                # the requested range is no longer valid for the file on the server, so the next attempt starts over
+                partial.discard()
+            if response.status_code == 429:
+                self.throttle_host(job, response.headers)
+            self.handle_unsuccessful_response(job, response.status_code)
+
+    def throttle_host(self, job: DownloadJob, headers) -> None:
+        """
+        Pauses new downloads from the content's host after the host has responded that too many requests are being
+        made.  The pause lasts as long as the host requests in its Retry-After header, or a short default otherwise.
+        """
+        try:
+            delay = float(headers.get('Retry-After', 10))
+        except (TypeError, ValueError):
+            delay = 10
+        self.scheduler.throttle(self.scheduler.get_host(job.url), delay)
 
     def check_headers(self, content):
         """
         This is a helper method to add a necessary header entry for erome downloads.  It is just a patch for a problem
         at the moment.  This can be expanded as further need arises, or replaced by a different better system.
 
-        Checks the HEADER dict for the supplied content's id and, if found, returns the associated header data that will
-        be necessary for the request to be successful.
+        Checks the HEADER dict for the host of the supplied content's url and, if found, returns the associated header
+        data that will be necessary for the request to be successful.
         :param content: The content object that is in the process of being downloaded.
         :return: A dict to be used as a request header where applicable, None if there is no applicable header.
         """
         if 'erome' in content.url:
             return {"Referer": "https://www.erome.com/"}
-        return HEADERS.get(content.id, None)
+        return get_headers(content.url)
 
     def should_use_multi_part(self, file_size: int) -> bool:
         settings = self.settings_manager
         return settings.use_multi_part_downloader and file_size > settings.multi_part_threshold
 
-    def download_with_multipart(self, content: Content, file_path: str, file_size: int) -> None:
-        multi_part_downloader = MultipartDownloader(self.stop_run)
-        multi_part_downloader.run(content, file_path, file_size)
-        self.finish_multi_part_download(content, multi_part_downloader)
+    @staticmethod
+    def should_resume_multi_part(partial: PartialDownload, resuming: bool) -> bool:
+        """
+        A partial file that was written in multiple parts has gaps in it, so it can only be finished by another
+        multi-part download, whatever the current multi-part settings are.
+        """
+        return resuming and partial.multipart
+
+    def download_with_multipart(self, job: DownloadJob, file_size: int, partial: PartialDownload) -> None:
+        """
+        Downloads the file in multiple parts into the supplied partial download.  If the partial download holds bytes
+        from an earlier attempt, only the bytes that are missing are downloaded.
+        """
+        multi_part_downloader = MultipartDownloader(self.stop_run, self.range_pool)
+        multi_part_downloader.run(job, partial, file_size)
+        self.finish_multi_part_download(job, multi_part_downloader)
 
     def should_use_hash(self, content: Content) -> bool:
         sig_ro = content.post.significant_reddit_object
         return sig_ro.hash_duplicates
 
-    def download_with_hash(self, content: Content, response: requests.Response) -> None:
-        file_path = content.get_full_file_path()
+    def download_with_hash(self, job: DownloadJob, response: requests.Response,
+                           partial: Optional[PartialDownload] = None) -> str:
+        """
+        Downloads the response body to the job's file path.
+        :return: The md5 hash of the downloaded file.
+        """
         md5 = hashlib.md5()
-        with open(file_path, 'wb') as file:
-            for chunk in response.iter_content(1024 * 1024):
-                if not self.hard_stop:
-                    md5.update(chunk)
-                    file.write(chunk)
-                else:
-                    break
-        content.md5_hash = md5.hexdigest()
+        self.write_response(job, response, partial, md5)
+        return md5.hexdigest()
 
-    def download_without_hash(self, content: Content, response: requests.Response) -> None:
-        file_path = content.get_full_file_path()
-        with open(file_path, 'wb') as file:
+    def download_without_hash(self, job: DownloadJob, response: requests.Response,
+                              partial: Optional[PartialDownload] = None) -> None:
+        self.write_response(job, response, partial)
+
+    def write_response(self, job: DownloadJob, response: requests.Response, partial: Optional[PartialDownload],
+                       md5=None) -> None:
+        """
+        Streams the response body into the job's partial file, then moves the partial file to the job's file path once
+        the download is complete.  If the download is stopped before it is complete, the partial file is kept so that
+        the download can be resumed.
+        :param md5: An optional md5 hash object that is updated with the full contents of the file, including any
+                    part of the file that was downloaded by a previous attempt.
+        """
+        if partial is None:
+            partial = PartialDownload(job.file_path, job.url)
+        if md5 is not None and partial.offset > 0:
+            partial.hash_existing(md5)
+        with partial.open() as file:
             for chunk in response.iter_content(1024 * 1024):
                 if not self.hard_stop:
+                    if md5 is not None:
+                        md5.update(chunk)
                     file.write(chunk)
+                    partial.offset += len(chunk)
                 else:
                     break
+        if not self.hard_stop:
+            partial.complete()
+        else:
+            partial.save()
 
-    def finish_download(self, content: Content) -> None:
+    def finish_download(self, job: DownloadJob, md5_hash: Optional[str] = None) -> None:
         """
-        Finalizes the download process for a given content item. The method updates the content's status, manages
-        duplicate detection, sets file modification times, and adjusts the download count. It also provides optional
-        debugging messages indicating the download's result. If the download process was interrupted by a hard stop, it
-        handles the error and logs it accordingly.
+        Finalizes the download process for a given job. The method reports the content's status to the status writer,
+        manages duplicate detection, sets file modification times, and adjusts the download count. It also provides
+        optional debugging messages indicating the download's result. If the download process was interrupted by a hard
+        stop, it handles the error and logs it accordingly.
 
-        :param content: An object representing the content being downloaded.
+        :param job: The download job for the content that was downloaded.
+        :param md5_hash: The md5 hash of the downloaded file, if the file was hashed.
         """
         if not self.hard_stop:
-            if content.md5_hash is not None and self.is_duplicate_content(content):
-                self.handle_duplicate_content(content)
+            if md5_hash is not None and self.is_duplicate_content(md5_hash):
+                self.handle_duplicate_content(job)
                 return
-            self.handle_date_modified(content)
-            content.set_downloaded(self.download_session_id)
+            self.handle_date_modified(job)
+            self.status_writer.set_downloaded(job, md5_hash)
             self.download_count += 1
-            self.output_downloaded_message(content)
+            self.output_downloaded_message(job)
         else:
-            self.handle_download_stopped(content)
+            self.handle_download_stopped(job)
 
-    def is_duplicate_content(self, content: Content) -> bool:
+    def is_duplicate_content(self, md5_hash: str) -> bool:
         """
-        Checks if the given content's MD5 hash already exists in the database indicating a duplicate download.
+        Checks if the supplied MD5 hash already exists in the database, or belongs to a download whose result has not
+        yet been written, indicating a duplicate download.
 
-        :param content: A content object with an MD5 hash to check against the database.
+        :param md5_hash: The MD5 hash of the downloaded file.
         :return: A boolean value indicating whether the MD5 hash exists (True) or not (False).
         """
-        return DuplicateHandler.is_duplicate(content)
+        return self.status_writer.has_downloaded_hash(md5_hash) or DuplicateHandler.is_duplicate_hash(md5_hash)
 
-    def handle_duplicate_content(self, content: Content) -> None:
+    def handle_duplicate_content(self, job: DownloadJob) -> None:
         """
         Handles duplicate content.
 
-        Deletes the file associated with the given content and sends a debug message indicating that the duplicate file
-        was not saved along with the content's title and URL.
+        Deletes or renames the file associated with the given job, as dictated by the duplicate control method of the
+        content's significant reddit object.  The content is loaded for this because duplicate handling is done on the
+        local file system only, so no database session is held across network I/O.
 
-        :param content: The Content instance that represents the duplicate content which was detected.
+        :param job: The download job of the content that was detected as a duplicate.
         """
-        duplicate_handler = DuplicateHandler(content)
-        duplicate_handler.handle_duplicate()
+        with self.db.get_scoped_session() as session:
+            content = session.query(Content).get(job.content_id)
+            content.download_title = job.download_title
+            duplicate_handler = DuplicateHandler(content)
+            duplicate_handler.handle_duplicate()
         if not duplicate_handler.duplicate_deleted:
             self.download_count += 1
         self.duplicate_count += 1
 
-    def handle_date_modified(self, content: Content) -> None:
+    def handle_date_modified(self, job: DownloadJob) -> None:
         """
-        Handles updating the file's modified date to match the content's post-date if the setting is enabled.
+        Handles updating the file's modified date to match the content's post-date if the setting is enabled.  The
+        setting is checked when the job is created, so the job only has a modified time if it is enabled.
 
-        :param content: The content object for which the modified date is updated.
+        :param job: The download job for which the modified date is updated.
         """
-        if self.settings_manager.match_file_modified_to_post_date:
-            system_util.set_file_modify_time(content.get_full_file_path(), content.post.date_posted.timestamp())
+        if job.modified_time is not None:
+            system_util.set_file_modify_time(job.file_path, job.modified_time)
 
-    def output_downloaded_message(self, content: Content) -> None:
+    def output_downloaded_message(self, job: DownloadJob) -> None:
         """
         Outputs the download message as specified by the settings manager.
 
-        :param content: The downloaded content object for which the message is generated.
+        :param job: The download job for the downloaded content for which the message is generated.
         """
-        output_data = self.get_downloaded_output_data(content)
+        output_data = self.get_downloaded_output_data(job)
         Message.send_debug(f'Saved: {output_data}')
 
-    def get_downloaded_output_data(self, content: Content) -> str:
+    def get_downloaded_output_data(self, job: DownloadJob) -> str:
         """
         Retrieve the appropriate output data for the downloaded content based on the settings configuration.
 
@@ -232,88 +478,95 @@ class Downloader(Runner):
         containing the username and title. The behavior is controlled by the `output_saved_content_full_path` setting
         in the `settings_manager`.
 
-        :param content: The content object for which the output data is generated. It contains details like the
-            user's name and the content's title.
+        :param job: The download job for which the output data is generated. It contains details like the user's name
+            and the content's title.
         :return: If the `output_saved_content_full_path` setting is enabled, returns the full file path of the content.
             Otherwise, returns a formatted string containing the username and the title of the content.
         """
         if self.settings_manager.output_saved_content_full_path:
-            return content.get_full_file_path()
+            return job.file_path
         else:
-            return f'{content.user.name}: {content.title}'
+            return f'{job.user_name}: {job.title}'
 
-    def handle_download_stopped(self, content: Content) -> None:
+    def handle_download_stopped(self, job: DownloadJob) -> None:
         """
-        Handles the scenario where a download has been stopped before it could be completed. This function notifies the
-        content object about the download interruption, and sends an appropriate error message indicating that the file
+        Handles the scenario where a download has been stopped before it could be completed. This function reports the
+        download interruption to the status writer, and sends an appropriate error message indicating that the file
         may be corrupted.
         """
         message = 'Download was stopped before finished'
-        content.set_download_error(Error.DOWNLOAD_STOPPED, message)
-        Message.send_download_error(f'{message}. File at path: "{content.get_full_file_path()}" may be corrupted')
+        self.status_writer.set_download_error(job, Error.DOWNLOAD_STOPPED, message)
+        Message.send_download_error(f'{message}. File at path: "{job.file_path}" may be corrupted')
 
-    def finish_multi_part_download(self, content: Content, multipart_downloader: MultipartDownloader):
+    def finish_multi_part_download(self, job: DownloadJob, multipart_downloader: MultipartDownloader):
         parts = multipart_downloader.part_count
         failed = multipart_downloader.failed_parts
-        if failed > 0:
+        if multipart_downloader.complete:
+            md5_hash = None
+            if job.use_hash:
+                md5_hash = self.hash_complete_multi_part_file(job)
+            self.finish_download(job, md5_hash)
+        elif not self.continue_run:
+            self.handle_download_stopped(job)
+        elif failed > 0:
             failed_percent = round((failed / parts) * 100)
-            content.set_download_error(Error.MULTIPART_FAILURE,
-                                       f'{failed_percent}% of multi-part download parts failed to download')
+            self.status_writer.set_download_error(job, Error.MULTIPART_FAILURE,
+                                                  f'{failed_percent}% of multi-part download parts failed to download')
         else:
-            if self.should_use_hash(content):
-                self.hash_complete_multi_part_file(content)
-            self.finish_download(content)
+            self.status_writer.set_download_error(job, Error.MULTIPART_FAILURE, 'Multi-part download failed')
 
-    def hash_complete_multi_part_file(self, content: Content) -> None:
+    def hash_complete_multi_part_file(self, job: DownloadJob) -> str:
         """
-        Calculates and sets the MD5 hash for the full multi-part file content provided. This function updates the given
-        content object with the computed hash by processing the entire file in chunks to handle large files efficiently.
+        Calculates the MD5 hash for the full multi-part file, processing the entire file in chunks to handle large files
+        efficiently.
 
-        :param content: The content object containing metadata and file information that needs to be processed.
+        :param job: The download job whose file is to be hashed.
+        :return: The MD5 hash of the file.
         """
         md5 = hashlib.md5()
-        with open(content.get_full_file_path(), 'rb') as file:
+        with open(job.file_path, 'rb') as file:
             for chunk in iter(lambda: file.read(1024 * 1024), b''):
                 md5.update(chunk)
-        content.md5_hash = md5.hexdigest()
+        return md5.hexdigest()
 
-    def handle_unsuccessful_response(self, content: Content, status_code):
+    def handle_unsuccessful_response(self, job: DownloadJob, status_code):
         message = 'Failed Download: Unsuccessful response from server'
-        self.log_errors(content, message, status_code=status_code)
-        self.output_error(content, message)
-        content.set_download_error(Error.UNSUCCESSFUL_RESPONSE, f'{message}: status_code: {status_code}')
+        self.log_errors(job, message, status_code=status_code)
+        self.output_error(job, message)
+        self.status_writer.set_download_error(job, Error.UNSUCCESSFUL_RESPONSE,
+                                              f'{message}: status_code: {status_code}')
 
-    def handle_connection_error(self, content: Content):
+    def handle_connection_error(self, job: DownloadJob):
         message = 'Failed Download: Failed to establish download connection'
-        self.log_errors(content, message)
-        self.output_error(content, message)
-        content.set_download_error(Error.CONNECTION_ERROR, message)
+        self.log_errors(job, message)
+        self.output_error(job, message)
+        self.status_writer.set_download_error(job, Error.CONNECTION_ERROR, message)
 
-    def handle_unknown_error(self, content: Content):
+    def handle_unknown_error(self, job: DownloadJob):
         message = 'An unknown error occurred during download'
-        self.log_errors(content, message)
-        self.output_error(content, message)
-        content.set_download_error(Error.UNKNOWN_ERROR, message)
+        self.log_errors(job, message)
+        self.output_error(job, message)
+        self.status_writer.set_download_error(job, Error.UNKNOWN_ERROR, message)
 
-    def handle_deleted_content_error(self, content: Content):
+    def handle_deleted_content_error(self, job: DownloadJob):
         message = 'Content has been deleted'
-        self.log_errors(content, message)
-        self.output_error(content, message)
-        content.set_download_error(Error.DOES_NOT_EXIST, message)
+        self.log_errors(job, message)
+        self.output_error(job, message)
+        self.status_writer.set_download_error(job, Error.DOES_NOT_EXIST, message)
 
-    def log_errors(self, content: Content, message, **kwargs):
+    def log_errors(self, job: DownloadJob, message, **kwargs):
         extra = {
-            'url': content.url,
-            'title': content.title,
-            'submission_id': content.post.reddit_id,
-            'user': content.user,
-            'subreddit': content.subreddit,
-            'save_path': content.get_full_file_path(),
+            'url': job.url,
+            'title': job.title,
+            'submission_id': job.submission_id,
+            'user': job.user_name,
+            'subreddit': job.subreddit_name,
+            'save_path': job.file_path,
             **kwargs
         }
         self.logger.error(message, extra=extra, exc_info=True)
 
-    def output_error(self, content, message):
-        output_append = f'\nPost: {content.post.title}\nUrl: {content.url}\nUser: {content.user}\n' \
-                        f'Subreddit: {content.subreddit}\n'
+    def output_error(self, job: DownloadJob, message):
+        output_append = f'\nPost: {job.post_title}\nUrl: {job.url}\nUser: {job.user_name}\n' \
+                        f'Subreddit: {job.subreddit_name}\n'
         Message.send_download_error(message + output_append)
@@ -0,0 +1,195 @@
+import time
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+
+    """
+    A simple token bucket used to limit the rate at which requests are started for a single host.  Tokens are added
+    at a constant rate up to the capacity of the bucket, and each request that is started consumes one token.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock=time.monotonic):
+        """
+        :param rate: The number of tokens added to the bucket per second.
+        :param capacity: The maximum number of tokens the bucket can hold.  This is the largest burst of requests that
+                         can be started at once.  Defaults to the rate (one second worth of requests), with a minimum
+                         of one.
+        :param clock: A callable that returns the current time in seconds.  Supplied for testing.
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.last_update = clock()
+        self.paused_until = 0
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_update) * self.rate)
+        self.last_update = now
+
+    def time_until_available(self) -> float:
+        """Returns the number of seconds until a token will be available.  Zero if one is available now."""
+        self.refill()
+        pause = max(0.0, self.paused_until - self.clock())
+        if self.tokens >= 1:
+            return pause
+        return max(pause, (1 - self.tokens) / self.rate)
+
+    def consume(self) -> bool:
+        if self.time_until_available() > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    def pause(self, seconds: float):
+        """Stops tokens from being consumed for the supplied number of seconds."""
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class HostScheduler:
+
+    """
+    Orders the content waiting to be downloaded so that no single host can monopolize the download threads.  Pending
+    items are grouped by the host of their url and handed out round robin between the hosts that are able to accept
+    another request.  A host is able to accept a request when the number of its active downloads is below its
+    concurrency limit and, if the host has a rate limit, its token bucket has a token available.
+    """
+
+    def __init__(self, default_limit: int, host_limits: dict = None, host_rates: dict = None, clock=time.monotonic):
+        """
+        :param default_limit: The number of concurrent downloads allowed for a host that does not have a limit
+                              specified in host_limits.
+        :param host_limits: A dict of host names and the number of concurrent downloads allowed for each of them.
+                            A host name matches its own sub-domains (ie: 'imgur.com' also limits 'i.imgur.com').
+        :param host_rates: A dict of host names and the number of downloads per second that may be started for each.
+        :param clock: A callable that returns the current time in seconds.  Supplied for testing.
+        """
+        self.default_limit = default_limit
+        self.host_limits = host_limits or {}
+        self.host_rates = host_rates or {}
+        self.clock = clock
+        self.pending = OrderedDict()
+        self.active = {}
+        self.buckets = {}
+        self.lock = Lock()
+
+    @property
+    def pending_count(self) -> int:
+        with self.lock:
+            return sum(len(x) for x in self.pending.values())
+
+    @property
+    def active_count(self) -> int:
+        with self.lock:
+            return sum(self.active.values())
+
+    def get_host(self, url: Optional[str]) -> str:
+        """
+        Returns the host that the supplied url is scheduled under.  If the url's host is a sub-domain of a host that
+        has a configured limit, the configured host is returned so that all of its sub-domains share the limit.
+        """
+        if not url:
+            return ''
+        host = urlsplit(url).netloc.lower().split(':')[0]
+        if host.startswith('www.'):
+            host = host[4:]
+        for configured in (*self.host_limits.keys(), *self.host_rates.keys()):
+            if host == configured or host.endswith(f'.{configured}'):
+                return configured
+        return host
+
+    def get_limit(self, host: str) -> int:
+        return self.host_limits.get(host, self.default_limit)
+
+    def get_bucket(self, host: str) -> Optional[TokenBucket]:
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            rate = self.host_rates.get(host)
+            if rate is None:
+                return None
+            bucket = TokenBucket(rate, clock=self.clock)
+            self.buckets[host] = bucket
+        return bucket
+
+    def add(self, item, url: Optional[str]) -> str:
+        """
+        Adds an item to the pending work for the host of the supplied url.
+        :return: The host that the item was scheduled under.
+        """
+        host = self.get_host(url)
+        with self.lock:
+            try:
+                self.pending[host].append(item)
+            except KeyError:
+                self.pending[host] = deque([item])
+        return host
+
+    def can_start(self, host: str) -> bool:
+        if self.active.get(host, 0) >= self.get_limit(host):
+            return False
+        bucket = self.get_bucket(host)
+        return bucket is None or bucket.time_until_available() <= 0
+
+    def pop_ready(self) -> Optional[tuple]:
+        """
+        Removes and returns the next item that is able to be started, taking hosts in turn so that each host with
+        pending work gets a chance to start a download.  The item's host is marked as having one more active download
+        until release is called for it.
+        :return: A tuple of the item and its host, or None if no host is currently able to start a download.
+        """
+        with self.lock:
+            for host in list(self.pending.keys()):
+                if self.can_start(host):
+                    queue = self.pending.pop(host)
+                    item = queue.popleft()
+                    if queue:
+                        # the host is moved to the back of the line so that other hosts get the next turn
+                        self.pending[host] = queue
+                    bucket = self.get_bucket(host)
+                    if bucket is not None:
+                        bucket.consume()
+                    self.active[host] = self.active.get(host, 0) + 1
+                    return item, host
+        return None
+
+    def release(self, host: str):
+        """Marks one of the supplied host's active downloads as finished."""
+        with self.lock:
+            count = self.active.get(host, 0) - 1
+            if count > 0:
+                self.active[host] = count
+            else:
+                self.active.pop(host, None)
+
+    def throttle(self, host: str, seconds: float):
+        """
+        Stops any new downloads from being started for the supplied host for the supplied number of seconds.  This is
+        used when a host reports that it is rate limiting requests.
+        """
+        with self.lock:
+            bucket = self.get_bucket(host)
+            if bucket is None:
+                bucket = TokenBucket(max(1, self.get_limit(host)), clock=self.clock)
+                self.buckets[host] = bucket
+            bucket.pause(seconds)
+
+    def time_until_ready(self) -> Optional[float]:
+        """
+        Returns the number of seconds until a host that is only waiting on its rate limit will be able to start a
+        download.  None is returned if no pending work is waiting on a rate limit, in which case the next change will
+        come from either a new item being added or an active download being released.
+        """
+        with self.lock:
+            wait = None
+            for host in self.pending.keys():
+                if self.active.get(host, 0) >= self.get_limit(host):
+                    continue
+                bucket = self.get_bucket(host)
+                host_wait = 0 if bucket is None else bucket.time_until_available()
+                wait = host_wait if wait is None else min(wait, host_wait)
+            return wait
@@ -1,81 +1,308 @@
 import os
+import math
+import time
 import requests
-import asyncio
 import logging
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from threading import Lock
+from typing import Optional
 
-from . import HEADERS
+from .throughput import ThroughputTracker
+from .partial_download import PartialDownload
+from . import session_pool
 from DownloaderForReddit.core.runner import Runner, verify_run
 from DownloaderForReddit.utils import injector
 
 
+class RangeFetchPool:
+
+    """
+    A bounded thread pool that fetches the ranges of every multi-part download made during a download session.  The
+    pool is shared between all of the downloads so that the number of range threads stays fixed no matter how many
+    large files are being downloaded at once, and it keeps count of the ranges that are in flight across all of them.
+    The throughput measured for each host while fetching ranges is also kept here so that it carries over from one
+    download to the next.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='range_fetch')
+        self.throughput = ThroughputTracker()
+        self.lock = Lock()
+        self.in_flight = 0
+        self.fetched = 0
+
+    @property
+    def available(self) -> int:
+        """The number of workers that are not currently assigned a range."""
+        with self.lock:
+            return max(0, self.max_workers - self.in_flight)
+
+    def submit(self, fn, *args) -> Future:
+        with self.lock:
+            self.in_flight += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self.finish)
+        return future
+
+    def finish(self, future: Future) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            self.fetched += 1
+
+    def shutdown(self, cancel_pending: bool = False) -> None:
+        """
+        Waits for the ranges that are in flight to finish and stops the pool's threads.
+        :param cancel_pending: If True, ranges that have not yet been started are cancelled instead of fetched.
+        """
+        self.executor.shutdown(wait=True, cancel_futures=cancel_pending)
+
+
+class RangePart:
+
+    """
+    A byte range of a multi-part download.  The end of the range may be moved forward while the range is being
+    downloaded when the remainder of the range is split off to be downloaded by another worker.
+    """
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+        self.offset = start
+        self.started = False
+        self.finished = False
+        self.lock = Lock()
+
+    @property
+    def remaining(self) -> int:
+        return self.end + 1 - self.offset
+
+    def split(self, min_size: int) -> Optional['RangePart']:
+        """
+        Splits the remaining bytes of this range in half if the range is still being downloaded and each half would be
+        at least the supplied minimum size.
+        :return: A new range holding the back half of this range's remaining bytes, or None if the range was not split.
+        """
+        with self.lock:
+            if not self.started or self.finished or self.remaining < min_size * 2:
+                return None
+            middle = self.offset + self.remaining // 2
+            part = RangePart(middle, self.end)
+            self.end = middle - 1
+            return part
+
+
 class MultipartDownloader(Runner):
 
-    def __init__(self, stop_run):
+    """
+    Downloads a single large file in multiple ranges at the same time.  The file's partial file is preallocated to its
+    full size before any range is requested, and each range is written directly to its offset in the file as it is
+    received, so that no part files need to be joined once the download is finished.  The memory used by each range is
+    bounded by the stream buffer size regardless of the size of the range.
+
+    The ranges that have been written are recorded with the partial download as parts finish and when the download
+    ends, so that a download that is stopped or fails part way through only requests its missing ranges when it is
+    resumed.
+
+    The number and size of the parts are chosen for each file from its size, the range workers that are free, and the
+    bandwidth and latency measured for the host by earlier ranges.  When a worker runs out of parts while another part
+    still has a large amount left to download, the straggling part is split and its back half is given to the free
+    worker.
+    """
+
+    STREAM_BUFFER_SIZE = 256 * 1024
+    # parts are sized to take about this many seconds to download on a single connection to the host
+    TARGET_PART_SECONDS = 5
+    # parts are kept at least this many round trips worth of data so that request latency is a small share of each part
+    LATENCY_MULTIPLE = 10
+    # the largest part that is used before any throughput has been measured for the host
+    DEFAULT_MAX_PART_SIZE = 32 * 1024 * 1024
+
+    def __init__(self, stop_run, range_pool: RangeFetchPool):
+        """
+        :param range_pool: The session wide pool that the ranges of the file are fetched on.
+        """
         super().__init__(stop_run)
         self.logger = logging.getLogger(__name__)
         self.settings_manager = injector.get_settings_manager()
-        self.executor = ThreadPoolExecutor(self.settings_manager.multi_part_thread_count)
-        self.chunk_size = self.settings_manager.multi_part_chunk_size
+        self.range_pool = range_pool
+        self.min_part_size = self.get_min_part_size()
         self.part_count = 0
         self.failed_parts = 0
+        self.logged_errors = 0
+        # set once every part of the file has been written in full
+        self.complete = False
+        self.fd = None
+        self.validator = None
+        self.count_lock = Lock()
+        # used to keep a seek and write together on platforms that do not support positional writes
+        self.write_lock = Lock()
+
+    def get_min_part_size(self) -> int:
+        """The multi-part chunk size setting is used as the smallest part that a file will be split into."""
+        chunk_size = self.settings_manager.multi_part_chunk_size
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            return 1024 * 1024
+        return chunk_size
 
-    def run(self, content, path, size):
-        loop = asyncio.new_event_loop()
+    def run(self, job, partial: PartialDownload, size):
+        """
+        :param partial: The partial download that the file is written to.  Any ranges that it has already written are
+                        not downloaded again.
+        """
         try:
-            loop.run_until_complete(self.download(content, path, size))
+            self.download(job, partial, size)
         except:
-            self.logger.error('Multi-part download failed', extra={'url': content.url, 'path': path}, exc_info=True)
-        finally:
-            loop.close()
+            self.logger.error('Multi-part download failed', extra={'url': job.url, 'path': partial.file_path},
+                              exc_info=True)
 
     @verify_run
-    async def download(self, content, path, file_size):
-        loop = asyncio.get_event_loop()
-        chunks = range(0, file_size, self.chunk_size)
-        self.part_count = len(chunks)
-        tasks = [
-            loop.run_in_executor(
-                self.executor,
-                self.download_part,
-                content,
-                start,
-                start + self.chunk_size - 1,
-                f'{path}.part{x}'
-            )
-            for x, start in enumerate(chunks)
-        ]
-        await asyncio.wait(tasks)
-
-        with open(path, 'wb') as file:
-            for x in range(self.part_count):
-                try:
-                    chunk_path = f'{path}.part{x}'
-                    with open(chunk_path, 'rb') as part_file:
-                        file.write(part_file.read())
-                    os.remove(chunk_path)
-                except FileNotFoundError:
-                    self.logger.error('Failed to join multi-download part into complete file',
-                                      extra={'chunk_path': chunk_path}, exc_info=True)
+    def download(self, job, partial: PartialDownload, file_size):
+        partial.start_multipart(file_size)
+        self.validator = partial.validator
+        parts = self.plan_parts(file_size, session_pool.get_host_key(job.url), partial.get_missing_ranges())
+        self.part_count = len(parts)
+        self.fd = self.open_preallocated(partial.part_path, file_size, truncate=not partial.ranges)
+        try:
+            pending = {self.range_pool.submit(self.download_part, job, part) for part in parts}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                self.record_progress(partial, parts)
+                for _ in done:
+                    part = self.split_straggler(parts)
+                    if part is not None:
+                        parts.append(part)
+                        self.part_count += 1
+                        pending.add(self.range_pool.submit(self.download_part, job, part))
+            self.complete = self.failed_parts == 0 and all(part.remaining <= 0 for part in parts)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+        if self.complete:
+            partial.complete()
+        else:
+            self.record_progress(partial, parts)
 
-    @verify_run
-    def download_part(self, content, start, end, path):
+    @staticmethod
+    def record_progress(partial: PartialDownload, parts: list) -> None:
+        """Saves the ranges that the parts have written so far with the partial download."""
+        written = []
+        for part in parts:
+            with part.lock:
+                if part.offset > part.start:
+                    written.append((part.start, part.offset - 1))
+        partial.add_ranges(written)
+        partial.save()
+
+    def plan_parts(self, file_size: int, host: str, missing: Optional[list] = None) -> list:
+        """
+        Divides the file into parts.  The file is split evenly between the free range workers so that the link is kept
+        busy, but parts are kept large enough that the latency of each request is a small share of its transfer time,
+        and small enough that they finish in a reasonable time at the host's measured bandwidth.
+        :param missing: The inclusive byte ranges of the file that are to be downloaded.  The whole file is downloaded
+                        if no ranges are supplied.
+        """
+        if missing is None:
+            missing = [(0, file_size - 1)]
+        missing_size = sum(end + 1 - start for start, end in missing)
+        part_size = math.ceil(missing_size / max(1, self.range_pool.available))
+        min_size = self.min_part_size
+        max_size = self.DEFAULT_MAX_PART_SIZE
+        stats = self.range_pool.throughput.get(host)
+        if stats is not None:
+            min_size = max(min_size, int(stats.bandwidth * stats.latency * self.LATENCY_MULTIPLE))
+            max_size = int(stats.bandwidth * self.TARGET_PART_SECONDS)
+        part_size = max(min_size, min(part_size, max_size))
+        return [RangePart(start, min(start + part_size - 1, missing_end))
+                for missing_start, missing_end in missing for start in range(missing_start, missing_end + 1, part_size)]
+
+    def split_straggler(self, parts: list) -> Optional[RangePart]:
+        """
+        Splits the part with the most bytes left to download so that a worker that has become free can help finish it.
+        Parts are not split while there are still parts waiting to be started.
+        """
+        if not self.continue_run or any(not part.started for part in parts):
+            return None
+        active = [part for part in parts if not part.finished]
+        if not active:
+            return None
+        straggler = max(active, key=lambda part: part.remaining)
+        return straggler.split(self.min_part_size)
+
+    def open_preallocated(self, path: str, file_size: int, truncate: bool = True) -> int:
+        """
+        Creates the file at the supplied path with its full size reserved and returns a low level file descriptor for
+        it that every range writes through.
+        :param truncate: False if the file holds ranges of an earlier attempt that are to be kept.
+        """
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        if truncate:
+            flags |= os.O_TRUNC
+        fd = os.open(path, flags, 0o666)
+        try:
+            os.ftruncate(fd, file_size)
+        except OSError:
+            os.close(fd)
+            raise
+        return fd
+
+    def write_at(self, data: bytes, offset: int) -> None:
+        """Writes the supplied data to the file at the supplied offset."""
+        data = memoryview(data)
+        if hasattr(os, 'pwrite'):
+            while data:
+                written = os.pwrite(self.fd, data, offset)
+                data = data[written:]
+                offset += written
+        else:
+            with self.write_lock:
+                os.lseek(self.fd, offset, os.SEEK_SET)
+                while data:
+                    data = data[os.write(self.fd, data):]
+
+    def download_part(self, job, part: RangePart):
+        """
+        Downloads the supplied part, retrying from the last byte received if the connection fails.  The part's end is
+        checked as each chunk arrives so that the download stops early if the part has been split.  A part that still
+        has bytes left when it gives up, whether from failed tries or because the download was stopped, is counted as
+        failed so that the file is not reported as downloaded with a hole in it.
+        """
         retry = True
         tries = 0
-        url = content.url
+        url = job.url
+        host = session_pool.get_host_key(url)
+        with part.lock:
+            part.started = True
 
         def download():
-            headers = self.get_headers(content, start, end)
-            response = requests.get(url, headers=headers, stream=True, timeout=10)
-            if response.status_code == 206:
-                with open(path, 'wb') as file:
-                    for chunk in response.iter_content(self.chunk_size):
-                        file.write(chunk)
-                return True
-            else:
-                self.log_part_error('Failed to download chunk of muli-part download - bad response',
-                                    extra={'status_code': response.status_code}, exc_info=False)
-                return False
+            headers = self.get_headers(job, part.offset, part.end)
+            request_time = time.perf_counter()
+            with session_pool.get(url, headers=headers, stream=True, timeout=10) as response:
+                response_time = time.perf_counter()
+                if response.status_code == 206:
+                    received = 0
+                    for chunk in response.iter_content(self.STREAM_BUFFER_SIZE):
+                        with part.lock:
+                            chunk = chunk[:part.remaining]
+                            if chunk:
+                                self.write_at(chunk, part.offset)
+                                part.offset += len(chunk)
+                                received += len(chunk)
+                            if part.remaining <= 0:
+                                break
+                    self.range_pool.throughput.record(host, received, time.perf_counter() - response_time,
+                                                      response_time - request_time)
+                    if part.remaining > 0:
+                        self.log_part_error('Failed to download chunk of multi-part download - incomplete range',
+                                            extra={'url': url, 'range': f'{part.start} - {part.end}',
+                                                   'received': part.offset - part.start},
+                                            exc_info=False, log=tries >= 3)
+                        return False
+                    return True
+                else:
+                    self.log_part_error('Failed to download chunk of muli-part download - bad response',
+                                        extra={'status_code': response.status_code}, exc_info=False)
+                    return False
 
         while self.continue_run and retry and tries < 3:
             tries += 1
@@ -85,28 +312,39 @@ class MultipartDownloader(Runner):
                     retry = False
             except requests.exceptions.ConnectTimeout:
                 self.log_part_error('Operation timed out before establishing a connection to the server',
-                                    extra={'url': url, 'range': f'{start} - {end}'}, log=tries >= 3)
+                                    extra={'url': url, 'range': f'{part.offset} - {part.end}'}, log=tries >= 3)
             except requests.exceptions.ReadTimeout:
                 self.log_part_error('Connection timed out while reading data from server',
-                                    extra={'url': url, 'range': f'{start} - {end}'}, log=tries >= 3)
+                                    extra={'url': url, 'range': f'{part.offset} - {part.end}'}, log=tries >= 3)
             except requests.exceptions.ChunkedEncodingError:
                 self.log_part_error('Connection experienced a chunk encoding error and closed before complete',
-                                    extra={'url': url, 'range': f'{start} - {end}'}, log=tries >= 3)
+                                    extra={'url': url, 'range': f'{part.offset} - {part.end}'}, log=tries >= 3)
             except:
-                self.log_part_error('Unknown error occurred', extra={'url': url, 'range': f'{start} - {end}'},
+                self.log_part_error('Unknown error occurred', extra={'url': url,
+                                                                     'range': f'{part.offset} - {part.end}'},
                                     log=tries >= 3)
+        with part.lock:
+            part.finished = True
+            incomplete = part.remaining > 0
+        if incomplete:
+            with self.count_lock:
+                self.failed_parts += 1
 
-    def get_headers(self, content, start, end):
+    def get_headers(self, job, start, end):
         headers = {'Range': f'bytes={start}-{end}'}
-        download_headers = HEADERS.get(content.id, None)
-        if download_headers is not None:
-            headers.update(download_headers)
+        if self.validator is not None:
+            # a range of a file that has changed since the download was started is answered with the whole new file
+            headers['If-Range'] = self.validator
+        if job.headers is not None:
+            headers.update(job.headers)
         return headers
 
     def log_part_error(self, message, extra=None, exc_info=True, log=True):
         if log:
-            self.failed_parts += 1
-            if self.failed_parts <= 3:
+            with self.count_lock:
+                self.logged_errors += 1
+                logged_errors = self.logged_errors
+            if logged_errors <= 3:
                 self.logger.error(message, extra=extra, exc_info=exc_info)
             else:
                 self.logger.error('Failed to download multiple chunks of multi-part download.  '
@@ -0,0 +1,221 @@
+import os
+import json
+import logging
+from typing import Optional, List, Tuple
+
+
+logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
+
+PART_EXT = '.part'
+STATE_EXT = '.part.json'
+
+
+class PartialDownload:
+
+    """
+    Tracks a download that is written to a '.part' file next to its final file path so that it can be resumed with a
+    range request if the download is interrupted.  A small json sidecar file holds the url and the validator (ETag or
+    Last-Modified header) that the server sent for the file.  A download is only resumed if the server confirms, by
+    way of the validator, that the file has not changed since the partial file was started.
+
+    A file that is downloaded in multiple parts is written to the partial file at its full size with its parts filled
+    in out of order, so for these downloads the sidecar file also records the size of the file and the byte ranges that
+    have been written, and only the missing ranges are requested when the download is resumed.
+    """
+
+    def __init__(self, file_path: str, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                 offset: int = 0, size: Optional[int] = None, ranges: Optional[List[Tuple[int, int]]] = None):
+        """
+        :param offset: The number of bytes written to the partial file of a download that is written start to end.
+        :param size: The full size of a multi-part download.
+        :param ranges: The inclusive (start, end) byte ranges that have been written to the partial file of a multi-part
+                       download, or None if the download is written start to end.
+        """
+        self.file_path = file_path
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.offset = offset
+        self.size = size
+        self.ranges = ranges
+
+    @property
+    def part_path(self) -> str:
+        return f'{self.file_path}{PART_EXT}'
+
+    @property
+    def state_path(self) -> str:
+        return f'{self.file_path}{STATE_EXT}'
+
+    @property
+    def validator(self) -> Optional[str]:
+        """Returns the value that should be used as the If-Range header.  Weak ETags can not be used for ranges."""
+        if self.etag is not None and not self.etag.startswith('W/'):
+            return self.etag
+        return self.last_modified
+
+    @property
+    def multipart(self) -> bool:
+        return self.ranges is not None
+
+    @property
+    def resume_offset(self) -> int:
+        """The first byte of the file that has not been written to the partial file."""
+        if not self.multipart:
+            return self.offset
+        position = 0
+        for start, end in self.ranges:
+            if start > position:
+                break
+            position = max(position, end + 1)
+        return position
+
+    @property
+    def resumable(self) -> bool:
+        if self.validator is None:
+            return False
+        if self.multipart:
+            return len(self.ranges) > 0 and self.size is not None
+        return self.offset > 0
+
+    @classmethod
+    def load(cls, file_path: str, url: str) -> Optional['PartialDownload']:
+        """
+        Loads the state of a previously interrupted download of the supplied url to the supplied file path.
+        :return: The partial download if one exists for the url and can be resumed, otherwise None.  Partial files
+                 that can not be resumed are removed.
+        """
+        partial = cls(file_path, url)
+        if not os.path.isfile(partial.part_path):
+            return None
+        try:
+            with open(partial.state_path, 'r') as file:
+                state = json.load(file)
+            if state.get('url') == url:
+                partial.etag = state.get('etag')
+                partial.last_modified = state.get('last_modified')
+                if state.get('ranges') is not None:
+                    partial.size = state.get('size')
+                    partial.ranges = merge_ranges(state['ranges'])
+                    # the partial file of a multi-part download is created at the full size of the file
+                    if partial.size != os.path.getsize(partial.part_path):
+                        partial.ranges = []
+                else:
+                    partial.offset = os.path.getsize(partial.part_path)
+                if partial.resumable:
+                    return partial
+        except (OSError, ValueError, TypeError):
+            logger.warning('Failed to load partial download state', extra={'file_path': file_path}, exc_info=True)
+        partial.discard()
+        return None
+
+    def get_range_headers(self) -> dict:
+        """Returns the headers needed to request the remainder of the file if this download can be resumed."""
+        if not self.resumable:
+            return {}
+        return {'Range': f'bytes={self.resume_offset}-', 'If-Range': self.validator}
+
+    def start(self, response_headers, resuming: bool) -> None:
+        """
+        Records the validators from the supplied response headers and writes the state sidecar file.  If the response
+        is not a continuation of the partial file, the partial file is restarted from the beginning.
+        """
+        if not resuming:
+            self.offset = 0
+            self.size = None
+            self.ranges = None
+            self.etag = response_headers.get('ETag')
+            self.last_modified = response_headers.get('Last-Modified')
+        self.save()
+
+    def start_multipart(self, size: int) -> None:
+        """
+        Prepares the partial download to be downloaded in multiple parts.  The bytes already written by a download that
+        was written start to end are kept as the first written range.
+        """
+        if self.ranges is None:
+            self.ranges = [(0, self.offset - 1)] if self.offset > 0 else []
+        elif self.size != size:
+            self.ranges = []
+        self.size = size
+        self.save()
+
+    def add_ranges(self, ranges: List[Tuple[int, int]]) -> None:
+        """Records the supplied inclusive byte ranges as written to the partial file of a multi-part download."""
+        self.ranges = merge_ranges(self.ranges + list(ranges))
+
+    def get_missing_ranges(self) -> List[Tuple[int, int]]:
+        """Returns the inclusive byte ranges of a multi-part download that have not been written to the partial file."""
+        missing = []
+        position = 0
+        for start, end in self.ranges:
+            if start > position:
+                missing.append((position, start - 1))
+            position = max(position, end + 1)
+        if position < self.size:
+            missing.append((position, self.size - 1))
+        return missing
+
+    def save(self) -> None:
+        state = {'url': self.url, 'etag': self.etag, 'last_modified': self.last_modified, 'offset': self.offset}
+        if self.multipart:
+            state.update(size=self.size, ranges=self.ranges)
+        try:
+            with open(self.state_path, 'w') as file:
+                json.dump(state, file)
+        except OSError:
+            logger.warning('Failed to save partial download state', extra={'file_path': self.file_path},
+                           exc_info=True)
+
+    def open(self):
+        """Opens the partial file for writing, appending to it if the download is being resumed."""
+        return open(self.part_path, 'ab' if self.offset > 0 else 'wb')
+
+    def hash_existing(self, md5) -> None:
+        """Updates the supplied md5 hash object with the bytes that have already been written to the partial file."""
+        with open(self.part_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                md5.update(chunk)
+
+    def complete(self) -> None:
+        """Moves the finished partial file to its final file path and removes the state sidecar file."""
+        os.replace(self.part_path, self.file_path)
+        self.remove_state()
+
+    def discard(self) -> None:
+        """Removes the partial file and its state sidecar file."""
+        for path in (self.part_path, self.state_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def remove_state(self) -> None:
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
+
+
+def merge_ranges(ranges) -> List[Tuple[int, int]]:
+    """Sorts the supplied inclusive byte ranges and joins those that overlap or touch."""
+    merged = []
+    for start, end in sorted((int(start), int(end)) for start, end in ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def get_total_size(status_code: int, headers) -> int:
+    """
+    Returns the full size of the file being downloaded.  For a partial content response the Content-Length is only the
+    size of the requested range, so the total is taken from the Content-Range header instead.
+    """
+    if status_code == 206:
+        content_range = headers.get('Content-Range', '')
+        total = content_range.rsplit('/', 1)[-1]
+        if total.isdigit():
+            return int(total)
+    return int(headers['Content-Length'])
@@ -0,0 +1,92 @@
+"""
+A shared pool of keep-alive requests sessions.  One session is held for each host that is requested so that the
+connections (and the DNS, TCP and TLS work that goes into establishing them) can be reused by every request that is
+made to that host during a download session, regardless of which thread makes the request.
+"""
+
+import logging
+from threading import Lock
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from DownloaderForReddit.utils import injector
+
+
+logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
+
+DEFAULT_POOL_SIZE = 10
+
+_sessions = {}
+_lock = Lock()
+
+
+def get_host_key(url: str) -> str:
+    """
+    Returns the key that is used to map the supplied url to a session.  Sessions are separated by scheme and host so
+    that connections for one host do not count against the connection limit of another.
+    :param url: The url that is going to be requested.
+    :return: The scheme and network location of the supplied url.
+    """
+    parts = urlsplit(str(url))
+    return f'{parts.scheme}://{parts.netloc.lower()}'
+
+
+def get_pool_size() -> int:
+    """Returns the maximum number of connections that will be kept alive for each host."""
+    pool_size = injector.get_settings_manager().connection_pool_size
+    if not isinstance(pool_size, int) or pool_size < 1:
+        return DEFAULT_POOL_SIZE
+    return pool_size
+
+
+def make_session() -> requests.Session:
+    pool_size = get_pool_size()
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Returns the session that is responsible for the host of the supplied url, creating it if one does not yet exist.
+    :param url: The url that is going to be requested with the returned session.
+    :return: A keep-alive session that is shared by all requests made to the url's host.
+    """
+    key = get_host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = make_session()
+                _sessions[key] = session
+    return session
+
+
+def get(url, **kwargs) -> requests.Response:
+    """Makes a GET request to the supplied url using the pooled session for the url's host."""
+    return get_session(url).get(url, **kwargs)
+
+
+def head(url, **kwargs) -> requests.Response:
+    """Makes a HEAD request to the supplied url using the pooled session for the url's host."""
+    return get_session(url).head(url, **kwargs)
+
+
+def close_all() -> None:
+    """
+    Closes every pooled session and the connections that they hold.  New sessions will be created as needed if
+    requests are made after the pool has been closed.
+    """
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        try:
+            session.close()
+        except:
+            logger.error('Failed to close pooled session', exc_info=True)
@@ -0,0 +1,51 @@
+from threading import Lock
+from typing import Optional
+
+from .download_job import DownloadJob
+from DownloaderForReddit.database.models import Content
+from DownloaderForReddit.utils import injector
+
+
+class DownloadStatusWriter:
+
+    """
+    Reports the outcome of each download to the persistence queue, which writes them back to the database in batches
+    from a single thread so that the download threads never wait on the database.
+    """
+
+    def __init__(self, download_session_id, persistence_queue=None):
+        """
+        :param download_session_id: The id of the download session that the downloads are part of.
+        :param persistence_queue: The queue that the results are written through.  The application's persistence queue
+                                  is used if none is supplied.
+        """
+        self.download_session_id = download_session_id
+        self.persistence_queue = persistence_queue if persistence_queue is not None else \
+            injector.get_persistence_queue()
+        # the hashes of the files that have been downloaded during this session, so that duplicates of files that were
+        # downloaded moments ago can be found before their results have been written
+        self.session_hashes = set()
+        self.hash_lock = Lock()
+
+    def set_downloaded(self, job: DownloadJob, md5_hash: Optional[str] = None) -> None:
+        if md5_hash is not None:
+            with self.hash_lock:
+                self.session_hashes.add(md5_hash)
+        self.persistence_queue.update(Content, job.content_id, download_title=job.download_title, md5_hash=md5_hash)
+        self.persistence_queue.call(Content, job.content_id, 'set_downloaded', self.download_session_id)
+
+    def set_download_error(self, job: DownloadJob, error, message: str) -> None:
+        self.persistence_queue.update(Content, job.content_id, download_title=job.download_title)
+        self.persistence_queue.call(Content, job.content_id, 'set_download_error', error, message)
+
+    def has_downloaded_hash(self, md5_hash: str) -> bool:
+        with self.hash_lock:
+            return md5_hash in self.session_hashes
+
+    def flush(self) -> None:
+        """Blocks until every result that has been reported before this call has been written to the database."""
+        self.persistence_queue.flush()
+
+    def close(self) -> None:
+        """Writes any results that are still waiting."""
+        self.flush()
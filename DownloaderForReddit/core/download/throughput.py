@@ -0,0 +1,47 @@
+from collections import namedtuple
+from threading import Lock
+from typing import Optional
+
+
+HostStats = namedtuple('HostStats', ['bandwidth', 'latency'])
+
+
+class ThroughputTracker:
+
+    """
+    Keeps a smoothed measurement of the bandwidth and latency of a single connection to each host that ranges have
+    been downloaded from during a download session.  These measurements are used to size the parts of later multi-part
+    downloads from the same host.
+    """
+
+    # the weight given to the newest measurement when it is combined with the previous ones
+    SMOOTHING = 0.3
+    # transfers smaller than this are dominated by connection overhead and say little about the host's bandwidth
+    MIN_SAMPLE_SIZE = 64 * 1024
+
+    def __init__(self):
+        self.hosts = {}
+        self.lock = Lock()
+
+    def record(self, host: str, byte_count: int, seconds: float, latency: float) -> None:
+        """
+        Records a finished transfer from the supplied host.
+        :param host: The host that the transfer was made from.
+        :param byte_count: The number of bytes that were received.
+        :param seconds: The time taken to receive the bytes, not including the time taken to receive the response.
+        :param latency: The time between sending the request and receiving the response headers.
+        """
+        if byte_count < self.MIN_SAMPLE_SIZE or seconds <= 0:
+            return
+        bandwidth = byte_count / seconds
+        with self.lock:
+            stats = self.hosts.get(host)
+            if stats is not None:
+                bandwidth = stats.bandwidth + self.SMOOTHING * (bandwidth - stats.bandwidth)
+                latency = stats.latency + self.SMOOTHING * (latency - stats.latency)
+            self.hosts[host] = HostStats(bandwidth, latency)
+
+    def get(self, host: str) -> Optional[HostStats]:
+        """Returns the measured bandwidth (bytes per second) and latency (seconds) of the host, if it has any."""
+        with self.lock:
+            return self.hosts.get(host)
@@ -1,7 +1,9 @@
+import time
 import platform
 import logging
 from queue import Queue, Empty
-from threading import Thread, Event
+from threading import Thread, Event, Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import prawcore
 from PyQt5.QtCore import QObject, pyqtSignal
@@ -10,19 +12,25 @@ from praw.models import Redditor
 from sqlalchemy import or_
 
 from DownloaderForReddit.core.download.downloader import Downloader
+from DownloaderForReddit.core.download.async_downloader import AsyncDownloader
+from DownloaderForReddit.core.download import HEADERS, session_pool
 from . import const
 from .content_runner import ContentRunner
+from .poll_scheduler import PollScheduler
+from .submission_record import SubmissionRecord
+from .submittable_creator import SubmittableCreator
 from .submission_filter import SubmissionFilter
 from .runner import verify_run
 from .errors import NON_DOWNLOADABLE
 from ..database.models import DownloadSession, RedditObject, User, Subreddit, Post, Content
 from ..utils import injector, reddit_utils, video_merger
+from ..utils.reddit_rate_limiter import RequestPriority, request_priority
 from ..messaging.message import Message
 from ..version import __version__
 
 
 ExtractionSet = namedtuple('ExtractionSet', 'extraction_type extraction_object significant_id')
-RunPair = namedtuple('RunPair', 'reddit_object_id praw_object')
+RunPair = namedtuple('RunPair', 'reddit_object_id object_type name')
 
 
 class DownloadRunner(QObject):
@@ -34,6 +42,10 @@ class DownloadRunner(QObject):
     setup_progress_bar = pyqtSignal(int)
     update_progress_bar_signal = pyqtSignal()
 
+    SUBREDDIT_INFO_BATCH_SIZE = 100  # the most subreddit names that reddit's info endpoint accepts in one request
+    QUERY_BATCH_SIZE = 500
+    RATE_LIMIT_COOLDOWN = 60  # seconds that new reddit objects are held back for after reddit reports too many requests
+
     def __init__(self, user_id_list=None, subreddit_id_list=None, reddit_object_id_list=None, **kwargs):
         """
         Initializes the download runner with the settings needed to perform the download session.
@@ -65,6 +77,10 @@ class DownloadRunner(QObject):
         self.stopped = False
         self.filter_subreddits = False
         self.validated_subreddits = []
+        # maps the lower cased names of subreddits that were validated in a batch to their praw objects
+        self.prevalidated_subreddits = {}
+        self.lock = Lock()
+        self.rate_limited_until = 0
 
         self.submission_queue = Queue(maxsize=-1)
         self.extractor = None
@@ -74,7 +90,7 @@ class DownloadRunner(QObject):
         self.download_thread = None
 
         self.perpetual_download = self.settings_manager.perpetual_download
-        self.perpetual_queue = Queue(maxsize=-1)
+        self.perpetual_queue = PollScheduler(self.db, *self.get_poll_intervals())
         self.failed_connection_attempts = 0
         self.download_session_id = None
 
@@ -89,6 +105,10 @@ class DownloadRunner(QObject):
             return None
 
     def validate_subreddit(self, subreddit_obj):
+        subreddit = self.prevalidated_subreddits.get(subreddit_obj.name.lower())
+        if subreddit is not None:
+            Message.send_debug(f'{subreddit_obj.name} is valid')
+            return subreddit
         subreddit = self.reddit_instance.subreddit(subreddit_obj.name)
         if self.validate_object(subreddit, subreddit_obj):
             Message.send_debug(f'{subreddit_obj.name} is valid')
@@ -127,20 +147,24 @@ class DownloadRunner(QObject):
         self.remove_forbidden_object.emit(reddit_object.id)
 
     def handle_failed_connection(self):
-        if self.failed_connection_attempts >= 3:
-            self.continue_run = False
-            self.logger.error('Failed connection attempts exceeded.  Ending download session', exc_info=True)
-            Message.send_critical('Failed connection attempts exceeded.  The download session has been canceled.  '
-                                  'Please try the download again later.')
-        else:
-            self.logger.error('Failed to connect to reddit',
-                              extra={'connection_attempts': self.failed_connection_attempts})
-            Message.send_error(f'Failed to connect to reddit.  Connection attempts remaining: '
-                               f'{3 - self.failed_connection_attempts}')
-            self.failed_connection_attempts += 1
+        with self.lock:
+            if not self.continue_run:
+                return
+            if self.failed_connection_attempts >= 3:
+                self.continue_run = False
+                self.logger.error('Failed connection attempts exceeded.  Ending download session', exc_info=True)
+                Message.send_critical('Failed connection attempts exceeded.  The download session has been canceled.  '
+                                      'Please try the download again later.')
+            else:
+                self.logger.error('Failed to connect to reddit',
+                                  extra={'connection_attempts': self.failed_connection_attempts})
+                Message.send_error(f'Failed to connect to reddit.  Connection attempts remaining: '
+                                   f'{3 - self.failed_connection_attempts}')
+                self.failed_connection_attempts += 1
 
     def handle_too_many_requests_error(self, reddit_object):
         self.logger.error('Too many requests error', exc_info=True)
+        self.start_rate_limit_cooldown()
         message = (
             f'Reddit rate limit reached.  {reddit_object.object_type.capitalize()} ({reddit_object.name}) could '
             f'not be validated.  Please try again later.\n'
@@ -149,6 +173,24 @@ class DownloadRunner(QObject):
         )
         Message.send_error(message)
 
+    def start_rate_limit_cooldown(self):
+        """
+        Holds back the reddit objects that have not been started yet until reddit's rate limit has had time to reset.
+        """
+        with self.lock:
+            self.rate_limited_until = max(self.rate_limited_until, time.monotonic() + self.RATE_LIMIT_COOLDOWN)
+
+    def wait_for_rate_limit(self) -> bool:
+        """
+        Blocks while a rate limit cooldown is in effect.  Returns False if the download is stopped while waiting.
+        """
+        while self.continue_run:
+            remaining = self.rate_limited_until - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 0.5))
+        return False
+
     def handle_unknown_error(self, reddit_object):
         self.logger.error('Failed to validate reddit object due to unknown error',
                           extra={'object_type': reddit_object.object_type, 'reddit_object': reddit_object.name},
@@ -185,18 +227,23 @@ class DownloadRunner(QObject):
 
     def run(self):
         self.create_download_session()
+        injector.get_seen_filter().load()
+        # reddit objects may have been deleted since the last session, so ids cached by then can not be trusted
+        SubmittableCreator.identity_cache.clear()
         self.start_extractor()
         self.start_downloader()
         if self.run_unextracted:
             self.run_unextracted_posts()
         if self.run_undownloaded:
             self.run_undownloaded_content()
-        if self.run_new:
-            self.run_download()
-        if self.perpetual_download:
-            self.perpetuate_run()
-        else:
-            self.hold()
+        # every reddit request made by this thread from here on is made to list the submissions of reddit objects
+        with request_priority(RequestPriority.LISTING):
+            if self.run_new:
+                self.run_download()
+            if self.perpetual_download:
+                self.perpetuate_run()
+            else:
+                self.hold()
 
     def log_download_settings(self):
         self.logger.info('Download runner started.', extra={
@@ -210,6 +257,7 @@ class DownloadRunner(QObject):
             'last_update': self.settings_manager.last_update,
             'extraction_thread_count': self.settings_manager.extraction_thread_count,
             'download_thread_count': self.settings_manager.download_thread_count,
+            'download_engine': self.settings_manager.download_engine,
             'multi_part_threshold': self.settings_manager.multi_part_threshold,
             'finish_incomplete_extractions': self.settings_manager.finish_incomplete_extractions_at_session_start,
             'finish_incomplete_downloads': self.settings_manager.finish_incomplete_downloads_at_session_start,
@@ -233,30 +281,101 @@ class DownloadRunner(QObject):
         self.extraction_thread.start()
 
     def start_downloader(self):
-        self.downloader = Downloader(self.download_queue, self.download_session_id, self.stop_run)
+        downloader_class = AsyncDownloader if self.settings_manager.download_engine == 'ASYNC' else Downloader
+        self.downloader = downloader_class(self.download_queue, self.download_session_id, self.stop_run)
         self.download_thread = Thread(target=self.downloader.run)
         self.download_thread.start()
 
     def run_download(self):
         if self.reddit_object_id_list is not None:
-            for ro_id in self.reddit_object_id_list:
-                self.get_reddit_object_submissions(ro_id)
+            self.prevalidate_subreddits(self.reddit_object_id_list)
+            self.run_concurrently(self.get_reddit_object_submissions, self.reddit_object_id_list)
         else:
             if self.user_id_list is not None and self.subreddit_id_list is not None:
                 self.filter_subreddits = True
                 self.validate_subreddit_list()
             if self.user_id_list is not None:
-                for user_id in self.user_id_list:
-                    self.get_user_submissions(user_id)
+                self.run_concurrently(self.get_user_submissions, self.user_id_list)
             else:
-                for subreddit_id in self.subreddit_id_list:
-                    self.get_subreddit_submissions(subreddit_id)
+                self.prevalidate_subreddits(self.subreddit_id_list)
+                self.run_concurrently(self.get_subreddit_submissions, self.subreddit_id_list)
+
+    def get_poll_intervals(self):
+        """Returns the shortest and longest times in seconds between checks of an object in a perpetual download."""
+        min_interval = self.settings_manager.perpetual_min_poll_interval
+        max_interval = self.settings_manager.perpetual_max_poll_interval
+        if not isinstance(min_interval, (int, float)) or min_interval < 0:
+            min_interval = 60
+        if not isinstance(max_interval, (int, float)) or max_interval < min_interval:
+            max_interval = max(21600, min_interval)
+        return min_interval, max_interval
+
+    def run_concurrently(self, method, reddit_object_ids):
+        """
+        Calls the supplied method with each of the supplied reddit object ids from a bounded pool of threads, so that
+        reddit objects are validated and their submissions are listed while other objects are still waiting on reddit.
+        Each thread adds the submissions that it finds to the submission queue as soon as they are listed.
+        :param method: The method that validates a reddit object and queues its submissions.
+        :param reddit_object_ids: The ids of the reddit objects that the method is to be called with.
+        """
+        with ThreadPoolExecutor(self.get_reddit_object_concurrency(), thread_name_prefix='reddit_object') as executor:
+            futures = [executor.submit(self.run_reddit_object, method, ro_id) for ro_id in reddit_object_ids]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception:
+                    self.logger.error('Failed to get reddit object submissions', exc_info=True)
+
+    def run_reddit_object(self, method, reddit_object_id):
+        if self.wait_for_rate_limit():
+            with request_priority(RequestPriority.LISTING):
+                method(reddit_object_id)
+
+    def get_reddit_object_concurrency(self) -> int:
+        concurrency = self.settings_manager.reddit_object_concurrency
+        if not isinstance(concurrency, int) or concurrency < 1:
+            return 4
+        return concurrency
+
+    def prevalidate_subreddits(self, reddit_object_ids):
+        """
+        Validates the subreddits among the supplied reddit object ids through reddit's info endpoint, which looks up to
+        100 subreddits by name in a single request.  Subreddits that reddit returns are recorded as valid so that they
+        are not requested again one at a time.  Subreddits that are not returned, such as those that do not exist or are
+        banned, and private subreddits are left to be validated individually so that the reason that they can not be
+        downloaded is reported.  Reddit has no such endpoint for users, so users are always validated individually.
+        :param reddit_object_ids: The ids of the reddit objects to validate.  Ids that belong to users are ignored.
+        """
+        reddit_object_ids = list(reddit_object_ids)
+        names = []
+        with self.db.get_scoped_session() as session:
+            for start in range(0, len(reddit_object_ids), self.QUERY_BATCH_SIZE):
+                chunk = reddit_object_ids[start:start + self.QUERY_BATCH_SIZE]
+                names.extend(name for name, in session.query(Subreddit.name).filter(Subreddit.id.in_(chunk)))
+        for start in range(0, len(names), self.SUBREDDIT_INFO_BATCH_SIZE):
+            if not self.wait_for_rate_limit():
+                break
+            batch = names[start:start + self.SUBREDDIT_INFO_BATCH_SIZE]
+            try:
+                subreddits = list(self.reddit_instance.info(subreddits=batch))
+            except prawcore.exceptions.TooManyRequests:
+                self.logger.warning('Reddit reports too many requests while validating subreddits', exc_info=True)
+                self.start_rate_limit_cooldown()
+                continue
+            except Exception:
+                self.logger.warning('Failed to validate subreddits in a batch', extra={'subreddit_count': len(batch)},
+                                    exc_info=True)
+                continue
+            for subreddit in subreddits:
+                if getattr(subreddit, 'subreddit_type', None) != 'private':
+                    self.prevalidated_subreddits[subreddit.display_name.lower()] = subreddit
 
     def validate_subreddit_list(self):
         """
         Validates the list of subreddits to make sure they all exist so that the user list can be constrained to the
         list of verified subreddits.
         """
+        self.prevalidate_subreddits(self.subreddit_id_list)
         with self.db.get_scoped_session() as session:
             for subreddit_id in self.subreddit_id_list:
                 if self.continue_run:
@@ -308,56 +427,72 @@ class DownloadRunner(QObject):
             self.handle_submissions(subreddit, sub)
 
     def handle_submissions(self, reddit_object, praw_object):
-        submissions = self.get_submissions(praw_object, reddit_object)
+        """
+        Adds each submission from the supplied praw object that passes the submission filter to the submission queue as
+        soon as it is listed, so that extraction can start while later listing pages are still being requested.  The
+        reddit object's date limit is only moved once the whole listing has been read, so that a listing that is cut
+        short by a stop or a rate limit error does not cause the submissions that were not reached to be skipped by the
+        next session.
+        """
         date_limit = 0
-        for submission in submissions:
-            if submission.created > date_limit:
-                date_limit = submission.created
-            extraction_set = ExtractionSet(extraction_type='SUBMISSION', extraction_object=submission,
-                                           significant_id=reddit_object.id)
-            self.submission_queue.put(extraction_set)
-        if date_limit > 0:
+        found_count = 0
+        complete = False
+        try:
+            for submission in self.iter_submissions(praw_object, reddit_object):
+                if submission.created > date_limit:
+                    date_limit = submission.created
+                record = SubmissionRecord.from_submission(submission, reddit=self.reddit_instance)
+                extraction_set = ExtractionSet(extraction_type='SUBMISSION', extraction_object=record,
+                                               significant_id=reddit_object.id)
+                self.submission_queue.put(extraction_set)
+                found_count += 1
+            complete = self.continue_run
+        except prawcore.exceptions.TooManyRequests:
+            self.handle_listing_rate_limit(reddit_object)
+        if complete and date_limit > 0:
             reddit_object.set_date_limit(date_limit)  # date limit modified after submissions are extracted
         if self.perpetual_download:
-            pair = RunPair(reddit_object_id=reddit_object.id, praw_object=praw_object)
-            self.perpetual_queue.put(pair)
+            pair = RunPair(reddit_object_id=reddit_object.id, object_type=reddit_object.object_type,
+                           name=reddit_object.name)
+            self.perpetual_queue.put(pair, found_count=found_count)
 
-    @verify_run
-    def get_submissions(self, praw_object, reddit_object):
+    def iter_submissions(self, praw_object, reddit_object):
         """
-        Extracts submissions from the supplied praw object's submission generator.  The submissions are passed through
-        the SubmissionFilter before being added for extraction.
+        Yields each submission from the supplied praw object's submission generator that passes the SubmissionFilter,
+        as it is listed.  Listing stops once a submission is older than the reddit object's date limit, or once the
+        download is stopped.
         :param praw_object: The praw object from which submissions are extracted.
         :param reddit_object: The reddit object which the praw object is based on.
-        :return: A list of submissions extracted from reddit.  May be an empty list if no passing submissions are found.
+        :raises TooManyRequests: If reddit's rate limit is reached while listing.
         """
-        submissions = []
-        try:
-            for submission in self.get_raw_submissions(praw_object, reddit_object):
-                passes_date_limit = self.submission_filter.date_filter(submission, reddit_object)
-                # stickied posts are taken first when getting submissions by new, even when they are not the newest
-                # submissions.  So the first filter pass allows stickied posts through so they do not trip the date filter
-                # before more recent posts are allowed through
-                if (submission.pinned or submission.stickied) or passes_date_limit:
-                    if passes_date_limit:
-                        if (not self.filter_subreddits or submission.subreddit.display_name
-                            in self.validated_subreddits) \
+        if not self.continue_run:
+            return
+        for submission in self.get_raw_submissions(praw_object, reddit_object):
+            if not self.continue_run:
+                return
+            passes_date_limit = self.submission_filter.date_filter(submission, reddit_object)
+            # stickied posts are taken first when getting submissions by new, even when they are not the newest
+            # submissions.  So the first filter pass allows stickied posts through so they do not trip the date filter
+            # before more recent posts are allowed through
+            if (submission.pinned or submission.stickied) or passes_date_limit:
+                if passes_date_limit:
+                    if (not self.filter_subreddits or submission.subreddit.display_name
+                        in self.validated_subreddits) \
                             and self.submission_filter.filter_submission(submission, reddit_object):
-                                submissions.append(submission)
-                else:
-                    break
-            return submissions
-        except prawcore.exceptions.TooManyRequests:
-            extra={'object_type': reddit_object.object_type, 'reddit_object': reddit_object.name}
-            self.logger.error('Reddit reports too many requests.  Ending submission extraction',
-                              extra=extra, exc_info=True)
-            message = (
-                f'Reddit rate limit reached. Failed to extract submissions for: {reddit_object.name}.  '
-                f'Please try again shortly.\n'
-                f'For more information, please visit the link below:\n{const.RATE_LIMIT_DOC_URL}'
-            )
-            Message.send_error(message)
-            return submissions
+                        yield submission
+            else:
+                break
+
+    def handle_listing_rate_limit(self, reddit_object):
+        extra = {'object_type': reddit_object.object_type, 'reddit_object': reddit_object.name}
+        self.logger.error('Reddit reports too many requests.  Ending submission extraction', extra=extra, exc_info=True)
+        self.start_rate_limit_cooldown()
+        message = (
+            f'Reddit rate limit reached. Failed to extract submissions for: {reddit_object.name}.  '
+            f'Please try again shortly.\n'
+            f'For more information, please visit the link below:\n{const.RATE_LIMIT_DOC_URL}'
+        )
+        Message.send_error(message)
 
     def get_raw_submissions(self, praw_object, reddit_object):
         """
@@ -401,9 +536,10 @@ class DownloadRunner(QObject):
 
     def perpetuate_run(self):
         """
-        Enters a perpetual loop that recycles reddit objects from the perpetual queue and checks for new posts.  After
-        each object from the perpetual queue is checked, a check is also performed for new reddit objects that may have
-        been added to the session after it began.
+        Enters a perpetual loop that recycles reddit objects from the perpetual queue and checks for new posts.  Each
+        object comes back out of the queue when the poll scheduler expects it to have posted again.  After each object
+        from the perpetual queue is checked, a check is also performed for new reddit objects that may have been added
+        to the session after it began.
         """
         self.logger.debug('Entering perpetual run')
         while self.continue_run:
@@ -413,18 +549,27 @@ class DownloadRunner(QObject):
 
     def run_next_perpetual_pair(self):
         """
-        Extracts a run_pair from the perpetual download queue and checks it for new submissions.
+        Extracts the next run_pair that is due from the perpetual download queue and checks it for new submissions.
         """
         try:
             run_pair = self.perpetual_queue.get(timeout=1)
             if run_pair is not None:
-                reddit_object_id, praw_object = run_pair
                 with self.db.get_scoped_session() as session:
-                    reddit_object = session.query(RedditObject).get(reddit_object_id)
-                    self.handle_submissions(reddit_object, praw_object)
+                    reddit_object = session.query(RedditObject).get(run_pair.reddit_object_id)
+                    self.handle_submissions(reddit_object, self.get_praw_object(run_pair))
         except Empty:
             pass
 
+    def get_praw_object(self, run_pair):
+        """
+        Returns the praw object that the run pair's reddit object is listed from.  Run pairs only hold the name of their
+        reddit object, so that the perpetual queue does not keep praw objects alive, and praw objects are lazy, so
+        making a new one does not make a request.
+        """
+        if run_pair.object_type == 'USER':
+            return self.reddit_instance.redditor(run_pair.name)
+        return self.prevalidated_subreddits.get(run_pair.name.lower()) or self.reddit_instance.subreddit(run_pair.name)
+
     def hold(self):
         """
         Holds the download runner while the content extractor and downloader finish their work loads.  During this time,
@@ -468,7 +613,14 @@ class DownloadRunner(QObject):
             self.download_thread.join()
         except AttributeError:
             pass
+        # the pooled sessions and host headers are shared by the extractors and the downloader, so they are only
+        # released once both have finished
+        HEADERS.clear()
+        session_pool.close_all()
         video_merger.merge_videos()
+        # the session totals are read from the extraction and download statuses, so they must all be written first
+        injector.get_persistence_queue().flush()
+        injector.get_seen_filter().unload()
         with self.db.get_scoped_session() as session:
             dl_session = self.finish_download_session(session)
             self.finish_messages(dl_session)
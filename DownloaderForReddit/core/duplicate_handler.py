@@ -35,11 +35,21 @@ class DuplicateHandler:
         :param content: The content object to verify for duplication.
         :return: True if the provided content is a duplicate, False otherwise.
         """
-        if content.md5_hash is None:
+        return cls.is_duplicate_hash(content.md5_hash)
+
+    @classmethod
+    def is_duplicate_hash(cls, md5_hash) -> bool:
+        """
+        Determines if content with the supplied MD5 hash already exists in the database.
+
+        :param md5_hash: The MD5 hash of the file to verify for duplication.
+        :return: True if content with the hash already exists, False otherwise.
+        """
+        if md5_hash is None:
             return False
         db_handler = injector.get_database_handler()
         with db_handler.get_scoped_session() as session:
-            dup = session.query(Content).filter_by(md5_hash=content.md5_hash).first()
+            dup = session.query(Content.id).filter_by(md5_hash=md5_hash).first()
             return dup is not None
 
     def __init__(self, content: Content):
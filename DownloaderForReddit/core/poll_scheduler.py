@@ -0,0 +1,110 @@
+import math
+import time
+import heapq
+import logging
+import itertools
+from datetime import datetime
+from queue import Empty
+from threading import Condition
+from typing import Optional
+
+from ..database.models import Post
+
+
+class PollScheduler:
+
+    """
+    Decides when each reddit object in a perpetual download is checked for new posts again.  Each object is given a
+    poll interval that starts from how often it has posted in the past, is shortened each time that a check finds new
+    posts, and is lengthened each time that a check finds nothing.  Objects that post often are checked often, while
+    objects that rarely post are left alone and do not spend the api requests of the ones that do.
+
+    Scheduled run pairs are held in a heap keyed by the time they are next due, and are handed out with the same get
+    method as a queue, which raises Empty if no object comes due before the timeout.
+    """
+
+    HISTORY_SIZE = 20
+    SPEED_UP = 0.5  # the interval is multiplied by this when a check finds new posts
+    BACK_OFF = 1.5  # the interval is multiplied by this when a check finds nothing
+
+    def __init__(self, db, min_interval: float = 60, max_interval: float = 21600):
+        """
+        :param db: The database handler that the post history of reddit objects is read with.
+        :param min_interval: The shortest time in seconds that an object may be checked again after.
+        :param max_interval: The longest time in seconds that an object may go unchecked for.
+        """
+        self.logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
+        self.db = db
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.intervals = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = Condition()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def put(self, run_pair, found_count: int = 0) -> None:
+        """
+        Schedules the next check of the reddit object in the supplied run pair.
+        :param run_pair: The RunPair of the reddit object that has just been checked.
+        :param found_count: The number of new posts that the check found.
+        """
+        interval = self.get_next_interval(run_pair.reddit_object_id, found_count)
+        self.logger.debug('Reddit object poll scheduled', extra={'reddit_object_id': run_pair.reddit_object_id,
+                                                                 'found_count': found_count,
+                                                                 'interval': round(interval)})
+        with self.condition:
+            heapq.heappush(self.heap, (time.monotonic() + interval, next(self.counter), run_pair))
+            self.condition.notify()
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Returns the run pair that is due to be checked next, waiting for it to come due if necessary.
+        :param timeout: The longest time in seconds to wait.  None waits until a run pair is due.
+        :raises Empty: If no run pair comes due before the timeout.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if self.heap and self.heap[0][0] <= now:
+                    return heapq.heappop(self.heap)[2]
+                wait = self.heap[0][0] - now if self.heap else None
+                if end is not None:
+                    if now >= end:
+                        raise Empty
+                    wait = end - now if wait is None else min(wait, end - now)
+                self.condition.wait(wait)
+
+    def get_next_interval(self, reddit_object_id: int, found_count: int) -> float:
+        interval = self.intervals.get(reddit_object_id)
+        if interval is None:
+            interval = self.estimate_interval(reddit_object_id)
+        elif found_count > 0:
+            interval *= self.SPEED_UP
+        else:
+            interval *= self.BACK_OFF
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        self.intervals[reddit_object_id] = interval
+        return interval
+
+    def estimate_interval(self, reddit_object_id: int) -> float:
+        """
+        Estimates how often the reddit object should be checked from the dates of its most recent stored posts.  Objects
+        are checked twice in the average time between their posts, which is stretched to the time since their last post
+        once they have gone quiet for longer than that.  Objects without enough history start halfway between the
+        shortest and longest intervals on a logarithmic scale and adapt from there.
+        """
+        with self.db.get_scoped_session() as session:
+            dates = [date for date, in session.query(Post.date_posted)
+                     .filter(Post.significant_reddit_object_id == reddit_object_id)
+                     .filter(Post.date_posted.isnot(None))
+                     .order_by(Post.date_posted.desc())
+                     .limit(self.HISTORY_SIZE)]
+        if len(dates) < 2:
+            return math.sqrt(self.min_interval * self.max_interval)
+        average_gap = (dates[0] - dates[-1]).total_seconds() / (len(dates) - 1)
+        since_last_post = (datetime.now() - dates[0]).total_seconds()
+        return max(average_gap, since_last_post) / 2
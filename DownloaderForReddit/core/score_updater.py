@@ -0,0 +1,123 @@
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+from sqlalchemy import bindparam
+
+from ..database.models import Post
+from ..messaging.message import Message
+from ..utils.reddit_rate_limiter import RequestPriority, request_priority
+
+
+ScoreUpdateResult = namedtuple('ScoreUpdateResult', 'updated unchanged missing failed')
+
+
+class ScoreUpdater:
+
+    """
+    Refreshes the scores of stored posts with reddit's info endpoint, which returns up to 100 submissions per request.
+    A bounded number of requests are made at once at the lowest reddit request priority.  The requests are paced only
+    by the application's rate limiter, which spends reddit's budget on downloads first.  The new scores of each request
+    are written back with a single executemany UPDATE.
+    """
+
+    BATCH_SIZE = 100  # the most fullnames that reddit's info endpoint accepts in one request
+    QUERY_BATCH_SIZE = 500
+
+    def __init__(self, reddit_instance, db, max_concurrency: int = 4, stop_run=None):
+        """
+        :param reddit_instance: The praw Reddit instance (or a stand-in with the same info method) used for requests.
+        :param db: The database handler that the scores are written with.
+        :param max_concurrency: The most info requests that may be in flight at once.
+        :param stop_run: An event that ends the update early when it is set.
+        """
+        self.logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
+        self.reddit_instance = reddit_instance
+        self.db = db
+        self.max_concurrency = max(1, max_concurrency)
+        self.stop_run = stop_run
+
+    @property
+    def continue_run(self) -> bool:
+        return self.stop_run is None or not self.stop_run.is_set()
+
+    def update(self, post_ids: list) -> ScoreUpdateResult:
+        """
+        Updates the scores of the posts with the supplied database ids.
+        :return: The number of posts that were updated, that were unchanged, that reddit did not return, and that could
+                 not be requested.
+        """
+        updated = unchanged = missing = failed = 0
+        batches = self.get_batches(post_ids)
+        with ThreadPoolExecutor(self.max_concurrency, thread_name_prefix='score_update') as executor:
+            futures = {executor.submit(self.fetch_scores, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    scores = future.result()
+                except Exception:
+                    self.logger.error('Failed to request post scores', extra={'post_count': len(batch)},
+                                      exc_info=True)
+                    Message.send_warning(f'Failed to update scores for {len(batch)} posts')
+                    failed += len(batch)
+                    continue
+                if scores is None:
+                    failed += len(batch)
+                    continue
+                changes, batch_missing = self.get_changes(batch, scores)
+                self.write_scores(changes)
+                updated += len(changes)
+                missing += batch_missing
+                unchanged += len(batch) - len(changes) - batch_missing
+                if changes:
+                    Message.send_info(f'{len(changes)} post scores updated')
+        return ScoreUpdateResult(updated, unchanged, missing, failed)
+
+    def get_batches(self, post_ids: list) -> list:
+        """
+        Loads the reddit id and current score of each of the supplied posts and groups them into batches that can each
+        be sent in a single info request.
+        :return: A list of batches, each of which is a list of (post id, reddit id, score) tuples.
+        """
+        rows = []
+        with self.db.get_scoped_session() as session:
+            for start in range(0, len(post_ids), self.QUERY_BATCH_SIZE):
+                chunk = post_ids[start:start + self.QUERY_BATCH_SIZE]
+                rows.extend(session.query(Post.id, Post.reddit_id, Post.score)
+                            .filter(Post.id.in_(chunk), Post.reddit_id.isnot(None)))
+        return [rows[x:x + self.BATCH_SIZE] for x in range(0, len(rows), self.BATCH_SIZE)]
+
+    def fetch_scores(self, batch: list) -> Optional[dict]:
+        """
+        Requests the submissions in the supplied batch from reddit.
+        :return: A dict of the lower cased reddit id of each submission that reddit returned mapped to its score, or
+                 None if the update was stopped before the request was made.
+        """
+        if not self.continue_run:
+            return None
+        fullnames = [f't3_{reddit_id}' for _, reddit_id, _ in batch]
+        with request_priority(RequestPriority.UPDATE):
+            return {submission.id.lower(): submission.score
+                    for submission in self.reddit_instance.info(fullnames=fullnames)}
+
+    @staticmethod
+    def get_changes(batch: list, scores: dict):
+        changes = []
+        missing = 0
+        for post_id, reddit_id, old_score in batch:
+            score = scores.get(reddit_id.lower())
+            if score is None:
+                missing += 1
+            elif score != old_score:
+                changes.append({'post_id': post_id, 'new_score': score})
+        return changes, missing
+
+    def write_scores(self, changes: list) -> None:
+        if not changes:
+            return
+        statement = Post.__table__.update() \
+            .where(Post.__table__.c.id == bindparam('post_id')) \
+            .values(score=bindparam('new_score'))
+        with self.db.get_scoped_update_session() as session:
+            session.execute(statement, changes)
@@ -5,19 +5,19 @@ from queue import Queue
 import prawcore.exceptions
 from praw.models import Submission
 from sqlalchemy.orm.session import Session
-from bs4 import BeautifulSoup, SoupStrainer
 
 from .runner import Runner, verify_run
 from .comment_handler import CommentHandler
 from .errors import Error
 from . import const
-from ..database.models import Post
-from ..extractors.base_extractor import BaseExtractor
+from ..database.models import Post, Comment
+from ..extractors.extractor_index import ExtractorIndex
 from ..extractors.direct_extractor import DirectExtractor
 from ..extractors.self_post_extractor import SelfPostExtractor
 from ..extractors.comment_extractor import CommentExtractor
 from ..messaging.message import Message
 from ..utils import injector
+from ..utils.html_links import get_html_links
 
 
 class SubmissionHandler(Runner):
@@ -32,6 +32,7 @@ class SubmissionHandler(Runner):
         self.download_session_id = download_session_id
         self.session = session
         self.download_queue = download_queue
+        self.persistence_queue = injector.get_persistence_queue()
 
         self.content = []
 
@@ -78,23 +79,22 @@ class SubmissionHandler(Runner):
 
     @verify_run
     def extract_text_links(self, html_text, **kwargs):
-        links = self.parse_html_links(html_text)
-        track_count = len(links) > 1
-        for link in links:
-            if link.has_attr('href'):
-                url = link['href']
-                if track_count:
-                    kwargs['count'] = links.index(link) + 1
-                self.extract_link(url, **kwargs, text_link_extraction=True)
+        anchor_count, links = self.parse_html_links(html_text)
+        track_count = anchor_count > 1
+        for index, url in links:
+            if track_count:
+                kwargs['count'] = index + 1
+            self.extract_link(url, **kwargs, text_link_extraction=True)
 
     def parse_html_links(self, html):
-        return BeautifulSoup(html, parse_only=SoupStrainer('a'), features='html.parser')
+        return get_html_links(html)
 
     @verify_run
     def extract_link(self, url, text_link_extraction=False, **kwargs):
         try:
             extractor_class = self.assign_extractor(url)
-            extractor = extractor_class(self.post, url=url, submission=self.submission, **kwargs)
+            extractor = extractor_class(self.post, url=url, submission=self.submission, stop_run=self.stop_run,
+                                        **kwargs)
             self.finish_extractor(extractor, text_link_extraction=text_link_extraction)
         except Exception as e:
             self.handle_error(e)
@@ -104,27 +104,29 @@ class SubmissionHandler(Runner):
         if extractor is not None:
             extractor.extract_content()
             if not extractor.failed_extraction:
-                self.post.set_extracted()
+                self.persistence_queue.call(Post, self.post.id, 'set_extracted')
             else:
                 if not text_link_extraction:
-                    self.post.set_extraction_failed(extractor.extraction_error, extractor.failed_extraction_message)
+                    self.set_post_extraction_failed(extractor.extraction_error, extractor.failed_extraction_message)
                 else:
                     if comment is None:
-                        self.post.set_extraction_failed(Error.TEXT_LINK_FAILURE,
+                        self.set_post_extraction_failed(Error.TEXT_LINK_FAILURE,
                                                         'Failed to extract link from text post')
                     else:
-                        comment.set_extraction_failed(Error.TEXT_LINK_FAILURE,
-                                                      'Failed to extract links from comment text')
+                        self.persistence_queue.call(Comment, comment.id, 'set_extraction_failed',
+                                                    Error.TEXT_LINK_FAILURE,
+                                                    'Failed to extract links from comment text')
             for content in extractor.extracted_content:
                 self.download_queue.put(content.id)
 
+    def set_post_extraction_failed(self, error, message):
+        self.persistence_queue.call(Post, self.post.id, 'set_extraction_failed', error, message)
+
     @verify_run
     def assign_extractor(self, url):
-        for extractor in BaseExtractor.__subclasses__():
-            if self.settings_manager.extractor_dict[extractor.__name__]:
-                key = extractor.get_url_key()
-                if key is not None and any(x in url.lower() for x in key):
-                    return extractor
+        extractor = ExtractorIndex.get_index(self.settings_manager).match(url)
+        if extractor is not None:
+            return extractor
         if url.lower().endswith(const.ALL_EXT) and self.settings_manager.extractor_dict['DirectExtractor']:
             return DirectExtractor
         return None
@@ -142,19 +144,19 @@ class SubmissionHandler(Runner):
     def handle_unsupported_domain(self, **kwargs):
         message = 'Unsupported domain'
         self.log_error(message, **kwargs)
-        self.post.set_extraction_failed(Error.UNSUPPORTED_DOMAIN, message)
+        self.set_post_extraction_failed(Error.UNSUPPORTED_DOMAIN, message)
         self.output_error(message, **kwargs)
 
     def handle_connection_error(self, **kwargs):
         message = 'Failed to establish a connection to the server'
         self.log_error(message, **kwargs)
-        self.post.set_extraction_failed(Error.CONNECTION_ERROR, message)
+        self.set_post_extraction_failed(Error.CONNECTION_ERROR, message)
         self.output_error(message, **kwargs)
 
     def handle_too_many_requests_error(self, **kwargs):
         message = 'Reddit rate limit reached'
         self.log_error(message, **kwargs)
-        self.post.set_extraction_failed(Error.RATE_LIMIT_ERROR, message)
+        self.set_post_extraction_failed(Error.RATE_LIMIT_ERROR, message)
         output_message = (f'{message}\nFor more information about this error, please see the link below\n'
                           f'{const.RATE_LIMIT_DOC_URL}')
         self.output_error(output_message, **kwargs)
@@ -162,7 +164,7 @@ class SubmissionHandler(Runner):
     def handle_unknown_error(self, **kwargs):
         message = 'Unknown error occurred'
         self.log_error(message, **kwargs)
-        self.post.set_extraction_failed(Error.UNKNOWN_ERROR, message)
+        self.set_post_extraction_failed(Error.UNKNOWN_ERROR, message)
         self.output_error(message, **kwargs)
 
     def log_error(self, message, **kwargs):
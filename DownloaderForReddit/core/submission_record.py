@@ -0,0 +1,80 @@
+from collections import namedtuple
+
+from ..utils import reddit_utils
+
+
+RedditorName = namedtuple('RedditorName', 'name')
+SubredditName = namedtuple('SubredditName', 'display_name')
+
+
+class SubmissionRecord:
+
+    """
+    A compact copy of the parts of a praw submission that are read while a post is created and its content is
+    extracted.  Listed submissions wait in the submission queue as records, which do not keep the submission's full
+    attribute dict.  Records only keep a reference to the reddit instance that listed them, which they all share.
+
+    A field that the listed submission did not have is missing from the record too, so checks such as
+    hasattr(record, 'crosspost_parent') behave as they do for the submission.  Any other attribute, such as the
+    comment forest, is served by a full submission that is requested from reddit the first time that it is needed.
+    """
+
+    FIELDS = ('id', 'url', 'title', 'created', 'domain', 'score', 'over_18', 'is_self', 'selftext', 'selftext_html',
+              'crosspost_parent', 'media', 'media_metadata')
+    __slots__ = FIELDS + ('author', 'subreddit', '_reddit', '_submission')
+
+    def __init__(self, **values):
+        object.__setattr__(self, '_reddit', None)
+        object.__setattr__(self, '_submission', None)
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    @classmethod
+    def from_submission(cls, submission, reddit=None) -> 'SubmissionRecord':
+        """
+        :param submission: The listed praw submission to copy.
+        :param reddit: The reddit instance that listed the submission, which is used to request the full submission if
+                       it is needed.  The submission's own reddit instance is used if none is supplied.
+        """
+        # the submission's attribute dict is read directly because reading a missing attribute from a praw submission
+        # requests the whole submission from reddit
+        data = vars(submission)
+        values = {field: data[field] for field in cls.FIELDS if field in data}
+        values['_reddit'] = reddit if reddit is not None else data.get('_reddit')
+        author = data.get('author')
+        values['author'] = RedditorName(author.name) if author is not None else None
+        subreddit = data.get('subreddit')
+        values['subreddit'] = SubredditName(subreddit.display_name) if subreddit is not None else None
+        return cls(**values)
+
+    def get_submission(self):
+        """
+        Returns the full praw submission that the record was made from, requesting it if it has not been yet.  The
+        submission is made from the reddit instance that listed it, so that no new reddit instance, and with it a new
+        access token request, is made for each record.
+        """
+        submission = self._submission
+        if submission is None:
+            reddit = self._reddit
+            if reddit is None:
+                # only records that were not made from a listed submission have no reddit instance
+                reddit = reddit_utils.get_reddit_instance()
+                object.__setattr__(self, '_reddit', reddit)
+            submission = reddit.submission(id=self.id)
+            object.__setattr__(self, '_submission', submission)
+        return submission
+
+    def __getattr__(self, name):
+        # only called for attributes that are not set on the record
+        if name in SubmissionRecord.__slots__ or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.get_submission(), name)
+
+    def __setattr__(self, name, value):
+        if name in SubmissionRecord.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.get_submission(), name, value)
+
+    def __repr__(self):
+        return f'SubmissionRecord(id={getattr(self, "id", None)!r})'
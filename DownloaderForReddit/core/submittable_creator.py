@@ -1,17 +1,22 @@
 import logging
 from datetime import datetime
-from typing import Optional, Union
+from typing import Optional, Union, List, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.session import Session
 from praw.models import Submission, Comment as PrawComment
 
 from ..database.models import User, Subreddit, Post, Comment
-from ..utils import injector
+from ..database.identity_cache import IdentityCache
+from ..utils import injector, url_utils
 
 
 class SubmittableCreator:
 
     logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
     db = None
+    # maps (model name, lower cased reddit object name) to the id of the user or subreddit with that name.  It is shared
+    # by every extraction thread and is cleared at the start of each download session
+    identity_cache = IdentityCache(max_size=10000)
 
     @classmethod
     def get_db(cls):
@@ -23,9 +28,10 @@ class SubmittableCreator:
     def create_post(cls, submission: Submission, significant_id: int, session: Session, download_session_id: int) \
             -> Optional[Post]:
         post = None
-        if cls.check_duplicate_post_url(submission.url, session):
-            author = cls.get_author(submission, session)
-            subreddit = cls.get_subreddit(submission, session)
+        if cls.check_duplicate_post_url(submission.url, session) and \
+                cls.check_duplicate_post_id(submission.id, session):
+            author_id = cls.get_author_id(submission, session)
+            subreddit_id = cls.get_subreddit_id(submission, session)
 
             post = Post(
                 title=submission.title,
@@ -39,8 +45,8 @@ class SubmittableCreator:
                 text=submission.selftext if submission.selftext != '' else None,
                 text_html=submission.selftext_html,
                 extraction_date=datetime.now(),
-                author=author,
-                subreddit=subreddit,
+                author_id=author_id,
+                subreddit_id=subreddit_id,
                 download_session_id=download_session_id,
                 significant_reddit_object_id=significant_id
             )
@@ -50,53 +56,125 @@ class SubmittableCreator:
 
     @classmethod
     def check_duplicate_post_url(cls, url, session):
-        return session.query(Post.id).filter(Post.url == url).scalar() is None
+        if not injector.get_seen_filter().might_contain_post_url(url_utils.url_hash(url)):
+            return True
+        return not Post.url_exists(url, session)
 
     @classmethod
-    def create_comment(cls, praw_comment: PrawComment, post: Post, session: Session, download_session_id: int,
-                       parent_comment_id: Optional[int] = None):
-        if cls.check_duplicate_comment(praw_comment.id, session):
-            author = cls.get_author(praw_comment, session)
-            subreddit = cls.get_subreddit(praw_comment, session)
-            comment = Comment(
-                author=author,
-                subreddit=subreddit,
-                post=post,
-                reddit_id=praw_comment.id,
-                body=praw_comment.body,
-                body_html=praw_comment.body_html,
-                score=praw_comment.score,
-                date_posted=datetime.fromtimestamp(praw_comment.created),
-                parent_id=parent_comment_id,
-                download_session_id=download_session_id
-            )
-            session.add(comment)
+    def check_duplicate_post_id(cls, reddit_id: str, session: Session):
+        if not injector.get_seen_filter().might_contain_post_id(reddit_id):
+            return True
+        return session.query(Post.id).filter(Post.reddit_id == reddit_id).first() is None
+
+    @classmethod
+    def create_comments(cls, found_comments: List[Tuple[PrawComment, Optional[int]]], post: Post, session: Session,
+                        download_session_id: int) -> List[Tuple[PrawComment, Comment]]:
+        """
+        Stores every supplied comment that is not already in the database with a single bulk insert and one commit.
+        :param found_comments: Tuples of the praw comments that are to be stored and the database ids of their parent
+                               comments, which are None for top level comments.
+        :param post: The post that the comments were made on.
+        :param session: The session that the comments are stored with.
+        :param download_session_id: The id of the download session that the comments were extracted in.
+        :return: Tuples of the praw comments that were stored and their new Comment models, in the order that they were
+                 supplied.
+        """
+        new_comments, rows = cls.make_comment_rows(found_comments, post, session, download_session_id)
+        if not rows:
+            return []
+        try:
+            session.execute(Comment.__table__.insert(), rows)
+            session.commit()
+        except IntegrityError:
+            # another extraction thread stored some of the same comments after they were checked, so the insert is
+            # retried without them rather than losing this level of the comment tree and every level below it
+            session.rollback()
+            cls.logger.debug('Comments were stored by another thread, retrying insert', extra={'post_id': post.id})
+            new_comments, rows = cls.make_comment_rows(found_comments, post, session, download_session_id)
+            if not rows:
+                return []
+            session.execute(Comment.__table__.insert(), rows)
             session.commit()
-            return comment
-        return None
+        comments = {}
+        seen_filter = injector.get_seen_filter()
+        for reddit_ids in cls.chunk([x['reddit_id'] for x in rows]):
+            for comment in session.query(Comment).filter(Comment.reddit_id.in_(reddit_ids)):
+                # the bulk insert does not trigger the insert events that keep the seen filter up to date
+                seen_filter.add_comment(comment)
+                comments[comment.reddit_id.lower()] = comment
+        return [(x, comments[x.id.lower()]) for x in new_comments if x.id.lower() in comments]
 
     @classmethod
-    def check_duplicate_comment(cls, praw_comment_id: str, session: Session):
-        return session.query(Comment).filter(Comment.reddit_id == praw_comment_id).scalar() is None
+    def make_comment_rows(cls, found_comments: List[Tuple[PrawComment, Optional[int]]], post: Post, session: Session,
+                          download_session_id: int) -> Tuple[List[PrawComment], List[dict]]:
+        """
+        Returns the praw comments that are not already stored and the rows that they are to be inserted as.  A comment
+        that is supplied more than once is only included the first time.
+        """
+        seen_ids = cls.get_existing_comment_ids([praw_comment.id for praw_comment, _ in found_comments], session)
+        new_comments = []
+        rows = []
+        for praw_comment, parent_id in found_comments:
+            key = praw_comment.id.lower()
+            if key in seen_ids:
+                continue
+            seen_ids.add(key)
+            new_comments.append(praw_comment)
+            rows.append({
+                'author_id': cls.get_author_id(praw_comment, session),
+                'subreddit_id': cls.get_subreddit_id(praw_comment, session),
+                'post_id': post.id,
+                'reddit_id': praw_comment.id,
+                'body': praw_comment.body,
+                'body_html': praw_comment.body_html,
+                'score': praw_comment.score,
+                'date_posted': datetime.fromtimestamp(praw_comment.created),
+                'parent_id': parent_id,
+                'download_session_id': download_session_id,
+            })
+        return new_comments, rows
 
     @classmethod
-    def get_author(cls, praw_object: Union[Submission, PrawComment], session: Session):
+    def get_existing_comment_ids(cls, reddit_ids: List[str], session: Session) -> set:
+        """Returns the lower cased reddit ids of the supplied ids that already belong to a stored comment."""
+        seen_filter = injector.get_seen_filter()
+        candidates = [x for x in reddit_ids if seen_filter.might_contain_comment_id(x)]
+        existing = set()
+        for chunk in cls.chunk(candidates):
+            existing.update(x.lower() for x, in session.query(Comment.reddit_id).filter(Comment.reddit_id.in_(chunk)))
+        return existing
+
+    @staticmethod
+    def chunk(items: list, size: int = 500):
+        """Splits the supplied list into lists that are small enough to be used as sqlite query parameters."""
+        return [items[x:x + size] for x in range(0, len(items), size)]
+
+    @classmethod
+    def get_author_id(cls, praw_object: Union[Submission, PrawComment], session: Session) -> int:
         try:
-            defaults = {}
-            author = cls.get_db().get_or_create(User, name=praw_object.author.name, defaults=defaults,
-                                                session=session)[0]
+            name = praw_object.author.name
         except AttributeError:
             cls.logger.error('Failed to get author', exc_info=True)
-            author = cls.get_db().get_or_create(User, name='deleted', session=session)[0]
-        return author
+            name = 'deleted'
+        return cls.get_reddit_object_id(User, name, session)
 
     @classmethod
-    def get_subreddit(cls, praw_object: Union[Submission, PrawComment], session: Session):
+    def get_subreddit_id(cls, praw_object: Union[Submission, PrawComment], session: Session) -> int:
         try:
-            defaults = {}
-            subreddit = cls.get_db().get_or_create(Subreddit, name=praw_object.subreddit.display_name,
-                                                   defaults=defaults, session=session)[0]
+            name = praw_object.subreddit.display_name
         except AttributeError:
             cls.logger.error('Failed to get subreddit', exc_info=True)
-            subreddit = cls.get_db().get_or_create(Subreddit, name='deleted', session=session)[0]
-        return subreddit
+            name = 'deleted'
+        return cls.get_reddit_object_id(Subreddit, name, session)
+
+    @classmethod
+    def get_reddit_object_id(cls, model, name: str, session: Session) -> int:
+        """
+        Returns the id of the reddit object of the supplied model with the supplied name, creating it if it does not
+        exist.  Ids are served from the identity cache when possible so that the same authors and subreddits are not
+        queried for again and again.
+        """
+        def load():
+            return cls.get_db().get_or_create(model, name=name, session=session)[0].id
+
+        return cls.identity_cache.get_or_load((model.__name__, name.lower()), load)
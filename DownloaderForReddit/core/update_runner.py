@@ -5,10 +5,13 @@ from threading import Thread, Event
 from PyQt5.QtCore import QObject, pyqtSignal
 
 from .submission_handler import SubmissionHandler
+from .score_updater import ScoreUpdater
 from DownloaderForReddit.core.download.downloader import Downloader
+from DownloaderForReddit.core.download import HEADERS, session_pool
 from .runner import verify_run
 from ..database.models import DownloadSession, Post
 from ..utils import injector, reddit_utils
+from ..utils.reddit_rate_limiter import RequestPriority, request_priority
 from ..messaging.message import Message
 
 
@@ -40,10 +43,11 @@ class UpdateRunner(QObject):
 
     def run(self):
         self.logger.debug('Update runner starting')
-        if self.run_method == 'UPDATE_SCORES':
-            self.update_scores()
-        elif self.run_method == 'UPDATE_COMMENTS':
-            self.update_comments()
+        with request_priority(RequestPriority.UPDATE):
+            if self.run_method == 'UPDATE_SCORES':
+                self.update_scores()
+            elif self.run_method == 'UPDATE_COMMENTS':
+                self.update_comments()
         self.logger.debug('Update runner finished')
 
     def create_download_session(self):
@@ -69,32 +73,29 @@ class UpdateRunner(QObject):
         """
         if self.post_id_list is None:
             with self.db.get_scoped_session() as session:
-                self.post_list = session.query(Post.id) \
-                    .filter(Post.significant_reddit_object_id.in_(self.reddit_object_id_list)).all()
+                self.post_id_list = [x for x, in session.query(Post.id)
+                                     .filter(Post.significant_reddit_object_id.in_(self.reddit_object_id_list))]
 
     @verify_run
     def update_scores(self):
-        """Grabs the score for each post in the post_id_list and updates the post in the database with the new score."""
+        """
+        Requests the current score of every post in the post_id_list from reddit in batches and writes the new scores
+        to the database.
+        """
         self.get_post_ids()
-        for post_id in self.post_id_list:
-            self.extract_score(post_id)
+        updater = ScoreUpdater(self.reddit_instance, self.db, max_concurrency=self.get_score_update_concurrency(),
+                               stop_run=self.stop_run)
+        result = updater.update(self.post_id_list)
+        self.logger.info('Post scores updated', extra=result._asdict())
+        Message.send_info(f'Score update complete\n    Updated: {result.updated}  |  Unchanged: {result.unchanged}  |  '
+                          f'Not found: {result.missing}  |  Failed: {result.failed}')
         self.finished.emit()
 
-    @verify_run
-    def extract_score(self, post_id):
-        with self.db.get_scoped_update_session() as session:
-            try:
-                post = session.query(Post).get(post_id)
-                submission = self.reddit_instance.submission(id=post.reddit_id)
-                old_score = post.score
-                post.score = submission.score
-                Message.send_info(f'{post.title} score updated\n'
-                                  f'    Old score: {old_score}  |  New Score: {post.score}')
-            except:
-                self.logger.error('Failed to update post', extra={'post_id': post.id, 'post_title': post.title,
-                                                                  'author': post.author.name,
-                                                                  'subreddit': post.subreddit.name}, exc_info=True)
-                Message.send_warning(f'Failed to update score for {post.title}')
+    def get_score_update_concurrency(self) -> int:
+        concurrency = self.settings_manager.score_update_concurrency
+        if not isinstance(concurrency, int) or concurrency < 1:
+            return 4
+        return concurrency
 
     @verify_run
     def update_comments(self):
@@ -109,6 +110,8 @@ class UpdateRunner(QObject):
             self.extract_comments(post_id)
         self.download_queue.put(None)
         self.download_thread.join()
+        HEADERS.clear()
+        session_pool.close_all()
         self.finish_download_session()
         self.finished.emit()
 
@@ -3,28 +3,79 @@ from contextlib import contextmanager
 import sqlite3
 from sqlalchemy.ext.declarative import declarative_base
 import sqlalchemy
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, SingletonThreadPool, NullPool
 
 from ..core import const
-from ..utils import system_util
+from ..utils import injector, system_util
+
+
+# The connection pool settings that the database engine can be created with.  The threaded profile keeps a set of open
+# connections that are shared by the GUI, extraction, and download threads, the single thread profile keeps one
+# connection per thread, and the unpooled profile opens a new connection for every session (the behavior of older
+# versions of the application).
+POOL_PROFILES = {
+    'threaded': {'poolclass': QueuePool, 'pool_size': 8, 'max_overflow': 24, 'pool_timeout': 30},
+    'single_thread': {'poolclass': SingletonThreadPool, 'pool_size': 8},
+    'unpooled': {'poolclass': NullPool},
+}
+DEFAULT_POOL_PROFILE = 'threaded'
+
+# Pragmas that are applied to every new connection to a database file.  Write-ahead logging lets readers and the
+# writer work at the same time, which makes it safe to relax synchronous to NORMAL: a power loss may drop the last
+# transactions, but can not corrupt the database.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -64000),  # negative values are in KiB, so 64MB
+    ('mmap_size', 256 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 10000),  # milliseconds
+)
+
+
+def set_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in PRAGMAS:
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
 
 
 class DatabaseHandler:
 
     base = declarative_base()
 
-    def __init__(self, *, in_memory=False):
+    def __init__(self, *, in_memory=False, pool_profile=None):
+        """
+        :param in_memory: True if the database should be created in memory instead of in the application's data
+                          directory.
+        :param pool_profile: The name of the connection pool profile in POOL_PROFILES that the engine is created with.
+                             The profile in the database settings is used if none is supplied.
+        """
         self.database_path = os.path.join(system_util.get_data_directory(), const.DATABASE_NAME)
         self.database_url = f'sqlite:///{self.database_path}'
         if not in_memory:
+            self.pool_profile = self.get_pool_profile(pool_profile)
             self.engine = sqlalchemy.create_engine(self.database_url, echo=False,
-                                                   connect_args={'check_same_thread': False})
+                                                   connect_args={'check_same_thread': False},
+                                                   **POOL_PROFILES[self.pool_profile])
+            event.listen(self.engine, 'connect', set_pragmas)
         else:
+            self.pool_profile = None
             self.engine = sqlalchemy.create_engine('sqlite:///:memory:')
         self.base.metadata.create_all(self.engine)
 
         self.Session = sessionmaker(bind=self.engine)
 
+    @staticmethod
+    def get_pool_profile(pool_profile=None):
+        if pool_profile is None:
+            pool_profile = injector.get_settings_manager().database_pool_profile
+        if not isinstance(pool_profile, str) or pool_profile not in POOL_PROFILES:
+            return DEFAULT_POOL_PROFILE
+        return pool_profile
+
     def get_session(self):
         """Returns a new instance of a database session."""
         return self.Session()
@@ -106,6 +157,8 @@ class DatabaseHandler:
             return instance, True
 
     def vacuum(self):
+        # pooled connections are closed first so that the vacuum does not have to wait on them
+        self.engine.dispose()
         connection = sqlite3.connect(self.database_path)
         connection.execute('VACUUM')
         connection.close()
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Hashable, Optional
+
+
+class IdentityCache:
+
+    """
+    A thread safe, size bounded map of keys to database row ids that discards its least recently used entries once it is
+    full.  It is used to avoid querying for rows, such as the users and subreddits that posts and comments belong to,
+    that are looked up by name over and over again.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        # held while a missing row is looked up or created so that two threads can not both create the same row
+        self.creation_lock = Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Optional[int]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: int) -> None:
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, load: Callable[[], int]) -> int:
+        """
+        Returns the id that is cached for the supplied key.  If there is none, the supplied load function is called to
+        find or create the row and its id is cached.  Only one thread loads at a time, and the cache is checked again
+        once the lock is held, so a row that is being created by one thread is never also created by another.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self.creation_lock:
+            value = self.get(key)
+            if value is None:
+                value = load()
+                self.put(key, value)
+            return value
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
@@ -43,6 +43,13 @@ class Migrator:
                         }
                     )
                     self.set_default_duplicate_handling()
+                elif self.is_behind_head():
+                    cached_revision = self.get_cached_revision()
+                    self.migrate()
+                    self.logger.info(
+                        'Database revision is behind the newest migration.  Migration has been performed',
+                        extra={'cached_revision': cached_revision, 'new_revision': self.get_current_version()}
+                    )
             else:
                 self.session.add(Version(version=version.__version__))
                 self.session.commit()
@@ -79,6 +86,14 @@ class Migrator:
                     current_version = self.get_current_version()
                     self.write_version_to_db(current_version)
 
+    def is_behind_head(self):
+        """
+        Returns True if the alembic revision stored in the database is not the most recent revision script.  Migrations
+        can be added without a change to the application version, so the revision is checked on its own.
+        """
+        cached_revision = self.get_cached_revision()
+        return cached_revision is not None and cached_revision != self.get_current_version()
+
     def get_cached_revision(self):
         """
         Retrieves the "version_num" from the database as is stored by alembic when a migration is performed.
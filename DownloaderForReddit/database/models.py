@@ -1,5 +1,7 @@
+from uuid import uuid4
 from datetime import datetime
-from sqlalchemy import Column, Integer, SmallInteger, String, Boolean, DateTime, ForeignKey, Text, Enum, event
+from sqlalchemy import (Column, Integer, BigInteger, SmallInteger, String, Boolean, DateTime, ForeignKey, Text, Enum,
+                        event)
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.orm.session import Session
 from sqlalchemy.sql import func
@@ -9,7 +11,7 @@ from .model_enums import (CommentDownload, NsfwFilter, LimitOperator, PostSortMe
                           DuplicateControlMethod)
 from ..core.errors import Error
 from ..core import const
-from ..utils import system_util, injector, general_utils
+from ..utils import system_util, injector, general_utils, url_utils
 
 
 Base = DatabaseHandler.base
@@ -50,6 +52,24 @@ class BaseModel(Base):
             return None
 
 
+class UrlLookupMixin:
+
+    """
+    Adds a duplicate url lookup to models with an indexed url_hash column, which holds the hash of the canonical form
+    of the model's url and is kept up to date by a listener on the url attribute.
+    """
+
+    @classmethod
+    def url_exists(cls, url, session):
+        """
+        Returns True if a row with a url that is canonically equal to the supplied url exists.  The url hash index is
+        used to find candidate rows, which are then confirmed by their canonical url in case of a hash collision.
+        """
+        canonical = url_utils.canonical_url(url)
+        candidates = session.query(cls.url).filter(cls.url_hash == url_utils.url_hash(url))
+        return any(url_utils.canonical_url(candidate) == canonical for candidate, in candidates)
+
+
 class Version(BaseModel):
 
     __tablename__ = 'version'
@@ -59,6 +79,19 @@ class Version(BaseModel):
     date_added = Column(DateTime, default=datetime.now())
 
 
+class DatabaseIdentity(BaseModel):
+
+    """
+    Holds a single row with an id that is generated once for each database, so that files kept alongside the database,
+    such as the seen filter snapshot, can tell whether they were made from this database or another one.
+    """
+
+    __tablename__ = 'database_identity'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    uuid = Column(String(32), nullable=False, default=lambda: uuid4().hex)
+
+
 class ListAssociation(BaseModel):
 
     __tablename__ = 'reddit_object_list_association'
@@ -548,7 +581,7 @@ def set_download_session_name(mapper, connection, target):
         target.name = f'Download Session {number}'
 
 
-class Post(BaseModel):
+class Post(BaseModel, UrlLookupMixin):
 
     __tablename__ = 'post'
 
@@ -560,6 +593,7 @@ class Post(BaseModel):
     nsfw = Column(Boolean, default=False)
     reddit_id = Column(String(collation='NOCASE'), unique=True)
     url = Column(String)
+    url_hash = Column(BigInteger, nullable=True, index=True)
 
     is_self = Column(Boolean, default=False)
     text = Column(Text, nullable=True)
@@ -628,20 +662,22 @@ class Post(BaseModel):
     def extraction_date_export(self):
         return self.get_display_datetime(self.extraction_date)
 
-    def set_extracted(self):
+    def set_extracted(self, commit=True):
         self.extracted = True
         self.extraction_date = datetime.now()
         self.extraction_error = None
         self.error_message = None
-        self.get_session().commit()
+        if commit:
+            self.get_session().commit()
 
-    def set_extraction_failed(self, error, message):
+    def set_extraction_failed(self, error, message, commit=True):
         self.extracted = False
         self.extraction_date = datetime.now()
         self.extraction_error = error
         self.error_message = message
         self.retry_attempts += 1
-        self.get_session().commit()
+        if commit:
+            self.get_session().commit()
 
 
 class Comment(BaseModel):
@@ -713,23 +749,25 @@ class Comment(BaseModel):
     def short_post_title(self):
         return self.post.short_title
 
-    def set_extracted(self):
+    def set_extracted(self, commit=True):
         self.extracted = True
         self.extraction_date = datetime.now()
         self.extraction_error = None
         self.error_message = None
-        self.get_session().commit()
+        if commit:
+            self.get_session().commit()
 
-    def set_extraction_failed(self, error,  message):
+    def set_extraction_failed(self, error, message, commit=True):
         self.extracted = False
         self.extraction_date = datetime.now()
         self.extraction_error = error
         self.error_message = message
         self.retry_attempts += 1
-        self.get_session().commit()
+        if commit:
+            self.get_session().commit()
 
 
-class Content(BaseModel):
+class Content(BaseModel, UrlLookupMixin):
 
     __tablename__ = 'content'
 
@@ -738,6 +776,7 @@ class Content(BaseModel):
     download_title = Column(String(collation='NOCASE'), nullable=True)
     extension = Column(String(collation='NOCASE'))
     url = Column(String(collation='NOCASE'))
+    url_hash = Column(BigInteger, nullable=True, index=True)
     directory_path = Column(String(collation='NOCASE'), nullable=True)
     md5_hash = Column(String(), nullable=True, index=True)
 
@@ -805,17 +844,25 @@ class Content(BaseModel):
             download_title = self.download_title
         return system_util.join_path(self.directory_path, f'{download_title}.{self.extension}')
 
-    def set_downloaded(self, download_session_id):
+    def set_downloaded(self, download_session_id, commit=True):
         self.download_session_id = download_session_id
         self.downloaded = True
         self.download_date = datetime.now()
         self.download_error = None
         self.error_message = None
-        self.get_session().commit()
+        if commit:
+            self.get_session().commit()
 
-    def set_download_error(self, error, message):
+    def set_download_error(self, error, message, commit=True):
         self.downloaded = False
         self.download_error = error
         self.error_message = message
         self.retry_attempts = self.retry_attempts + 1
-        self.get_session().commit()
+        if commit:
+            self.get_session().commit()
+
+
+@event.listens_for(Post.url, 'set')
+@event.listens_for(Content.url, 'set')
+def set_url_hash(target, value, oldvalue, initiator):
+    target.url_hash = url_utils.url_hash(value)
@@ -0,0 +1,165 @@
+import time
+import atexit
+import logging
+from collections import namedtuple, OrderedDict
+from queue import Queue, Empty
+from threading import Thread, Event, Lock
+
+from ..utils import injector
+
+
+# A single change to a database row.  If method is None the kwargs are assigned to the row as attribute values,
+# otherwise the named method of the model is called with the args and kwargs and told not to commit.
+Mutation = namedtuple('Mutation', 'model object_id method args kwargs')
+
+
+class PersistenceQueue:
+
+    """
+    Applies status changes to database rows from a single writer thread.  Changes are collected and written in one
+    transaction once enough of them have been collected or the oldest of them has waited for the flush interval.  All of
+    the changes in a batch that are made to the same model are loaded with a single query, and changes to the same row
+    are applied to it in the order that they were made, so that many small status updates from many threads become a
+    handful of commits from one connection.
+
+    Changes are only guaranteed to be in the database once flush has returned, so anything that reads the rows that have
+    been changed, such as totalling a download session, should flush first.
+    """
+
+    BATCH_SIZE = 500
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, db=None, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        """
+        :param db: The database handler whose sessions the changes are written with.  The application's database
+                   handler is used if none is supplied.
+        :param batch_size: The number of changes that will trigger a write.
+        :param flush_interval: The longest time in seconds that a change will wait before it is written.
+        """
+        self.logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
+        self._db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = Queue()
+        self.thread = None
+        self.lock = Lock()
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else injector.get_database_handler()
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name='persistence_queue', daemon=True)
+                self.thread.start()
+                # the writer thread is a daemon, so waiting changes are flushed when the interpreter exits
+                atexit.register(self.stop)
+
+    def update(self, model, object_id: int, **values) -> None:
+        """Queues the assignment of the supplied attribute values to the row of the model with the supplied id."""
+        self.put(Mutation(model, object_id, None, (), values))
+
+    def call(self, model, object_id: int, method: str, *args, **kwargs) -> None:
+        """
+        Queues a call to the named method of the model row with the supplied id.  The method must accept a commit
+        keyword argument, which is passed as False so that the change is committed with the rest of its batch.
+        """
+        self.put(Mutation(model, object_id, method, args, kwargs))
+
+    def put(self, mutation: Mutation) -> None:
+        if self.thread is None:
+            self.start()
+        self.queue.put(mutation)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Blocks until every change that was queued before this call has been written to the database.
+        :param timeout: The longest time in seconds to wait for the write.
+        :return: True if the changes were written before the timeout expired.
+        """
+        if self.thread is None:
+            return True
+        event = Event()
+        self.queue.put(event)
+        return event.wait(timeout)
+
+    def stop(self) -> None:
+        """Writes any changes that are still waiting and stops the writer thread."""
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+            atexit.unregister(self.stop)
+
+    def run(self) -> None:
+        batch = []
+        deadline = None
+        while True:
+            try:
+                timeout = None if not batch else max(0.0, deadline - time.monotonic())
+                item = self.queue.get(timeout=timeout)
+            except Empty:
+                item = 'FLUSH'
+            if isinstance(item, Mutation):
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+            self.write(batch)
+            batch = []
+            if isinstance(item, Event):
+                item.set()
+            elif item is None:
+                break
+
+    def write(self, batch: list) -> None:
+        """
+        Writes the batch in one transaction.  If the transaction fails it is rolled back and the changes are written
+        again one at a time, so that a single bad change only loses itself rather than the rest of its batch.
+        """
+        if not batch:
+            return
+        try:
+            self.write_changes(batch)
+            return
+        except:
+            if len(batch) == 1:
+                self.log_failed_change(batch[0])
+                return
+            self.logger.warning('Failed to write batch of queued changes, writing them individually',
+                                extra={'change_count': len(batch)}, exc_info=True)
+        for mutation in batch:
+            try:
+                self.write_changes([mutation])
+            except:
+                self.log_failed_change(mutation)
+
+    def write_changes(self, mutations: list) -> None:
+        grouped = OrderedDict()
+        for mutation in mutations:
+            grouped.setdefault(mutation.model, []).append(mutation)
+        with self.db.get_scoped_update_session() as session:
+            for model, model_mutations in grouped.items():
+                ids = {x.object_id for x in model_mutations}
+                rows = {x.id: x for x in session.query(model).filter(model.id.in_(ids))}
+                for mutation in model_mutations:
+                    row = rows.get(mutation.object_id)
+                    if row is not None:
+                        self.apply(row, mutation)
+
+    def log_failed_change(self, mutation: Mutation) -> None:
+        self.logger.error('Failed to write queued change to the database',
+                          extra={'model': mutation.model.__name__, 'object_id': mutation.object_id,
+                                 'method': mutation.method}, exc_info=True)
+
+    @staticmethod
+    def apply(row, mutation: Mutation) -> None:
+        if mutation.method is None:
+            for key, value in mutation.kwargs.items():
+                setattr(row, key, value)
+        else:
+            getattr(row, mutation.method)(*mutation.args, commit=False, **mutation.kwargs)
@@ -0,0 +1,292 @@
+import os
+import math
+import struct
+import hashlib
+import logging
+from threading import Lock
+from typing import Optional
+
+from sqlalchemy import event, func
+
+from .models import Post, Comment, Content, DatabaseIdentity
+from ..utils import injector, system_util
+
+
+class BloomFilter:
+
+    """
+    A fixed size set of bits that records which keys have been added to it.  A key that has been added is always
+    reported as possibly present, while a key that has not been added is reported as absent except for a small false
+    positive rate that grows as the filter fills past its capacity.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01, bits: Optional[bytearray] = None,
+                 hash_count: Optional[int] = None):
+        """
+        :param capacity: The number of keys that the filter is sized to hold at the supplied error rate.
+        :param error_rate: The false positive rate of the filter once it holds its capacity.
+        :param bits: The bits of a previously saved filter of the same capacity and error rate.
+        :param hash_count: The number of hashes used by a previously saved filter.
+        """
+        self.capacity = capacity
+        self.bit_count = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.bit_count += -self.bit_count % 8
+        self.hash_count = hash_count or max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray(self.bit_count // 8)
+        self.count = 0
+        self.lock = Lock()
+
+    def get_positions(self, key: bytes):
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + x * second) % self.bit_count for x in range(self.hash_count)]
+
+    def add(self, key: bytes) -> None:
+        positions = self.get_positions(key)
+        with self.lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self.get_positions(key))
+
+
+class SeenFilter:
+
+    """
+    An in memory pre-filter for the duplicate checks that are made while extracting a download session.  It holds the
+    urls and reddit ids of every stored post, comment, and content item in a bloom filter so that the checks for
+    submissions that have never been seen, which are the large majority, can be answered without a database query.
+    Only keys that the filter reports as possibly seen need to be confirmed against the database.
+
+    The filter is built when a download session starts and is saved to a snapshot file when the session finishes.  The
+    snapshot records the highest row ids that it holds, so loading it only requires the rows that have been added since
+    to be read from the database.  It also records the id of the database that it was taken from and the row count of
+    each table, which are checked against the database before the snapshot is used, so that a snapshot taken from a
+    different or restored database is rebuilt rather than caught up.  Until the filter has been loaded every key is
+    reported as possibly seen, so the database is always consulted.
+    """
+
+    SNAPSHOT_NAME = 'seen_filter.bin'
+    SNAPSHOT_MAGIC = b'DFRSEEN2'
+    # magic, capacity, hash count, database id, max post, comment, and content ids, post, comment, and content row
+    # counts
+    SNAPSHOT_HEADER = struct.Struct('<8sQI32sQQQQQQ')
+    MIN_CAPACITY = 100000
+    # the filter is built with room for this many times the number of keys that it starts with
+    GROWTH_FACTOR = 2
+    ERROR_RATE = 0.01
+    QUERY_BATCH_SIZE = 10000
+
+    def __init__(self, db=None, snapshot_path: Optional[str] = None):
+        self.logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
+        self._db = db
+        self.snapshot_path = snapshot_path or os.path.join(system_util.get_data_directory(), self.SNAPSHOT_NAME)
+        self.bloom = None
+        self.max_ids = {Post: 0, Comment: 0, Content: 0}
+        self.row_counts = {Post: 0, Comment: 0, Content: 0}
+        self.database_id = ''
+        self.lock = Lock()
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else injector.get_database_handler()
+
+    @property
+    def loaded(self) -> bool:
+        return self.bloom is not None
+
+    @staticmethod
+    def post_url_key(url_hash: int) -> bytes:
+        return b'p' + url_hash.to_bytes(8, 'big', signed=True)
+
+    @staticmethod
+    def post_id_key(reddit_id: str) -> bytes:
+        # reddit id columns are compared without case
+        return b'P' + reddit_id.lower().encode('utf-8')
+
+    @staticmethod
+    def comment_id_key(reddit_id: str) -> bytes:
+        return b'c' + reddit_id.lower().encode('utf-8')
+
+    @staticmethod
+    def content_url_key(url_hash: int) -> bytes:
+        return b'C' + url_hash.to_bytes(8, 'big', signed=True)
+
+    def might_contain(self, key: Optional[bytes]) -> bool:
+        bloom = self.bloom
+        return bloom is None or key is None or key in bloom
+
+    def might_contain_post_url(self, url_hash: Optional[int]) -> bool:
+        return self.might_contain(self.post_url_key(url_hash) if url_hash is not None else None)
+
+    def might_contain_post_id(self, reddit_id: Optional[str]) -> bool:
+        return self.might_contain(self.post_id_key(reddit_id) if reddit_id is not None else None)
+
+    def might_contain_comment_id(self, reddit_id: Optional[str]) -> bool:
+        return self.might_contain(self.comment_id_key(reddit_id) if reddit_id is not None else None)
+
+    def might_contain_content_url(self, url_hash: Optional[int]) -> bool:
+        return self.might_contain(self.content_url_key(url_hash) if url_hash is not None else None)
+
+    def add_post(self, post: Post) -> None:
+        bloom = self.bloom
+        if bloom is not None:
+            if post.url_hash is not None:
+                bloom.add(self.post_url_key(post.url_hash))
+            if post.reddit_id is not None:
+                bloom.add(self.post_id_key(post.reddit_id))
+
+    def add_comment(self, comment: Comment) -> None:
+        bloom = self.bloom
+        if bloom is not None and comment.reddit_id is not None:
+            bloom.add(self.comment_id_key(comment.reddit_id))
+
+    def add_content(self, content: Content) -> None:
+        bloom = self.bloom
+        if bloom is not None and content.url_hash is not None:
+            bloom.add(self.content_url_key(content.url_hash))
+
+    def load(self) -> None:
+        """
+        Loads the filter from its snapshot and adds the rows that have been stored since the snapshot was taken.  The
+        filter is rebuilt from the database if there is no usable snapshot, the snapshot does not match the database,
+        or the filter has grown past its capacity.
+        """
+        with self.lock:
+            database_id = self.get_database_id()
+            with self.db.get_scoped_session() as session:
+                current_max_ids = {model: session.query(func.max(model.id)).scalar() or 0 for model in self.max_ids}
+                current_counts = {model: session.query(func.count(model.id)).scalar() or 0 for model in self.max_ids}
+                key_count = current_counts[Post] * 2 + current_counts[Comment] + current_counts[Content]
+                snapshot = self.read_snapshot()
+                if snapshot is not None:
+                    bloom, snapshot_database_id, max_ids, row_counts = snapshot
+                    if snapshot_database_id == database_id and key_count <= bloom.capacity and \
+                            self.matches_database(session, max_ids, row_counts, current_max_ids, current_counts):
+                        self.add_rows(session, bloom, max_ids)
+                        self.set_loaded(bloom, database_id, current_max_ids, current_counts)
+                        return
+                    self.logger.info('Seen filter snapshot does not match the database, rebuilding filter')
+                bloom = BloomFilter(max(self.MIN_CAPACITY, key_count * self.GROWTH_FACTOR), self.ERROR_RATE)
+                self.add_rows(session, bloom, {model: 0 for model in self.max_ids})
+                self.set_loaded(bloom, database_id, current_max_ids, current_counts)
+
+    @staticmethod
+    def matches_database(session, max_ids: dict, row_counts: dict, current_max_ids: dict,
+                         current_counts: dict) -> bool:
+        """
+        Checks that the database holds exactly the rows that the snapshot was taken from, plus any rows that have been
+        stored since.  Each table must still contain every row that the snapshot counted, and any rows it has gained
+        must have ids greater than the highest id in the snapshot.
+        """
+        for model in max_ids:
+            if max_ids[model] > current_max_ids[model]:
+                return False
+            added = session.query(func.count(model.id)).filter(model.id > max_ids[model]).scalar() or 0
+            if current_counts[model] - added != row_counts[model]:
+                return False
+        return True
+
+    def get_database_id(self) -> str:
+        """Returns the id of the database, generating it the first time that it is needed."""
+        with self.db.get_scoped_update_session() as session:
+            identity = session.query(DatabaseIdentity).order_by(DatabaseIdentity.id).first()
+            if identity is None:
+                identity = DatabaseIdentity()
+                session.add(identity)
+                session.flush()
+            return identity.uuid
+
+    def set_loaded(self, bloom: BloomFilter, database_id: str, max_ids: dict, row_counts: dict) -> None:
+        self.database_id = database_id
+        self.max_ids = max_ids
+        self.row_counts = row_counts
+        self.bloom = bloom
+        self.logger.debug('Seen filter loaded', extra={'capacity': bloom.capacity, 'bit_count': bloom.bit_count})
+
+    def add_rows(self, session, bloom: BloomFilter, after_ids: dict) -> None:
+        """Adds the keys of every row with an id greater than the supplied ids for its model to the bloom filter."""
+        columns = {
+            Post: ((Post.url_hash, self.post_url_key), (Post.reddit_id, self.post_id_key)),
+            Comment: ((Comment.reddit_id, self.comment_id_key),),
+            Content: ((Content.url_hash, self.content_url_key),),
+        }
+        for model, key_columns in columns.items():
+            last_id = after_ids[model]
+            while True:
+                rows = session.query(model.id, *(column for column, _ in key_columns)) \
+                    .filter(model.id > last_id) \
+                    .order_by(model.id) \
+                    .limit(self.QUERY_BATCH_SIZE) \
+                    .all()
+                if not rows:
+                    break
+                for row in rows:
+                    for value, (_, make_key) in zip(row[1:], key_columns):
+                        if value is not None:
+                            bloom.add(make_key(value))
+                last_id = rows[-1][0]
+
+    def read_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'rb') as file:
+                header = file.read(self.SNAPSHOT_HEADER.size)
+                magic, capacity, hash_count, database_id, post_id, comment_id, content_id, post_count, comment_count, \
+                    content_count = self.SNAPSHOT_HEADER.unpack(header)
+                if magic != self.SNAPSHOT_MAGIC:
+                    return None
+                bloom = BloomFilter(capacity, self.ERROR_RATE, hash_count=hash_count)
+                bits = bytearray(file.read())
+                if len(bits) != len(bloom.bits):
+                    return None
+                bloom.bits = bits
+                return bloom, database_id.rstrip(b'\0').decode('ascii'), \
+                    {Post: post_id, Comment: comment_id, Content: content_id}, \
+                    {Post: post_count, Comment: comment_count, Content: content_count}
+        except (OSError, struct.error, UnicodeDecodeError):
+            return None
+
+    def save(self) -> None:
+        """Writes the filter to its snapshot file so that the next session can load it without a full rebuild."""
+        with self.lock:
+            bloom = self.bloom
+            if bloom is None:
+                return
+            temp_path = f'{self.snapshot_path}.tmp'
+            try:
+                with open(temp_path, 'wb') as file:
+                    with bloom.lock:
+                        file.write(self.SNAPSHOT_HEADER.pack(self.SNAPSHOT_MAGIC, bloom.capacity, bloom.hash_count,
+                                                             self.database_id.encode('ascii'), self.max_ids[Post],
+                                                             self.max_ids[Comment], self.max_ids[Content],
+                                                             self.row_counts[Post], self.row_counts[Comment],
+                                                             self.row_counts[Content]))
+                        file.write(bloom.bits)
+                os.replace(temp_path, self.snapshot_path)
+            except OSError:
+                self.logger.warning('Failed to save seen filter snapshot', exc_info=True)
+
+    def unload(self) -> None:
+        """Saves the filter's snapshot and releases its memory until the next session."""
+        self.save()
+        with self.lock:
+            self.bloom = None
+
+
+@event.listens_for(Post, 'after_insert')
+def add_inserted_post(mapper, connection, target):
+    injector.get_seen_filter().add_post(target)
+
+
+@event.listens_for(Comment, 'after_insert')
+def add_inserted_comment(mapper, connection, target):
+    injector.get_seen_filter().add_comment(target)
+
+
+@event.listens_for(Content, 'after_insert')
+def add_inserted_content(mapper, connection, target):
+    injector.get_seen_filter().add_content(target)
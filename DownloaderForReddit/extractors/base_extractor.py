@@ -22,10 +22,10 @@ You should have received a copy of the GNU General Public License
 along with Downloader for Reddit.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-import requests
 import logging
 
 from ..database import Content, Post
+from ..core.download import session_pool
 from ..core.content_filter import ContentFilter
 from ..core.errors import Error
 from ..utils import injector
@@ -52,6 +52,7 @@ class BaseExtractor:
         self.post = post
         self.submission = kwargs.get('submission', None)
         self.comment = kwargs.get('comment', None)
+        self.stop_run = kwargs.get('stop_run', None)
         self.url = kwargs.get('url', post.url)
         self.user = kwargs.get('user', post.author)
         self.subreddit = kwargs.get('subreddit', post.subreddit)
@@ -115,7 +116,7 @@ class BaseExtractor:
 
     def get_json(self, url):
         """Makes sure that a request is valid and handles without errors if the connection is not successful"""
-        response = requests.get(url, timeout=10)
+        response = session_pool.get(url, timeout=10)
         if response.status_code == 200 and 'json' in response.headers['Content-Type']:
             return response.json()
         else:
@@ -124,13 +125,28 @@ class BaseExtractor:
 
     def get_text(self, url):
         """See get_json"""
-        response = requests.get(url, timeout=10)
+        response = session_pool.get(url, timeout=10)
         if response.status_code == 200 and 'text' in response.headers['Content-Type']:
             return response.text
         else:
             self.handle_failed_extract(error=Error.FAILED_TO_LOCATE, message='Failed to retrieve data from link',
                                        status_code=response.status_code)
 
+    def locate(self, function, *args, timeout=None, stop_run=None):
+        """
+        Calls a function that locates content, such as by parsing a host's html page, through the extraction process
+        pool, which runs it in a worker process if the pool is enabled.  See ExtractionPool.run.
+        """
+        return injector.get_extraction_pool().run(function, *args, timeout=timeout, stop_run=stop_run)
+
+    def make_located_content(self, located_content):
+        """
+        Creates Content from each piece of LocatedContent that was returned by a function called through locate.
+        :param located_content: A list of LocatedContent.
+        """
+        for located in located_content:
+            self.make_content(located.url, located.extension, count=located.count, **(located.title_tokens or {}))
+
     def make_content(self, url, extension, count=None, name_modifier='', **kwargs):
         """
         Takes content elements that are extracted and creates a Content object with the extracted parts and the global
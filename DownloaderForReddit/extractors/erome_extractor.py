@@ -25,6 +25,7 @@ along with Downloader for Reddit.  If not, see <http://www.gnu.org/licenses/>.
 from bs4 import BeautifulSoup
 
 from .base_extractor import BaseExtractor
+from .extraction_pool import LocatedContent
 from ..core.errors import Error
 from ..core import const
 
@@ -45,6 +46,30 @@ def get_content(tag):
         return img_tags[0].get("data-src")
 
 
+def locate_album(html):
+    """
+    Finds the content of an Erome album page.  This is called through the extraction process pool.
+    :param html: The text of the album page.
+    :return: A list of LocatedContent for each item in the album.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    album = soup.find_all(class_filter('media-group'))
+    urls = [get_content(x) for x in album]
+    count = 0
+    if len(urls) > 1:
+        count = 1
+    located = []
+    for url in urls:
+        _, hosted_id = url.rsplit('/', 1)
+        base, extension = hosted_id.rsplit('.', 1)
+        # Image urls have an identifier param after the url, this removes it to get a clean extension
+        if '?' in extension:
+            extension = extension.split('?')[0]
+        located.append(LocatedContent(url, extension, count if count > 0 else None, {'media_id': base}))
+        count += 1
+    return located
+
+
 class EromeExtractor(BaseExtractor):
 
     url_key = ['erome']
@@ -71,17 +96,4 @@ class EromeExtractor(BaseExtractor):
         pass
 
     def extract_album(self):
-        soup = BeautifulSoup(self.get_text(self.url), 'html.parser')
-        album = soup.find_all(class_filter('media-group'))
-        urls = [get_content(x) for x in album]
-        count = 0
-        if len(urls) > 1:
-            count = 1
-        for url in urls:
-            _, hosted_id = url.rsplit('/', 1)
-            base, extension = hosted_id.rsplit('.', 1)
-            # Image urls have an identifier param after the url, this removes it to get a clean extension
-            if '?' in extension:
-                extension = extension.split('?')[0]
-            self.make_content(url, extension, count=count if count > 0 else None, media_id=base)
-            count += 1
+        self.make_located_content(self.locate(locate_album, self.get_text(self.url)))
@@ -0,0 +1,151 @@
+import time
+import logging
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+from threading import Lock, Thread
+
+from ..utils import injector
+
+
+# A piece of content located by an extractor, in a form that can be returned from another process.  The title tokens
+# are the extra key value pairs that are passed to BaseExtractor.make_content for naming the content.
+LocatedContent = namedtuple('LocatedContent', 'url extension count title_tokens', defaults=(None, None))
+
+
+class ExtractionTimeout(Exception):
+    """Raised when a function run through the extraction pool does not finish before its deadline."""
+    pass
+
+
+class ExtractionCancelled(Exception):
+    """Raised when the download session is stopped while waiting for a function run through the extraction pool."""
+    pass
+
+
+class ExtractionPool:
+
+    """
+    Runs the CPU heavy parts of content extraction, such as parsing a host's html page or running yt-dlp, in a pool of
+    worker processes so that extraction threads do not contend for the GIL.  Only plain functions of picklable
+    arguments are run in the pool, and they return picklable results, such as lists of LocatedContent, which the
+    extractor then turns into Content in the main process.
+
+    The pool is optional.  When the extraction_process_count setting is 0, which is the default, functions are called
+    directly in the calling extraction thread.  The worker processes are started the first time that they are needed
+    and are kept for later download sessions.
+    """
+
+    # how often a call that can be cancelled checks whether the download session has been stopped
+    CANCEL_CHECK_INTERVAL = 0.5
+
+    def __init__(self):
+        self.logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
+        self.settings_manager = injector.get_settings_manager()
+        self.lock = Lock()
+        self.executor = None
+        self.process_count = 0
+
+    def get_process_count(self) -> int:
+        process_count = self.settings_manager.extraction_process_count
+        if not isinstance(process_count, int) or process_count < 0:
+            return 0
+        return process_count
+
+    def get_executor(self):
+        """Returns the process pool, starting or resizing it to match the current setting, or None if it is off."""
+        process_count = self.get_process_count()
+        with self.lock:
+            if process_count != self.process_count:
+                self.shutdown_executor()
+                if process_count > 0:
+                    # worker processes are spawned, as forking a process that is running qt and many threads is unsafe
+                    self.executor = ProcessPoolExecutor(max_workers=process_count,
+                                                        mp_context=multiprocessing.get_context('spawn'))
+                self.process_count = process_count
+            return self.executor
+
+    def run(self, function, *args, timeout=None, stop_run=None):
+        """
+        Calls the supplied function with the supplied arguments in a worker process and returns its result.  Any
+        exception that the function raises is raised here.  The function is called in the current thread if the pool
+        is off, or if the function or its arguments can not be sent to a worker process.
+
+        A call with a timeout or a stop event is waited on for no longer than its deadline, or until the event is set.
+        When the pool is off such a call runs in a thread of its own so that it can be left behind.  A call that is
+        left behind is not interrupted, so functions that can hang, such as those that make requests, should also
+        bound their own requests.
+        :param function: A module level function, so that it can be found by name in the worker process.
+        :param args: The picklable arguments to call the function with.
+        :param timeout: The most seconds to wait for the function to return, after which ExtractionTimeout is raised.
+        :param stop_run: An event that, when set, stops the wait and raises ExtractionCancelled.
+        """
+        executor = self.get_executor()
+        if executor is None:
+            return self.call(function, args, timeout, stop_run)
+        try:
+            return self.wait(executor.submit(function, *args), timeout, stop_run)
+        except BrokenProcessPool:
+            self.logger.warning('Extraction process pool stopped unexpectedly, restarting it', exc_info=True)
+            with self.lock:
+                if self.executor is executor:
+                    self.shutdown_executor()
+                    self.process_count = 0
+        except (PicklingError, AttributeError, TypeError) as e:
+            if not self.is_pickling_error(e):
+                raise
+            self.logger.warning('Failed to send extraction to process pool', extra={'function': function.__name__},
+                                exc_info=True)
+        return self.call(function, args, timeout, stop_run)
+
+    def call(self, function, args, timeout, stop_run):
+        """Calls the function in the current thread, or in a thread of its own if the call has a deadline."""
+        if timeout is None and stop_run is None:
+            return function(*args)
+        future = Future()
+
+        def target():
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(function(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+
+        Thread(target=target, name='extraction_call', daemon=True).start()
+        return self.wait(future, timeout, stop_run)
+
+    def wait(self, future, timeout, stop_run):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            wait_time = self.CANCEL_CHECK_INTERVAL if stop_run is not None else None
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0)
+                wait_time = remaining if wait_time is None else min(wait_time, remaining)
+            # waiting on the future rather than on its result tells a deadline apart from a TimeoutError raised by
+            # the function itself
+            wait([future], timeout=wait_time)
+            if future.done():
+                return future.result()
+            if stop_run is not None and stop_run.is_set():
+                future.cancel()
+                raise ExtractionCancelled()
+            if deadline is not None and time.monotonic() >= deadline:
+                future.cancel()
+                raise ExtractionTimeout(f'No result after {timeout} seconds')
+
+    @staticmethod
+    def is_pickling_error(exception) -> bool:
+        # pickle reports objects that it can not send as any of these types, which the function itself may also raise
+        return isinstance(exception, PicklingError) or 'pickle' in str(exception).lower()
+
+    def shutdown_executor(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def shutdown(self):
+        with self.lock:
+            self.shutdown_executor()
+            self.process_count = 0
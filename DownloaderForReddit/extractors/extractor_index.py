@@ -0,0 +1,182 @@
+from collections import deque
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+from .base_extractor import BaseExtractor
+
+
+class AhoCorasick:
+
+    """
+    Finds which of a fixed set of keys appear anywhere in a text with a single pass over the text, no matter how many
+    keys there are.  Each key carries a rank, and a search returns the lowest rank of the keys that were found.
+    """
+
+    def __init__(self, ranked_keys: Dict[str, int]):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.ranks = [None]
+        for key, rank in ranked_keys.items():
+            state = 0
+            for char in key:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][char] = next_state
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.ranks.append(None)
+                state = next_state
+            self.ranks[state] = self.lower(self.ranks[state], rank)
+        self.build_fail_links()
+        self.min_rank = min(ranked_keys.values(), default=None)
+
+    @staticmethod
+    def lower(first: Optional[int], second: Optional[int]) -> Optional[int]:
+        if first is None:
+            return second
+        if second is None:
+            return first
+        return min(first, second)
+
+    def build_fail_links(self):
+        # breadth first, so that the fail link of every state is complete before the states below it are linked
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.transitions[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                # a state also matches every key that ends at the state that its fail link points to
+                self.ranks[next_state] = self.lower(self.ranks[next_state], self.ranks[self.fail[next_state]])
+
+    def search(self, text: str) -> Optional[int]:
+        """Returns the lowest rank of the keys that appear in the supplied text, or None if none of them do."""
+        transitions = self.transitions
+        fail = self.fail
+        ranks = self.ranks
+        best = self.ranks[0]  # only set when an empty key was added, which appears in every text
+        state = 0
+        for char in text:
+            while state and char not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(char, 0)
+            rank = ranks[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best == self.min_rank:
+                    break
+        return best
+
+
+class ExtractorIndex:
+
+    """
+    Selects the extractor for a url in the same way as checking every url key of every enabled extractor, in extractor
+    order, for being a substring of the lower cased url, without making that many substring checks.
+
+    Most urls are matched by their host alone, so the labels and the dotted suffixes of the url's host are first looked
+    up in a map of the url keys that can appear in a host.  A host match is only final once it is certain that no
+    extractor that comes before it matches the url some other way, which is checked directly when only a few keys
+    belong to those extractors.  Every other url is searched with an Aho-Corasick automaton of all of the url keys.
+    """
+
+    # the most keys of earlier extractors that are checked one by one after a host match before the automaton is used
+    SCAN_LIMIT = 32
+
+    _lock = Lock()
+    _cached = None
+    _signature = None
+
+    def __init__(self, extractors: List[type], url_keys: List[Optional[Iterable[str]]]):
+        """
+        :param extractors: The enabled extractors in the order that they take precedence.
+        :param url_keys: The url keys of each of the extractors.
+        """
+        self.extractors = extractors
+        ranked_keys = {}
+        for rank, keys in enumerate(url_keys):
+            for key in keys or ():
+                if key is not None and key not in ranked_keys:
+                    ranked_keys[key] = rank
+        self.host_keys = {key: rank for key, rank in ranked_keys.items() if key and '/' not in key and ':' not in key}
+        by_rank = sorted(ranked_keys.items(), key=lambda item: item[1])
+        self.earlier_keys = [[(key, key_rank) for key, key_rank in by_rank if key_rank < rank]
+                             for rank in range(len(extractors))]
+        self.automaton = AhoCorasick(ranked_keys)
+
+    @classmethod
+    def get_index(cls, settings_manager) -> 'ExtractorIndex':
+        """
+        Returns the index of the currently enabled extractors.  The index is only rebuilt when the enabled extractors
+        change or when the list of supported video sites is updated.
+        """
+        extractor_dict = settings_manager.extractor_dict
+        subclasses = BaseExtractor.__subclasses__()
+        signature = (tuple(subclasses), tuple(extractor_dict.items()), settings_manager.supported_videos_updated)
+        with cls._lock:
+            if cls._cached is None or cls._signature != signature:
+                extractors = [x for x in subclasses if extractor_dict.get(x.__name__, False)]
+                cls._cached = cls(extractors, [x.get_url_key() for x in extractors])
+                # read again because loading the supported video sites updates their timestamp
+                cls._signature = signature[:2] + (settings_manager.supported_videos_updated,)
+            return cls._cached
+
+    def match(self, url: str) -> Optional[type]:
+        """Returns the first enabled extractor with a url key that appears in the supplied url, or None."""
+        text = url.lower()
+        rank = self.match_host(text)
+        if rank is not None:
+            earlier = self.earlier_keys[rank]
+            if len(earlier) <= self.SCAN_LIMIT:
+                for key, key_rank in earlier:
+                    if key in text:
+                        return self.extractors[key_rank]
+                return self.extractors[rank]
+        rank = self.automaton.search(text)
+        return self.extractors[rank] if rank is not None else None
+
+    def match_host(self, text: str) -> Optional[int]:
+        """Returns the lowest rank of the host keys that are equal to a label or a dotted suffix of the url's host."""
+        host = self.get_host(text)
+        if not host:
+            return None
+        host_keys = self.host_keys
+        best = host_keys.get(host)
+        for label in host.split('.'):
+            rank = host_keys.get(label)
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        dot = host.find('.')
+        while dot != -1:
+            rank = host_keys.get(host[dot + 1:])
+            if rank is not None and (best is None or rank < best):
+                best = rank
+            dot = host.find('.', dot + 1)
+        return best
+
+    @staticmethod
+    def get_host(text: str) -> Optional[str]:
+        """
+        Returns the host of the supplied lower cased url.  This is a much cheaper equivalent of urlsplit(url).hostname
+        for the absolute urls that extractors are selected for.
+        """
+        start = text.find('://')
+        if start == -1:
+            return None
+        start += 3
+        end = len(text)
+        for separator in '/?#':
+            position = text.find(separator, start, end)
+            if position != -1:
+                end = position
+        host = text[start:end]
+        if '@' in host:
+            host = host.rsplit('@', 1)[1]
+        if host.startswith('['):
+            return None
+        return host.split(':', 1)[0]
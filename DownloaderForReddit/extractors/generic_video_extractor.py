@@ -23,21 +23,104 @@ along with Downloader for Reddit.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 
-from time import time
+from time import time, monotonic
+from threading import Lock
+from contextlib import contextmanager
+from collections import OrderedDict
 from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadError, ExtractorError
 
 from .base_extractor import BaseExtractor
+from .extraction_pool import LocatedContent, ExtractionTimeout, ExtractionCancelled
 from ..core.errors import Error
 from ..core import const
 from ..local_logging import log_utils
 from ..utils import injector
 
 
+class VideoLocateError(Exception):
+
+    """
+    Raised in place of the yt-dlp error for a url that yt-dlp fails on, as yt-dlp's errors keep a traceback that can
+    not be returned from an extraction worker process.
+    """
+
+    def __init__(self, message, permanent=False):
+        """
+        :param message: The message of the yt-dlp error.
+        :param permanent: True if the url will fail in the same way if it is tried again, such as when no yt-dlp
+                          extractor supports it or the video has been removed.
+        """
+        super().__init__(message, permanent)
+        self.message = message
+        self.permanent = permanent
+
+
+class YoutubeDLPool:
+
+    """
+    Keeps YoutubeDL instances for reuse, as creating one and initializing the site extractors that it uses costs more
+    than many extractions.  A YoutubeDL instance is not safe to share between threads, so each instance is only used
+    by one caller at a time and a new one is created when all of them are busy.
+    """
+
+    # the most seconds that yt-dlp waits on any one request before giving up on it
+    SOCKET_TIMEOUT = 30
+
+    def __init__(self):
+        self.lock = Lock()
+        self.idle = []
+
+    @contextmanager
+    def instance(self):
+        with self.lock:
+            ydl = self.idle.pop() if self.idle else None
+        if ydl is None:
+            ydl = YoutubeDL({'format': 'mp4', 'socket_timeout': self.SOCKET_TIMEOUT})
+        try:
+            yield ydl
+        finally:
+            with self.lock:
+                self.idle.append(ydl)
+
+
+ydl_pool = YoutubeDLPool()
+
+
+def locate_videos(url):
+    """
+    Finds the video, or each video of a playlist, at the supplied url with yt-dlp.  This is called through the
+    extraction process pool.
+    :param url: The url of the video page.
+    :return: A list of LocatedContent for the videos.
+    """
+    try:
+        with ydl_pool.instance() as ydl:
+            result = ydl.extract_info(url, download=False)
+    except DownloadError as e:
+        error = e.exc_info[1] if e.exc_info else None
+        # expected extractor errors are those for unsupported urls and for videos that are removed or private
+        raise VideoLocateError(str(e), permanent=isinstance(error, ExtractorError) and error.expected) from None
+    if 'entries' in result:
+        return [LocatedContent(entry['url'], 'mp4', count) for count, entry in enumerate(result['entries'], start=1)]
+    return [LocatedContent(result['url'], 'mp4')]
+
+
 class GenericVideoExtractor(BaseExtractor):
 
     key = None
     load_time = None
 
+    # urls that yt-dlp could not extract and that are not tried again until their entry expires, mapped to the
+    # monotonic time that the entry expires at
+    failed_urls = OrderedDict()
+    failed_urls_lock = Lock()
+    FAILED_URL_LIMIT = 10000
+    # urls that failed permanently, such as unsupported urls and removed videos, are not tried again for hours
+    FAILED_URL_EXPIRY = 6 * 60 * 60
+    # a url that timed out may only have been slow, so it is only skipped by the posts that link it shortly after
+    TIMED_OUT_URL_EXPIRY = 5 * 60
+
     @classmethod
     def get_url_key(cls):
         if cls.load_time is None or cls.load_time < injector.get_settings_manager().supported_videos_updated:
@@ -52,28 +135,60 @@ class GenericVideoExtractor(BaseExtractor):
                 log_utils.log_proxy(__name__, 'WARNING', message='Failed to load supported video sites')
         return cls.key
 
+    @classmethod
+    def add_failed_url(cls, url, expiry=None):
+        """
+        :param expiry: The seconds until the url may be tried again.  Defaults to the expiry of a permanent failure.
+        """
+        with cls.failed_urls_lock:
+            cls.failed_urls[url] = monotonic() + (expiry if expiry is not None else cls.FAILED_URL_EXPIRY)
+            cls.failed_urls.move_to_end(url)
+            while len(cls.failed_urls) > cls.FAILED_URL_LIMIT:
+                cls.failed_urls.popitem(last=False)
+
+    @classmethod
+    def has_failed(cls, url) -> bool:
+        with cls.failed_urls_lock:
+            expires = cls.failed_urls.get(url)
+            if expires is None:
+                return False
+            if expires < monotonic():
+                del cls.failed_urls[url]
+                return False
+            return True
+
     def __init__(self, post, **kwargs):
         super().__init__(post, **kwargs)
 
+    def get_timeout(self):
+        timeout = self.settings_manager.video_extraction_timeout
+        if not isinstance(timeout, (int, float)) or isinstance(timeout, bool) or timeout <= 0:
+            return 120
+        return timeout
+
     def extract_content(self):
+        message = 'Failed to locate content'
+        if self.has_failed(self.url):
+            message = 'Failed to locate content on an earlier attempt'
+            self.handle_failed_extract(error=Error.FAILED_TO_LOCATE, message=message, log=False,
+                                       extractor_error_message=message, failed_domain=self.post.domain)
+            return
         try:
-            # TODO: need way to kill this when session is terminated
-            with YoutubeDL({'format': 'mp4'}) as ydl:
-                result = ydl.extract_info(self.url, download=False)
-            if 'entries' in result:
-                self.extract_playlist(result['entries'])
-            else:
-                self.extract_single_video(result)
+            located = self.locate(locate_videos, self.url, timeout=self.get_timeout(), stop_run=self.stop_run)
+            self.make_located_content(located)
+        except ExtractionCancelled:
+            self.handle_failed_extract(error=Error.DOWNLOAD_STOPPED, message='Download stopped before extraction',
+                                       log=False)
+        except ExtractionTimeout:
+            self.add_failed_url(self.url, expiry=self.TIMED_OUT_URL_EXPIRY)
+            message = 'Timed out locating content'
+            self.handle_failed_extract(error=Error.FAILED_TO_LOCATE, message=message, extractor_error_message=message,
+                                       failed_domain=self.post.domain)
+        except VideoLocateError as e:
+            if e.permanent:
+                self.add_failed_url(self.url)
+            self.handle_failed_extract(error=Error.FAILED_TO_LOCATE, message=message, extractor_error_message=message,
+                                       failed_domain=self.post.domain, ytdl_error=e.message)
         except:
-            message = 'Failed to locate content'
             self.handle_failed_extract(error=Error.FAILED_TO_LOCATE, message=message, extractor_error_message=message,
                                        failed_domain=self.post.domain)
-
-    def extract_single_video(self, entry):
-        self.make_content(entry['url'], 'mp4')
-
-    def extract_playlist(self, playlist):
-        count = 1
-        for entry in playlist:
-            self.make_content(entry['url'], 'mp4', count=count)
-            count += 1
@@ -1,10 +1,88 @@
+import json
+import base64
+import logging
+from time import time, monotonic
+from threading import Lock
+
 import redgifs
+from redgifs.errors import HTTPException
 
 from .base_extractor import BaseExtractor
 from ..core.errors import Error
 from ..core.download import HEADERS
 
 
+class RedgifsClient:
+
+    """
+    A redgifs api client that is shared by every extraction thread, so that a temporary token is requested once and
+    reused until it expires rather than once for every gif.  The token is requested again when it is about to expire,
+    or sooner if redgifs rejects it.
+    """
+
+    HOST = 'redgifs.com'
+    # used when the expiry can not be read from the token itself, temporary tokens are issued for a day
+    DEFAULT_TOKEN_LIFETIME = 20 * 60 * 60
+    # how long before the token expires that it is replaced
+    EXPIRY_MARGIN = 5 * 60
+
+    def __init__(self):
+        self.logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
+        self.lock = Lock()
+        self.api = None
+        self.token = None
+        self.expires = 0
+
+    def get_api(self):
+        """Returns the shared api with a current token, logging in first if there is no token or it has expired."""
+        with self.lock:
+            if self.api is None or monotonic() >= self.expires:
+                self.login()
+            return self.api, self.token
+
+    def login(self):
+        if self.api is None:
+            self.api = redgifs.API()
+        self.api.login()
+        self.token = self.api.http.headers.get('authorization')
+        self.expires = monotonic() + self.get_token_lifetime(self.token) - self.EXPIRY_MARGIN
+        self.logger.debug('Logged in to redgifs')
+
+    def get_token_lifetime(self, token) -> float:
+        """Returns the seconds until the supplied bearer token expires, read from the token's expiry claim."""
+        try:
+            payload = token.split(' ')[-1].split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            return float(claims['exp']) - time()
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            return self.DEFAULT_TOKEN_LIFETIME
+
+    def invalidate(self, token):
+        """Marks the supplied token as expired, unless another thread has already replaced it."""
+        with self.lock:
+            if self.token == token:
+                self.expires = 0
+
+    def get_gif(self, gif_id):
+        api, token = self.get_api()
+        try:
+            return api.get_gif(gif_id)
+        except HTTPException as e:
+            if e.status != 401:
+                raise
+            self.invalidate(token)
+            api, token = self.get_api()
+            return api.get_gif(gif_id)
+
+    def get_headers(self) -> dict:
+        """Returns a copy of the headers that the api sends, which media downloads from redgifs also need."""
+        with self.lock:
+            return dict(self.api.http.headers) if self.api is not None else {}
+
+
+redgifs_client = RedgifsClient()
+
+
 class RedgifsExtractor(BaseExtractor):
 
     url_key = ['redgifs']
@@ -48,13 +126,11 @@ class RedgifsExtractor(BaseExtractor):
 
     def extract_content(self):
         try:
-            api = redgifs.API()
-            api.login()
-            response = api.get_gif(self.get_gif_id())
+            response = redgifs_client.get_gif(self.get_gif_id())
             url = self.get_download_url(response)
             content = self.make_content(url, 'mp4')
             if content is not None:
-                HEADERS[content.id] = api.http.headers
+                HEADERS[RedgifsClient.HOST] = redgifs_client.get_headers()
         except:
             message = 'Failed to extract content from redgifs'
             self.handle_failed_extract(error=Error.FAILED_TO_LOCATE, message=message, exetractor_error_message=message)
@@ -25,10 +25,29 @@ along with Downloader for Reddit.  If not, see <http://www.gnu.org/licenses/>.
 from bs4 import BeautifulSoup
 
 from .base_extractor import BaseExtractor
+from .extraction_pool import LocatedContent
 from ..core.errors import Error
 from ..core import const
 
 
+def locate_single(html, vidble_id, vidble_base):
+    """
+    Finds the image on a Vidble single image page.  This is called through the extraction process pool.
+    :param html: The text of the image page.
+    :param vidble_id: The id of the image, which is the name of the downloadable file.
+    :param vidble_base: The base url of the Vidble site.
+    :return: LocatedContent for the image, or None if the image has no source.
+    """
+    # There should only be one image, and only the extension of its file name is needed
+    img = BeautifulSoup(html, 'html.parser').find_all('img')[0]
+    link = img.get('src')
+    if link is None:
+        return None
+    base, extension = link.rsplit('.', 1)
+    url = f'{vidble_base}/{vidble_id}.{extension}'
+    return LocatedContent(url, extension, title_tokens={'media_id': vidble_id})
+
+
 class VidbleExtractor(BaseExtractor):
 
     url_key = ['vidble']
@@ -56,21 +75,11 @@ class VidbleExtractor(BaseExtractor):
             message = 'Failed to locate content'
             self.handle_failed_extract(error=Error.FAILED_TO_LOCATE, message=message, extractor_error_message=message)
 
-    def get_imgs(self):
-        soup = BeautifulSoup(self.get_text(self.url), 'html.parser')
-        return soup.find_all('img')
-
     def extract_single(self):
         domain, vidble_id = self.url.rsplit('/', 1)
-        # There should only be one image
-        img = self.get_imgs()[0]
-        # We only need to get the filename from the image
-        link = img.get('src')
-        if link is not None:
-            base, extension = link.rsplit('.', 1)
-            file_name = "{}.{}".format(vidble_id, extension)
-            url = self.vidble_base + '/' + file_name
-            self.make_content(url, extension, media_id=vidble_id)
+        located = self.locate(locate_single, self.get_text(self.url), vidble_id, self.vidble_base)
+        if located is not None:
+            self.make_located_content([located])
 
     def extract_album(self):
         # We will use the undocumented API specified here:
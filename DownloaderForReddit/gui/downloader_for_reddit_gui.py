@@ -1310,6 +1310,8 @@ class DownloaderForRedditGUI(QMainWindow, Ui_MainWindow):
         self.run_timer.stop()
         self.save_main_window_settings()
         self.settings_manager.save_all()
+        if injector.extraction_pool is not None:
+            injector.extraction_pool.shutdown()
         super().close()
 
     def save_main_window_settings(self):
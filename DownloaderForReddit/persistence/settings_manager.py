@@ -34,11 +34,26 @@ class SettingsManager:
         self.rename_invalidated_download_folders = self.get('core', 'rename_invalidated_download_folders', True)
         self.invalid_rename_format = self.get('core', 'invalid_rename_format', '%[dir_name](deleted)')
         self.extraction_thread_count = self.get('core', 'extraction_thread_count', 4)
+        # worker processes that parse host pages and run yt-dlp for the extraction threads, 0 to parse in the threads
+        self.extraction_process_count = self.get('core', 'extraction_process_count', 0)
+        self.video_extraction_timeout = self.get('core', 'video_extraction_timeout', 120)  # seconds per video url
         self.download_thread_count = self.get('core', 'download_thread_count', 4)
         self.use_multi_part_downloader = self.get('core', 'use_multi_part_downloader', True)
         self.multi_part_threshold = self.get('core', 'multi_part_threshold', 3 * 1024 * 1024)
         self.multi_part_chunk_size = self.get('core', 'multi_part_chunk_size', 1024 * 1024)
         self.multi_part_thread_count = self.get('core', 'multi_part_thread_count', 4)
+        self.connection_pool_size = self.get('core', 'connection_pool_size', 10)
+        self.download_engine_choices = ['THREAD', 'ASYNC']
+        self.download_engine = self.get('core', 'download_engine', 'THREAD')
+        self.async_download_concurrency = self.get('core', 'async_download_concurrency', 100)
+        self.score_update_concurrency = self.get('core', 'score_update_concurrency', 4)  # concurrent info requests
+        # number of users and subreddits that are validated and listed at once at the start of a download session
+        self.reddit_object_concurrency = self.get('core', 'reddit_object_concurrency', 4)
+        # Per host download limits.  Hosts match their own sub-domains.  A default limit of None allows any single host
+        # to use every download thread when there is no work from other hosts waiting.
+        self.download_host_default_limit = self.get('core', 'download_host_default_limit', None)
+        self.download_host_limits = self.get('core', 'download_host_limits', {'imgur.com': 2})
+        self.download_host_rate_limits = self.get('core', 'download_host_rate_limits', {})  # downloads per second
         self.download_on_add = self.get('core', 'download_on_add', False)
         self.finish_incomplete_extractions_at_session_start = \
             self.get('core', 'finish_incomplete_extractions_at_session_start', False)
@@ -47,6 +62,9 @@ class SettingsManager:
         self.download_reddit_hosted_videos = self.get('download_defaults', 'download_reddit_hosted_videos', True)
 
         self.perpetual_download = self.get('core', 'perpetual_download', False)
+        # bounds in seconds of how often each reddit object is checked for new posts during a perpetual download
+        self.perpetual_min_poll_interval = self.get('core', 'perpetual_min_poll_interval', 60)
+        self.perpetual_max_poll_interval = self.get('core', 'perpetual_max_poll_interval', 21600)
         self.cascade_list_changes = self.get('core', 'cascade_list_changes', False)
         self.reddit_access_token = self.get('core', 'reddit_access_token', None)
         self.reddit_access = self.get('core', 'reddit_access', None)
@@ -200,6 +218,8 @@ class SettingsManager:
         self.post_query_limit = self.get('database', 'post_query_limit', 50)
         self.content_query_limit = self.get('database', 'content_query_limit', 10)
         self.comment_query_limit = self.get('database', 'comment_query_limit', 60)
+        # one of the profiles in database_handler.POOL_PROFILES
+        self.database_pool_profile = self.get('database', 'database_pool_profile', 'threaded')
         # endregion
 
         # region Notification Defaults
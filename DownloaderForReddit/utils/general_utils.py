@@ -60,11 +60,13 @@ def open_post_in_browser(post):
         print(e)
 
 
-def ensure_content_download_path(content):
+def ensure_content_download_path(content, reserved_paths=None):
     """
     Checks the content's full file path to make sure there are no naming conflicts.  If there are, a number is
     incremented and appended to the contents title until a naming conflict no longer exists.
     :param content: The Content item who's path is to be checked.
+    :param reserved_paths: An optional collection of paths that have been claimed by downloads that have not yet
+                           created their files.  These paths are treated as conflicts as well.
     """
     try:
         system_util.create_directory(content.directory_path)
@@ -74,7 +76,7 @@ def ensure_content_download_path(content):
     clean_title = system_util.clean(content.title)
     download_title = clean_title
     path = content.get_full_file_path(download_title)
-    while os.path.exists(path):
+    while os.path.exists(path) or (reserved_paths is not None and path in reserved_paths):
         download_title = f'{clean_title}({unique_count})'
         path = content.get_full_file_path(download_title)
         unique_count += 1
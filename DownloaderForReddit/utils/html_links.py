@@ -0,0 +1,49 @@
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+
+class AnchorParser(HTMLParser):
+
+    """
+    Collects the anchors of an html fragment in a single pass without building a document tree.  Every anchor is
+    counted, in document order, whether or not it has an href, so that the index of each link is its position among
+    all of the anchors in the text.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.anchor_count = 0
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            self.add_anchor(attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == 'a':
+            self.add_anchor(attrs)
+
+    def add_anchor(self, attrs):
+        for name, value in attrs:
+            if name == 'href':
+                # attribute values are unescaped by the parser, and an href without a value is an empty href
+                self.links.append((self.anchor_count, value or ''))
+                break
+        self.anchor_count += 1
+
+
+def get_html_links(html_text: Optional[str]) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Finds the links in the supplied html text, such as the body_html of a reddit self post or comment.
+
+    :param html_text: The html text to search for links.
+    :return: The number of anchors in the text, and an (index, href) pair for each anchor that has an href, in the
+        order that they appear in the text.
+    """
+    # most comments do not contain a link, and those are not parsed at all
+    if not html_text or ('<a' not in html_text and '<A' not in html_text):
+        return 0, []
+    parser = AnchorParser()
+    parser.feed(html_text)
+    parser.close()
+    return parser.anchor_count, parser.links
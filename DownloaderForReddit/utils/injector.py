@@ -25,6 +25,10 @@ from queue import Queue
 
 settings_manager = None
 database_handler = None
+persistence_queue = None
+seen_filter = None
+reddit_rate_limiter = None
+extraction_pool = None
 message_queue = None
 scheduler = None
 
@@ -45,6 +49,38 @@ def get_database_handler():
     return database_handler
 
 
+def get_persistence_queue():
+    global persistence_queue
+    if persistence_queue is None:
+        from ..database.persistence_queue import PersistenceQueue
+        persistence_queue = PersistenceQueue()
+    return persistence_queue
+
+
+def get_seen_filter():
+    global seen_filter
+    if seen_filter is None:
+        from ..database.seen_filter import SeenFilter
+        seen_filter = SeenFilter()
+    return seen_filter
+
+
+def get_reddit_rate_limiter():
+    global reddit_rate_limiter
+    if reddit_rate_limiter is None:
+        from .reddit_rate_limiter import RedditRateLimiter
+        reddit_rate_limiter = RedditRateLimiter()
+    return reddit_rate_limiter
+
+
+def get_extraction_pool():
+    global extraction_pool
+    if extraction_pool is None:
+        from ..extractors.extraction_pool import ExtractionPool
+        extraction_pool = ExtractionPool()
+    return extraction_pool
+
+
 def get_message_queue():
     global message_queue
     if message_queue is None:
@@ -0,0 +1,176 @@
+import time
+import heapq
+import logging
+import itertools
+from enum import IntEnum
+from threading import Condition, local
+from contextlib import contextmanager
+from typing import Mapping, Optional
+
+import prawcore
+
+from . import injector
+
+
+class RequestPriority(IntEnum):
+
+    """The order in which waiting reddit api requests are granted.  Lower values are granted first."""
+
+    INTERACTIVE = 0  # requests that the user is waiting on, such as checking a name that is being added
+    LISTING = 1  # validating reddit objects and listing their submissions
+    EXTRACTION = 2  # comments and the submissions that extractors look up
+    UPDATE = 3  # score and comment updates of stored posts
+
+
+_thread_state = local()
+
+
+@contextmanager
+def request_priority(priority: RequestPriority):
+    """
+    Sets the priority of every reddit api request made by the current thread inside the context.  Contexts may be
+    nested, in which case the innermost priority is used.
+    """
+    stack = getattr(_thread_state, 'priorities', None)
+    if stack is None:
+        stack = _thread_state.priorities = []
+    stack.append(priority)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+def get_request_priority() -> RequestPriority:
+    stack = getattr(_thread_state, 'priorities', None)
+    return stack[-1] if stack else RequestPriority.EXTRACTION
+
+
+class RedditRateLimiter:
+
+    """
+    Spends reddit's api request budget across every part of the application that makes requests.  The budget that is
+    left and the time until it resets are read from the X-Ratelimit headers of each response, and the remaining
+    requests are spread evenly over the time that is left so that the budget is used at a steady rate rather than in
+    bursts that end in rate limit errors.  Requests that are waiting for their turn are granted in priority order, and
+    in the order that they were made within the same priority.
+    """
+
+    # used to pace requests until the first response with rate limit headers has been received
+    DEFAULT_REQUESTS_PER_MINUTE = 100
+    # the time that requests are held back for when reddit reports too many requests without saying for how long
+    DEFAULT_BACK_OFF = 60
+
+    def __init__(self, default_requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE):
+        self.logger = logging.getLogger(f'DownloaderForReddit.{__name__}')
+        self.default_interval = 60 / default_requests_per_minute if default_requests_per_minute > 0 else 0
+        self.condition = Condition()
+        self.waiting = []
+        self.counter = itertools.count()
+        self.next_request_time = 0
+        self.remaining = None
+        self.reset_time = None
+
+    def get_interval(self, now: float) -> float:
+        """Returns the time that should pass between the start of two requests to use the budget evenly."""
+        if self.remaining is None or self.reset_time is None or now >= self.reset_time:
+            return self.default_interval
+        return (self.reset_time - now) / max(self.remaining, 1)
+
+    def acquire(self, priority: Optional[RequestPriority] = None) -> None:
+        """
+        Blocks until a request of the supplied priority may be made.  The priority of the calling thread is used if none
+        is supplied.
+        """
+        if priority is None:
+            priority = get_request_priority()
+        ticket = (priority, next(self.counter))
+        start = time.monotonic()
+        with self.condition:
+            heapq.heappush(self.waiting, ticket)
+            try:
+                while True:
+                    if self.waiting[0] != ticket:
+                        self.condition.wait()
+                        continue
+                    now = time.monotonic()
+                    delay = self.next_request_time - now
+                    if delay <= 0:
+                        break
+                    self.condition.wait(delay)
+            except BaseException:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+                raise
+            heapq.heappop(self.waiting)
+            self.next_request_time = now + self.get_interval(now)
+            if self.remaining is not None:
+                # counted now so that requests that are still in flight are not spent twice
+                self.remaining = max(self.remaining - 1, 0)
+            self.condition.notify_all()
+        waited = time.monotonic() - start
+        if waited > 5:
+            self.logger.debug('Reddit request delayed by rate limit', extra={'priority': priority.name,
+                                                                             'seconds_waited': round(waited, 2)})
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Updates the remaining budget from the rate limit headers of a reddit response."""
+        try:
+            remaining = float(headers['x-ratelimit-remaining'])
+            seconds_to_reset = int(headers['x-ratelimit-reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+        with self.condition:
+            now = time.monotonic()
+            self.remaining = remaining
+            self.reset_time = now + seconds_to_reset
+            if remaining < 1:
+                self.next_request_time = max(self.next_request_time, self.reset_time)
+            self.condition.notify_all()
+
+    def back_off(self, seconds: Optional[float] = None) -> None:
+        """Holds back every request for the supplied number of seconds after reddit reports too many requests."""
+        with self.condition:
+            now = time.monotonic()
+            if seconds is None:
+                seconds = self.reset_time - now if self.reset_time is not None and self.reset_time > now else \
+                    self.DEFAULT_BACK_OFF
+            self.next_request_time = max(self.next_request_time, now + seconds)
+            self.remaining = 0
+            self.condition.notify_all()
+        self.logger.warning('Reddit reports too many requests.  Holding back requests',
+                            extra={'seconds': round(seconds, 2)})
+
+
+class ScheduledRequestor(prawcore.Requestor):
+
+    """
+    A praw requestor that makes every api request through the application's reddit rate limiter.  Requests that reddit
+    answers with a too many requests error are held back and made again, so that callers are slowed down rather than
+    failed.  Requests that are not made to the api, such as those made to obtain access tokens, are not limited.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    def request(self, *args, timeout=None, **kwargs):
+        url = args[1] if len(args) > 1 else kwargs.get('url', '')
+        if not str(url).startswith(self.oauth_url):
+            return super().request(*args, timeout=timeout, **kwargs)
+        limiter = injector.get_reddit_rate_limiter()
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            limiter.acquire()
+            response = super().request(*args, timeout=timeout, **kwargs)
+            limiter.update(response.headers)
+            if response.status_code != 429 or attempt == self.MAX_ATTEMPTS:
+                return response
+            limiter.back_off(self.get_retry_after(response))
+
+    @staticmethod
+    def get_retry_after(response) -> Optional[float]:
+        for header in ('retry-after', 'x-ratelimit-reset'):
+            try:
+                return float(response.headers[header])
+            except (KeyError, TypeError, ValueError):
+                pass
+        return None
@@ -30,6 +30,7 @@ from collections import namedtuple
 from cryptography.fernet import Fernet
 
 from . import system_util
+from .reddit_rate_limiter import ScheduledRequestor, RequestPriority, request_priority
 from ..core import const
 from ..messaging.message import Message
 from ..version import __version__
@@ -56,9 +57,11 @@ def get_reddit_instance():
     global connection_is_authorized
     if _token is not None:
         connection_is_authorized = True
-        return praw.Reddit(client_id=CLIENT_ID, user_agent=USER_AGENT, client_secret=None, refresh_token=_token)
+        return praw.Reddit(client_id=CLIENT_ID, user_agent=USER_AGENT, client_secret=None, refresh_token=_token,
+                           requestor_class=ScheduledRequestor)
     connection_is_authorized = False
-    return praw.Reddit(client_id=CLIENT_ID, user_agent=USER_AGENT, client_secret=None, redirect_uri=REDIRECT_URL)
+    return praw.Reddit(client_id=CLIENT_ID, user_agent=USER_AGENT, client_secret=None, redirect_uri=REDIRECT_URL,
+                       requestor_class=ScheduledRequestor)
 
 
 def save_token(raw_token):
@@ -106,7 +109,8 @@ def check_authorized_connection():
     r = get_reddit_instance()
     try:
         if not r.read_only:
-            user = r.user.me().name
+            with request_priority(RequestPriority.INTERACTIVE):
+                user = r.user.me().name
             connection_is_authorized = True
             return user
     except prawcore.exceptions.TooManyRequests:
@@ -180,7 +184,8 @@ class NameChecker:
             # Creation date is checked first because praw objects are evaluated lazily, and calling user.name first will
             # not send anything to the server and will only return the name as it was supplied.  By getting the creation
             # date first, the redditor object is updated with information supplied by reddit's server.
-            created = datetime.fromtimestamp(user.created)
+            with request_priority(RequestPriority.INTERACTIVE):
+                created = datetime.fromtimestamp(user.created)
             actual_name = user.name
             return ValidationSet(name=actual_name, date_created=created, valid=True)
         except (prawcore.exceptions.NotFound, prawcore.exceptions.Redirect, AttributeError):
@@ -193,7 +198,8 @@ class NameChecker:
         sub = self.r.subreddit(name)
         try:
             # actual name pulled from reddit because capitalization differences may cause problems throughout the app
-            created = datetime.fromtimestamp(sub.created)
+            with request_priority(RequestPriority.INTERACTIVE):
+                created = datetime.fromtimestamp(sub.created)
             actual_name = sub.display_name
             return ValidationSet(name=actual_name, date_created=created, valid=True)
         except (prawcore.exceptions.NotFound, prawcore.exceptions.Redirect, AttributeError):
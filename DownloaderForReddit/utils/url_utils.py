@@ -0,0 +1,50 @@
+import hashlib
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """
+    Returns the supplied url in a canonical form so that urls which point to the same resource compare as equal.  The
+    scheme and host are lower cased, http is treated as https, a leading "www." and a default port are removed, and the
+    fragment and any trailing slash on the path are dropped.  The path and query are otherwise left untouched because
+    many hosts (such as imgur) use case sensitive ids.
+    :param url: The url that is to be made canonical.
+    :return: The canonical form of the url, or None if no url was supplied.
+    """
+    if url is None:
+        return None
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.netloc:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{port}'
+    if scheme == 'http':
+        scheme = 'https'
+    path = parts.path.rstrip('/')
+    return urlunsplit((scheme, host, path, parts.query, ''))
+
+
+def url_hash(url: Optional[str]) -> Optional[int]:
+    """
+    Returns a signed 64 bit hash of the canonical form of the supplied url, which is small enough to be stored in and
+    indexed by an sqlite integer column.  Different urls may share a hash, so rows that are found by their hash should
+    be confirmed by comparing their canonical urls.
+    """
+    canonical = canonical_url(url)
+    if canonical is None:
+        return None
+    digest = hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
@@ -0,0 +1,71 @@
+import time
+from threading import Lock
+from types import SimpleNamespace
+
+
+class MockReddit:
+
+    """
+    A local stand-in for the parts of praw's Reddit instance that are used to refresh stored posts and to validate
+    subreddits in batches.  Submissions and subreddits are served from memory, every request is recorded, and an
+    optional latency can be added to each request so that batching and concurrency can be tested offline.
+    """
+
+    MAX_INFO_FULLNAMES = 100
+
+    def __init__(self, scores=None, latency=0.0, subreddits=None):
+        """
+        :param scores: A dict of submission ids mapped to the scores that reddit should return for them.  Submissions
+                       that are not in the dict are treated as deleted and are not returned.
+        :param latency: The time in seconds that each request takes.
+        :param subreddits: A dict of subreddit names mapped to their subreddit type ('public', 'private', etc.).
+                           Subreddits that are not in the dict are treated as non-existent and are not returned.
+        """
+        self.scores = scores or {}
+        self.subreddits = {name.lower(): (name, subreddit_type) for name, subreddit_type in (subreddits or {}).items()}
+        self.latency = latency
+        self.info_calls = []
+        self.active_requests = 0
+        self.max_active_requests = 0
+        self.lock = Lock()
+        self.fail_next = 0
+
+    def info(self, fullnames=None, subreddits=None, url=None):
+        if subreddits is not None:
+            return self.subreddit_info(subreddits)
+        if fullnames is None or len(fullnames) > self.MAX_INFO_FULLNAMES:
+            raise ValueError(f'info accepts at most {self.MAX_INFO_FULLNAMES} fullnames')
+        with self.lock:
+            self.info_calls.append(list(fullnames))
+            self.active_requests += 1
+            self.max_active_requests = max(self.max_active_requests, self.active_requests)
+            fail = self.fail_next > 0
+            if fail:
+                self.fail_next -= 1
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                raise ConnectionError('Mock reddit request failed')
+            submissions = []
+            for fullname in fullnames:
+                kind, submission_id = fullname.split('_', 1)
+                if kind == 't3' and submission_id in self.scores:
+                    submissions.append(SimpleNamespace(id=submission_id, fullname=fullname,
+                                                       score=self.scores[submission_id]))
+        finally:
+            with self.lock:
+                self.active_requests -= 1
+        return iter(submissions)
+
+    def subreddit_info(self, names):
+        if len(names) > self.MAX_INFO_FULLNAMES:
+            raise ValueError(f'info accepts at most {self.MAX_INFO_FULLNAMES} subreddits')
+        with self.lock:
+            self.info_calls.append(list(names))
+        subreddits = []
+        for name in names:
+            found = self.subreddits.get(name.lower())
+            if found is not None:
+                subreddits.append(SimpleNamespace(display_name=found[0], subreddit_type=found[1]))
+        return iter(subreddits)
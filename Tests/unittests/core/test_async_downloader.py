@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from queue import Queue
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from DownloaderForReddit.core.download.async_downloader import AsyncDownloader
+from DownloaderForReddit.core.download.partial_download import PartialDownload
+from DownloaderForReddit.database.models import Content, BaseModel
+from DownloaderForReddit.utils import injector, general_utils
+
+
+FILE_BODY = os.urandom(64 * 1024)
+RANGE_REQUESTS = []
+
+
+async def serve_file(request):
+    return web.Response(body=FILE_BODY)
+
+
+async def serve_ranged_file(request):
+    headers = {'ETag': '"file"'}
+    range_header = request.headers.get('Range')
+    RANGE_REQUESTS.append(range_header)
+    if range_header is None or request.headers.get('If-Range') != '"file"':
+        return web.Response(body=FILE_BODY, headers=headers)
+    start = int(range_header[len('bytes='):-1])
+    headers['Content-Range'] = f'bytes {start}-{len(FILE_BODY) - 1}/{len(FILE_BODY)}'
+    return web.Response(status=206, body=FILE_BODY[start:], headers=headers)
+
+
+async def serve_small_file(request):
+    return web.Response(body=b'deleted')
+
+
+async def serve_missing(request):
+    return web.Response(status=404)
+
+
+class TestAsyncDownloader(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # the download jobs are created on a worker thread, so the in-memory database is shared between threads
+        cls.engine = create_engine('sqlite:///:memory:', connect_args={'check_same_thread': False},
+                                   poolclass=StaticPool)
+        BaseModel.metadata.create_all(cls.engine)
+        cls.Session = sessionmaker(bind=cls.engine)
+        cls._original_ensure_content_download_path = general_utils.ensure_content_download_path
+
+    @classmethod
+    def tearDownClass(cls):
+        general_utils.ensure_content_download_path = cls._original_ensure_content_download_path
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        RANGE_REQUESTS.clear()
+        general_utils.ensure_content_download_path = MagicMock(return_value='downloaded')
+        self.session = self.Session()
+        injector.settings_manager = MagicMock(use_multi_part_downloader=False, async_download_concurrency=10,
+                                              download_thread_count=2)
+        self.stop_run = MagicMock()
+        self.stop_run.is_set.return_value = False
+        self.queue = Queue()
+        self.downloader = AsyncDownloader(self.queue, download_session_id=12, stop_run=self.stop_run)
+        self.downloader.db = MagicMock()
+        self.downloader.db.get_scoped_session.return_value.__enter__.return_value = self.session
+        self.downloader.check_headers = MagicMock(return_value={})
+        self.downloader.should_use_hash = MagicMock(return_value=True)
+        self.downloader.finish_download = MagicMock()
+        self.downloader.handle_unsuccessful_response = MagicMock()
+        self.downloader.handle_deleted_content_error = MagicMock()
+        self.downloader.handle_connection_error = MagicMock()
+        self.downloader.handle_unknown_error = MagicMock()
+        self.downloader.make_executor()
+
+        self.content = Content(url='', title='example', extension='bin', directory_path=self.temp_dir.name)
+        self.session.add(self.content)
+        self.session.commit()
+
+    def tearDown(self):
+        self.downloader.queue_executor.shutdown()
+        self.downloader.blocking_executor.shutdown()
+        self.session.close()
+        self.temp_dir.cleanup()
+
+    def run_download(self, path):
+        async def download():
+            app = web.Application()
+            app.router.add_get('/file', serve_file)
+            app.router.add_get('/ranged', serve_ranged_file)
+            app.router.add_get('/small', serve_small_file)
+            app.router.add_get('/missing', serve_missing)
+            async with TestServer(app) as server:
+                self.content.url = str(server.make_url(path))
+                self.session.commit()
+                self.job = self.downloader.make_job(self.content)
+                self.downloader.semaphore = asyncio.Semaphore(10)
+                async with self.downloader.make_client_session() as http_session:
+                    await self.downloader.download_async(http_session, self.job)
+        asyncio.run(download())
+
+    def test_download_successful(self):
+        self.run_download('/file')
+
+        with open(self.job.file_path, 'rb') as file:
+            self.assertEqual(FILE_BODY, file.read())
+        self.downloader.finish_download.assert_called_once_with(self.job, hashlib.md5(FILE_BODY).hexdigest())
+        self.downloader.handle_unknown_error.assert_not_called()
+        self.assertEqual(set(), self.downloader.reserved_paths)
+
+    def test_file_work_runs_off_the_event_loop(self):
+        loop_threads = set()
+        write_threads = set()
+        original_write_chunk = self.downloader.write_chunk
+
+        def write_chunk(file, md5, chunk):
+            write_threads.add(threading.get_ident())
+            original_write_chunk(file, md5, chunk)
+
+        async def download_async(http_session, job, original=self.downloader.download_async):
+            loop_threads.add(threading.get_ident())
+            await original(http_session, job)
+
+        self.downloader.write_chunk = write_chunk
+        self.downloader.download_async = download_async
+        self.downloader.finish_download.side_effect = lambda *args: write_threads.add(threading.get_ident())
+
+        self.run_download('/file')
+
+        with open(self.job.file_path, 'rb') as file:
+            self.assertEqual(FILE_BODY, file.read())
+        self.assertEqual(1, len(loop_threads))
+        self.assertTrue(write_threads)
+        self.assertFalse(loop_threads & write_threads)
+
+    def test_download_without_hash(self):
+        self.downloader.should_use_hash.return_value = False
+
+        self.run_download('/file')
+
+        self.downloader.finish_download.assert_called_once_with(self.job, None)
+
+    def test_download_resumes_partial_file(self):
+        path = self.content.get_full_file_path('downloaded')
+        with open(f'{path}.part', 'wb') as file:
+            file.write(FILE_BODY[:1000])
+        original_load = PartialDownload.load
+
+        def load(file_path, url):
+            # the url is only known once the test server has started, so the state is written when it is loaded
+            with open(f'{path}.part.json', 'w') as file:
+                json.dump({'url': url, 'etag': '"file"', 'last_modified': None}, file)
+            return original_load(file_path, url)
+
+        with patch('DownloaderForReddit.core.download.async_downloader.PartialDownload.load', side_effect=load):
+            self.run_download('/ranged')
+
+        self.assertEqual(['bytes=1000-'], RANGE_REQUESTS)
+        with open(path, 'rb') as file:
+            self.assertEqual(FILE_BODY, file.read())
+        self.downloader.finish_download.assert_called_once_with(self.job, hashlib.md5(FILE_BODY).hexdigest())
+        self.assertFalse(os.path.exists(f'{path}.part'))
+        self.assertFalse(os.path.exists(f'{path}.part.json'))
+
+    def test_download_with_small_file(self):
+        self.run_download('/small')
+
+        self.downloader.handle_deleted_content_error.assert_called_once_with(self.job)
+        self.downloader.finish_download.assert_not_called()
+
+    def test_download_unsuccessful_response(self):
+        self.run_download('/missing')
+
+        self.downloader.handle_unsuccessful_response.assert_called_once_with(self.job, 404)
+        self.downloader.finish_download.assert_not_called()
+
+    def test_download_connection_error(self):
+        async def download():
+            self.content.url = 'http://127.0.0.1:1/file'
+            self.session.commit()
+            self.job = self.downloader.make_job(self.content)
+            self.downloader.semaphore = asyncio.Semaphore(10)
+            async with self.downloader.make_client_session() as http_session:
+                await self.downloader.download_async(http_session, self.job)
+        asyncio.run(download())
+
+        self.downloader.handle_connection_error.assert_called_once_with(self.job)
+
+    def test_run_honors_queue_protocol(self):
+        holds = []
+
+        async def download_async(http_session, job):
+            holds.append((job.content_id, self.downloader.hold))
+
+        other = Content(url='http://example.com/other', title='other', extension='bin',
+                        directory_path=self.temp_dir.name)
+        self.session.add(other)
+        self.session.commit()
+        self.downloader.download_async = download_async
+        self.downloader.status_writer = MagicMock()
+        for item in ['HOLD', self.content.id, 'RELEASE_HOLD', other.id, None]:
+            self.queue.put(item)
+
+        self.downloader.run()
+
+        self.assertEqual([self.content.id, other.id], [x[0] for x in holds])
+        self.assertFalse(self.downloader.hold)
+        self.assertEqual(0, len(self.downloader.futures))
@@ -0,0 +1,103 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from Tests.mockobjects.mock_objects import get_user, get_post
+from DownloaderForReddit.core.comment_handler import CommentHandler
+from DownloaderForReddit.core.submittable_creator import SubmittableCreator
+from DownloaderForReddit.database.database_handler import DatabaseHandler
+from DownloaderForReddit.database.models import Comment
+from DownloaderForReddit.database.model_enums import CommentDownload
+from DownloaderForReddit.utils import injector
+
+
+class FakeReplies(list):
+
+    def replace_more(self, limit=None):
+        pass
+
+
+class FakeComment:
+
+    def __init__(self, comment_id, replies=(), author='commenter', is_submitter=False):
+        self.id = comment_id
+        self.body = f'body {comment_id}'
+        self.body_html = f'<p>body {comment_id}</p>'
+        self.score = 10
+        self.created = 1600000000
+        self.is_submitter = is_submitter
+        self.author = MagicMock()
+        self.author.name = author
+        self.subreddit = MagicMock(display_name='pics')
+        self.replies = FakeReplies(replies)
+
+
+class TestCommentHandler(TestCase):
+
+    def setUp(self):
+        injector.settings_manager = MagicMock()
+        self.db = DatabaseHandler(in_memory=True)
+        injector.database_handler = self.db
+        injector.seen_filter = None
+        SubmittableCreator.db = None
+        SubmittableCreator.identity_cache.clear()
+        self.session = self.db.get_session()
+        user = get_user(extract_comments=CommentDownload.DOWNLOAD, download_comments=CommentDownload.DOWNLOAD,
+                        comment_depth=3, comment_reply_limit=10)
+        self.post = get_post(user=user, significant_reddit_object=user)
+        self.session.add(self.post)
+        self.session.commit()
+        stop_run = MagicMock()
+        stop_run.is_set.return_value = False
+        self.submission = MagicMock()
+        self.handler = CommentHandler(self.submission, self.post, None, stop_run, session=self.session)
+
+    def tearDown(self):
+        self.session.close()
+        SubmittableCreator.db = None
+        SubmittableCreator.identity_cache.clear()
+
+    def set_comments(self, comments):
+        self.submission.comments = FakeReplies(comments)
+
+    def get_comment(self, reddit_id):
+        return self.session.query(Comment).filter(Comment.reddit_id == reddit_id).one()
+
+    def test_comment_forest_is_stored_with_parent_ids(self):
+        self.set_comments([
+            FakeComment('a1', replies=[FakeComment('b1', replies=[FakeComment('c1', replies=[FakeComment('d1')])]),
+                                       FakeComment('b2')]),
+            FakeComment('a2'),
+        ])
+
+        self.handler.run()
+
+        self.assertEqual(5, self.session.query(Comment).count())
+        self.assertIsNone(self.get_comment('a1').parent_id)
+        self.assertEqual(self.get_comment('a1').id, self.get_comment('b1').parent_id)
+        self.assertEqual(self.get_comment('a1').id, self.get_comment('b2').parent_id)
+        self.assertEqual(self.get_comment('b1').id, self.get_comment('c1').parent_id)
+        self.assertEqual(self.post.id, self.get_comment('c1').post_id)
+        self.assertEqual('commenter', self.get_comment('a2').author.name)
+        # the fourth level is beyond the comment depth
+        self.assertEqual(0, self.session.query(Comment).filter(Comment.reddit_id == 'd1').count())
+        self.assertEqual(['a1', 'a2', 'b1', 'b2', 'c1'], [x.reddit_id for x in self.handler.comments_to_download])
+
+    def test_one_commit_per_level(self):
+        self.set_comments([FakeComment(f'a{x}', replies=[FakeComment(f'b{x}')]) for x in range(50)])
+
+        with patch.object(self.session, 'commit', wraps=self.session.commit) as commit:
+            self.handler.run()
+
+        self.assertEqual(100, self.session.query(Comment).count())
+        # one commit for each level plus one for each newly created user and subreddit
+        self.assertEqual(4, commit.call_count)
+
+    def test_stored_comments_and_their_replies_are_skipped(self):
+        self.session.add(Comment(reddit_id='A1', post=self.post))
+        self.session.commit()
+        self.set_comments([FakeComment('a1', replies=[FakeComment('b1')]), FakeComment('a2')])
+
+        self.handler.run()
+
+        self.assertEqual(2, self.session.query(Comment).count())
+        self.assertEqual(['a2'], [x.reddit_id for x in self.handler.comments_to_download])
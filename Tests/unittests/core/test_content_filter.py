@@ -42,6 +42,19 @@ class TestContentFilter(TestCase):
             f = self.content_filter.filter_duplicate(post, new_url)
             self.assertTrue(f)
 
+    def test_filter_duplicate_canonically_equal_url_avoid_duplicates(self):
+        db = DatabaseHandler(in_memory=True)
+        with db.get_scoped_session() as session:
+            content = get_content(url='https://www.fakesite.com/323sds9sd9wn3lk23.jpg')
+            post = content.post
+            session.add(content, post)
+            session.commit()
+
+            f = self.content_filter.filter_duplicate(post, 'http://FakeSite.com/323sds9sd9wn3lk23.jpg#top')
+            self.assertFalse(f)
+            f = self.content_filter.filter_duplicate(post, 'https://www.fakesite.com/323SDS9sd9wn3lk23.jpg')
+            self.assertTrue(f)
+
     def test_filter_duplicate_url_already_in_db_do_not_avoid_duplicates(self):
         db = DatabaseHandler(in_memory=True)
         with db.get_scoped_session() as session:
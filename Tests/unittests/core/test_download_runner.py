@@ -1,13 +1,17 @@
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
+import time
 import logging
+from threading import Lock
 from datetime import datetime, timedelta
 import prawcore
 
 from DownloaderForReddit.core.download_runner import DownloadRunner
 from DownloaderForReddit.database.database_handler import DatabaseHandler
+from DownloaderForReddit.database.models import Subreddit
 from DownloaderForReddit.utils import injector
 from Tests.mockobjects.mock_objects import MockPrawSubmission, get_user, get_subreddit
+from Tests.mockobjects.mock_reddit import MockReddit
 
 
 logging.disable(logging.CRITICAL)
@@ -80,7 +84,7 @@ class TestDownloadRunner(TestCase):
         self.assertTrue(download_runner.filter_subreddits)
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_old_stickied_posts(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_old_stickied_posts(self, get_raw_submissions, reddit_utils):
         user = get_user(absolute_date_limit=self.now - timedelta(days=10))
         mock_submissions = []
         for x in range(2):
@@ -91,7 +95,7 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(20, len(mock_submissions))
 
         download_runner = DownloadRunner()
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(8, len(submissions))
         for sub in submissions:
@@ -99,7 +103,7 @@ class TestDownloadRunner(TestCase):
             self.assertFalse(sub.stickied)
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_new_stickied_posts(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_new_stickied_posts(self, get_raw_submissions, reddit_utils):
         user = get_user(absolute_date_limit=self.now - timedelta(days=10))
         mock_submissions = []
         for x in range(2):
@@ -110,7 +114,7 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(20, len(mock_submissions))
 
         download_runner = DownloadRunner()
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(10, len(submissions))
         stickied = 0
@@ -121,7 +125,7 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(2, stickied)
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_no_stickied_posts(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_no_stickied_posts(self, get_raw_submissions, reddit_utils):
         user = get_user(absolute_date_limit=self.now - timedelta(days=10))
         mock_submissions = []
         for x in range(20):
@@ -130,14 +134,14 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(20, len(mock_submissions))
 
         download_runner = DownloadRunner()
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(10, len(submissions))
         for sub in submissions:
             self.assertGreater(sub.created, user.absolute_date_limit.timestamp())
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_old_stickied_posts_restricted_download(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_old_stickied_posts_restricted_download(self, get_raw_submissions, reddit_utils):
         allowed_subreddit = get_subreddit(name='allowed')
         setattr(allowed_subreddit, 'display_name', 'allowed')
         forbidden_subreddit = get_subreddit(name='forbidden')
@@ -159,7 +163,7 @@ class TestDownloadRunner(TestCase):
         download_runner = DownloadRunner()
         download_runner.filter_subreddits = True
         download_runner.validated_subreddits.append(allowed_subreddit.display_name)
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(8, len(submissions))
         for sub in submissions:
@@ -168,7 +172,7 @@ class TestDownloadRunner(TestCase):
             self.assertNotEqual(sub.subreddit, forbidden_subreddit)
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_new_stickied_posts_restricted_download(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_new_stickied_posts_restricted_download(self, get_raw_submissions, reddit_utils):
         allowed_subreddit = get_subreddit(name='allowed')
         setattr(allowed_subreddit, 'display_name', 'allowed')
         forbidden_subreddit = get_subreddit(name='forbidden')
@@ -190,7 +194,7 @@ class TestDownloadRunner(TestCase):
         download_runner = DownloadRunner()
         download_runner.filter_subreddits = True
         download_runner.validated_subreddits.append(allowed_subreddit.display_name)
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(10, len(submissions))
         stickied = 0
@@ -202,7 +206,7 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(2, stickied)
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_no_stickied_posts_restricted_download(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_no_stickied_posts_restricted_download(self, get_raw_submissions, reddit_utils):
         allowed_subreddit = get_subreddit(name='allowed')
         setattr(allowed_subreddit, 'display_name', 'allowed')
         forbidden_subreddit = get_subreddit(name='forbidden')
@@ -221,7 +225,7 @@ class TestDownloadRunner(TestCase):
         download_runner = DownloadRunner()
         download_runner.filter_subreddits = True
         download_runner.validated_subreddits.append(allowed_subreddit.display_name)
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(10, len(submissions))
         for sub in submissions:
@@ -229,7 +233,7 @@ class TestDownloadRunner(TestCase):
             self.assertNotEqual(sub.subreddit, forbidden_subreddit)
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_old_pinned_posts(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_old_pinned_posts(self, get_raw_submissions, reddit_utils):
         user = get_user(absolute_date_limit=self.now - timedelta(days=10))
         mock_submissions = []
         for x in range(2):
@@ -240,7 +244,7 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(20, len(mock_submissions))
 
         download_runner = DownloadRunner()
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(8, len(submissions))
         for sub in submissions:
@@ -248,7 +252,7 @@ class TestDownloadRunner(TestCase):
             self.assertFalse(sub.stickied)
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_new_pinned_posts(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_new_pinned_posts(self, get_raw_submissions, reddit_utils):
         user = get_user(absolute_date_limit=self.now - timedelta(days=10))
         mock_submissions = []
         for x in range(2):
@@ -259,7 +263,7 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(20, len(mock_submissions))
 
         download_runner = DownloadRunner()
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(10, len(submissions))
         pinned = 0
@@ -270,7 +274,7 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(2, pinned)
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_old_pinned_posts_restricted_download(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_old_pinned_posts_restricted_download(self, get_raw_submissions, reddit_utils):
         allowed_subreddit = get_subreddit(name='allowed')
         setattr(allowed_subreddit, 'display_name', 'allowed')
         forbidden_subreddit = get_subreddit(name='forbidden')
@@ -292,7 +296,7 @@ class TestDownloadRunner(TestCase):
         download_runner = DownloadRunner()
         download_runner.filter_subreddits = True
         download_runner.validated_subreddits.append(allowed_subreddit.display_name)
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(8, len(submissions))
         for sub in submissions:
@@ -301,7 +305,7 @@ class TestDownloadRunner(TestCase):
             self.assertNotEqual(sub.subreddit, forbidden_subreddit)
 
     @patch(f'{DL}.get_raw_submissions')
-    def test_get_submissions_with_new_pinned_posts_restricted_download(self, get_raw_submissions, reddit_utils):
+    def test_iter_submissions_with_new_pinned_posts_restricted_download(self, get_raw_submissions, reddit_utils):
         allowed_subreddit = get_subreddit(name='allowed')
         setattr(allowed_subreddit, 'display_name', 'allowed')
         forbidden_subreddit = get_subreddit(name='forbidden')
@@ -323,7 +327,7 @@ class TestDownloadRunner(TestCase):
         download_runner = DownloadRunner()
         download_runner.filter_subreddits = True
         download_runner.validated_subreddits.append(allowed_subreddit.display_name)
-        submissions = download_runner.get_submissions(None, user)
+        submissions = list(download_runner.iter_submissions(None, user))
 
         self.assertEqual(10, len(submissions))
         pinned = 0
@@ -341,10 +345,145 @@ class TestDownloadRunner(TestCase):
         for x in range(4):
             mock_submissions.append(MockPrawSubmission(created=self.now - timedelta(days=x)))
         get_raw_submissions.side_effect = prawcore.exceptions.TooManyRequests(MagicMock())
+        user.set_date_limit = MagicMock()
 
         download_runner = DownloadRunner()
-        submissions = download_runner.get_submissions(None, user)
+        download_runner.handle_submissions(user, None)
 
         get_raw_submissions.assert_called()
-        self.assertEqual(0, len(submissions))
+        self.assertEqual(0, download_runner.submission_queue.qsize())
+        self.assertGreater(download_runner.rate_limited_until, time.monotonic())
+        user.set_date_limit.assert_not_called()
 
+
+    @patch(f'{DL}.get_user_submissions')
+    def test_reddit_objects_are_run_concurrently(self, get_user_submissions, reddit_utils):
+        self.settings_manager.reddit_object_concurrency = 4
+        lock = Lock()
+        active = []
+        max_active = []
+
+        def get_submissions(user_id):
+            with lock:
+                active.append(user_id)
+                max_active.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(user_id)
+
+        get_user_submissions.side_effect = get_submissions
+        download_runner = DownloadRunner(user_id_list=list(range(12)))
+        download_runner.run_download()
+
+        self.assertEqual(12, get_user_submissions.call_count)
+        self.assertEqual(set(range(12)), {call[0][0] for call in get_user_submissions.call_args_list})
+        self.assertEqual(4, max(max_active))
+
+    @patch(f'{DL}.get_user_submissions')
+    def test_failed_reddit_object_does_not_end_run(self, get_user_submissions, reddit_utils):
+        self.settings_manager.reddit_object_concurrency = 2
+        get_user_submissions.side_effect = [ValueError('failed'), None, None]
+        download_runner = DownloadRunner(user_id_list=[1, 2, 3])
+        download_runner.run_download()
+        self.assertEqual(3, get_user_submissions.call_count)
+
+    def test_subreddits_are_validated_in_batches(self, reddit_utils):
+        subreddit_ids = []
+        with injector.database_handler.get_scoped_session() as session:
+            for x in range(150):
+                subreddit = get_subreddit(name=f'BatchSub{x}')
+                session.add(subreddit)
+                session.commit()
+                subreddit_ids.append(subreddit.id)
+            found = {f'BatchSub{x}': 'public' for x in range(148)}
+            found['BatchSub148'] = 'private'
+            reddit = MockReddit(subreddits=found)
+            download_runner = DownloadRunner(subreddit_id_list=subreddit_ids)
+            download_runner.reddit_instance = reddit
+            download_runner.prevalidate_subreddits(subreddit_ids)
+
+            self.assertEqual([100, 50], [len(x) for x in reddit.info_calls])
+            self.assertEqual(148, len(download_runner.prevalidated_subreddits))
+
+            download_runner.reddit_instance = MagicMock()
+            first = session.query(Subreddit).get(subreddit_ids[0])
+            validated = download_runner.validate_subreddit(first)
+            self.assertEqual('BatchSub0', validated.display_name)
+            download_runner.reddit_instance.subreddit.assert_not_called()
+
+            private = session.query(Subreddit).get(subreddit_ids[148])
+            download_runner.validate_subreddit(private)
+            download_runner.reddit_instance.subreddit.assert_called_once_with('BatchSub148')
+
+    def test_rate_limit_cooldown_holds_reddit_objects(self, reddit_utils):
+        download_runner = DownloadRunner()
+        self.assertTrue(download_runner.wait_for_rate_limit())
+        download_runner.start_rate_limit_cooldown()
+        self.assertGreater(download_runner.rate_limited_until, time.monotonic())
+
+        method = MagicMock()
+        download_runner.continue_run = False
+        download_runner.run_reddit_object(method, 1)
+        method.assert_not_called()
+
+    @patch(f'{DL}.get_raw_submissions')
+    def test_submissions_are_queued_as_they_are_listed(self, get_raw_submissions, reddit_utils):
+        user = MagicMock(id=5, absolute_date_limit=self.now - timedelta(days=10))
+        download_runner = DownloadRunner()
+        download_runner.submission_filter = MagicMock()
+        download_runner.submission_filter.date_filter.return_value = True
+        download_runner.submission_filter.filter_submission.return_value = True
+        queued_before = []
+        date_limit_moved = []
+
+        def listing():
+            for x in range(3):
+                queued_before.append(download_runner.submission_queue.qsize())
+                date_limit_moved.append(user.set_date_limit.called)
+                yield MockPrawSubmission(created=self.now - timedelta(days=x))
+
+        get_raw_submissions.return_value = listing()
+        download_runner.handle_submissions(user, None)
+
+        self.assertEqual([0, 1, 2], queued_before)
+        # the date limit is only moved once the last submission of the listing has been read
+        self.assertEqual([False, False, False], date_limit_moved)
+        self.assertEqual(3, download_runner.submission_queue.qsize())
+        user.set_date_limit.assert_called_once_with(self.now.timestamp())
+
+    @patch(f'{DL}.get_raw_submissions')
+    def test_date_limit_is_not_moved_by_interrupted_listing(self, get_raw_submissions, reddit_utils):
+        user = MagicMock(id=5, absolute_date_limit=self.now - timedelta(days=10))
+        download_runner = DownloadRunner()
+        download_runner.submission_filter = MagicMock()
+        download_runner.submission_filter.date_filter.return_value = True
+        download_runner.submission_filter.filter_submission.return_value = True
+
+        def listing():
+            yield MockPrawSubmission(created=self.now)
+            raise prawcore.exceptions.TooManyRequests(MagicMock())
+
+        get_raw_submissions.return_value = listing()
+        download_runner.handle_submissions(user, None)
+
+        self.assertEqual(1, download_runner.submission_queue.qsize())
+        user.set_date_limit.assert_not_called()
+
+    @patch(f'{DL}.get_raw_submissions')
+    def test_stopped_listing_ends_early(self, get_raw_submissions, reddit_utils):
+        user = MagicMock(id=5, absolute_date_limit=self.now - timedelta(days=10))
+        download_runner = DownloadRunner()
+        download_runner.submission_filter = MagicMock()
+        download_runner.submission_filter.date_filter.return_value = True
+        download_runner.submission_filter.filter_submission.return_value = True
+
+        def listing():
+            yield MockPrawSubmission(created=self.now)
+            download_runner.continue_run = False
+            yield MockPrawSubmission(created=self.now - timedelta(days=1))
+
+        get_raw_submissions.return_value = listing()
+        download_runner.handle_submissions(user, None)
+
+        self.assertEqual(1, download_runner.submission_queue.qsize())
+        user.set_date_limit.assert_not_called()
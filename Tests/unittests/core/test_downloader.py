@@ -1,9 +1,14 @@
+import os
+import tempfile
 from unittest import TestCase
+from queue import Queue
 from unittest.mock import MagicMock, patch
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from DownloaderForReddit.core.errors import Error
 from DownloaderForReddit.core.download.downloader import Downloader
+from DownloaderForReddit.core.download.download_job import DownloadJob
 from DownloaderForReddit.database.models import Content, BaseModel
 from DownloaderForReddit.utils import injector, general_utils
 
@@ -27,7 +32,8 @@ class TestDownloader(TestCase):
         self.session = self.Session()
         self.mock_settings_manager = MagicMock(
             use_multi_part_downloader=False,
-            multi_part_threshold=1024 * 1024
+            multi_part_threshold=1024 * 1024,
+            download_thread_count=2
         )
         injector.settings_manager = self.mock_settings_manager
         self.mock_stop_run = MagicMock()
@@ -36,6 +42,7 @@ class TestDownloader(TestCase):
         self.downloader.db = MagicMock()  # Mock db interface
         self.downloader.db.get_scoped_session.return_value.__enter__.return_value = self.session
         self.downloader.check_headers = MagicMock(return_value={})
+        self.downloader.status_writer = MagicMock()
 
         # Insert some test data
         self.duplicate_hash = 'abcd1234'
@@ -49,8 +56,27 @@ class TestDownloader(TestCase):
         )
         self.session.add_all([self.content1, self.content2, self.content3])
         self.session.commit()
+        self.job = self.make_job(self.content3)
         self.multi_part_limit = 1024 * 1024 * 10
 
+    def make_job(self, content, **kwargs):
+        values = dict(
+            content_id=content.id,
+            url=content.url,
+            download_title='file',
+            file_path='/mock/path/file.txt',
+            headers={},
+            use_hash=False,
+            modified_time=None,
+            title=content.title,
+            post_title=None,
+            submission_id=None,
+            user_name=None,
+            subreddit_name=None
+        )
+        values.update(kwargs)
+        return DownloadJob(**values)
+
     def tearDown(self):
         self.session.close()
 
@@ -112,65 +138,152 @@ class TestDownloader(TestCase):
         self.assertFalse(self.downloader.should_use_hash(content))
 
     def test_finish_download_non_hashed_successful(self):
-        self.content1.md5_hash = None
         self.downloader.handle_duplicate_content = MagicMock()
         self.downloader.handle_date_modified = MagicMock()
         self.downloader.output_downloaded_message = MagicMock()
         self.downloader.handle_download_stopped = MagicMock()
 
-        self.downloader.finish_download(self.content1)
+        self.downloader.finish_download(self.job)
 
         self.downloader.handle_duplicate_content.assert_not_called()
-        self.downloader.handle_date_modified.assert_called_once_with(self.content1)
-        self.downloader.output_downloaded_message.assert_called_once_with(self.content1)
+        self.downloader.handle_date_modified.assert_called_once_with(self.job)
+        self.downloader.output_downloaded_message.assert_called_once_with(self.job)
         self.downloader.handle_download_stopped.assert_not_called()
+        self.downloader.status_writer.set_downloaded.assert_called_once_with(self.job, None)
 
     def test_finish_download_non_hashed_hard_stop(self):
-        self.content1.md5_hash = None
         self.downloader.handle_duplicate_content = MagicMock()
         self.downloader.handle_date_modified = MagicMock()
         self.downloader.output_downloaded_message = MagicMock()
         self.downloader.handle_download_stopped = MagicMock()
 
         self.downloader.hard_stop = True
-        self.downloader.finish_download(self.content1)
+        self.downloader.finish_download(self.job)
 
         self.downloader.handle_duplicate_content.assert_not_called()
         self.downloader.handle_date_modified.assert_not_called()
         self.downloader.output_downloaded_message.assert_not_called()
-        self.downloader.handle_download_stopped.assert_called_once_with(self.content1)
+        self.downloader.handle_download_stopped.assert_called_once_with(self.job)
 
     def test_finish_download_hashed_non_duplicate_successful(self):
-        self.content1.md5_hash = 'a0uqlka0f9'
         self.downloader.is_duplicate_content = MagicMock(return_value=False)
         self.downloader.handle_duplicate_content = MagicMock()
         self.downloader.handle_date_modified = MagicMock()
         self.downloader.output_downloaded_message = MagicMock()
         self.downloader.handle_download_stopped = MagicMock()
 
-        self.downloader.finish_download(self.content1)
+        self.downloader.finish_download(self.job, 'a0uqlka0f9')
 
         self.downloader.handle_duplicate_content.assert_not_called()
-        self.downloader.handle_date_modified.assert_called_once_with(self.content1)
-        self.downloader.output_downloaded_message.assert_called_once_with(self.content1)
+        self.downloader.handle_date_modified.assert_called_once_with(self.job)
+        self.downloader.output_downloaded_message.assert_called_once_with(self.job)
         self.downloader.handle_download_stopped.assert_not_called()
+        self.downloader.status_writer.set_downloaded.assert_called_once_with(self.job, 'a0uqlka0f9')
 
     def test_finish_download_hashed_duplicate_successful(self):
-        self.content1.md5_hash = 'a0uqlka0f9'
         self.downloader.is_duplicate_content = MagicMock(return_value=True)
         self.downloader.handle_duplicate_content = MagicMock()
         self.downloader.handle_date_modified = MagicMock()
         self.downloader.output_downloaded_message = MagicMock()
         self.downloader.handle_download_stopped = MagicMock()
 
-        self.downloader.finish_download(self.content1)
+        self.downloader.finish_download(self.job, 'a0uqlka0f9')
 
-        self.downloader.handle_duplicate_content.assert_called_once_with(self.content1)
+        self.downloader.handle_duplicate_content.assert_called_once_with(self.job)
         self.downloader.handle_date_modified.assert_not_called()
         self.downloader.output_downloaded_message.assert_not_called()
         self.downloader.handle_download_stopped.assert_not_called()
+        self.downloader.status_writer.set_downloaded.assert_not_called()
+
+    def test_stopped_multi_part_download_is_not_finished(self):
+        self.downloader.finish_download = MagicMock()
+        self.downloader.handle_download_stopped = MagicMock()
+        self.mock_stop_run.is_set.return_value = True
+        multipart_downloader = MagicMock(part_count=4, failed_parts=1, complete=False)
+
+        self.downloader.finish_multi_part_download(self.job, multipart_downloader)
+
+        self.downloader.finish_download.assert_not_called()
+        self.downloader.handle_download_stopped.assert_called_once_with(self.job)
+
+    def test_failed_multi_part_download_is_reported(self):
+        self.downloader.finish_download = MagicMock()
+        multipart_downloader = MagicMock(part_count=4, failed_parts=1, complete=False)
+
+        self.downloader.finish_multi_part_download(self.job, multipart_downloader)
+
+        self.downloader.finish_download.assert_not_called()
+        self.downloader.status_writer.set_download_error.assert_called_once_with(
+            self.job, Error.MULTIPART_FAILURE, '25% of multi-part download parts failed to download')
+
+    @patch('DownloaderForReddit.core.download.session_pool.get')
+    def test_large_interrupted_download_is_resumed(self, mock_get):
+        body = os.urandom(200 * 1024)
+        requested_ranges = []
+        attempt = {'resumed': False}
+
+        def get(url, headers=None, **kwargs):
+            range_header = (headers or {}).get('Range')
+            requested_ranges.append(range_header)
+            start, end = 0, len(body) - 1
+            if range_header is not None:
+                first, last = range_header[len('bytes='):].split('-')
+                start, end = int(first), int(last) if last else len(body) - 1
+            response = MagicMock(status_code=206 if range_header else 200)
+            response.__enter__.return_value = response
+            response.headers = {'ETag': '"large"', 'Content-Length': str(end + 1 - start)}
+            if range_header is not None:
+                response.headers['Content-Range'] = f'bytes {start}-{end}/{len(body)}'
+            chunks = [body[x:min(x + 4096, end + 1)] for x in range(start, end + 1, 4096)]
+            if start == 0 and range_header is not None and not attempt['resumed']:
+                # the first part of the first attempt loses its connection as the session is stopped
+                def dropped(size):
+                    yield chunks[0]
+                    self.mock_stop_run.is_set.return_value = True
+                    raise ConnectionError()
+                response.iter_content.side_effect = dropped
+            else:
+                response.iter_content.side_effect = lambda size: iter(chunks)
+            return response
+        mock_get.side_effect = get
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        job = self.make_job(self.content3, file_path=os.path.join(temp_dir.name, 'video.mp4'))
+        self.mock_settings_manager.use_multi_part_downloader = True
+        self.mock_settings_manager.multi_part_threshold = 64 * 1024
+        self.mock_settings_manager.multi_part_chunk_size = 32 * 1024
+        self.mock_settings_manager.multi_part_thread_count = 4
+        self.downloader.make_executor()
+        self.addCleanup(self.downloader.executor.shutdown)
+        self.addCleanup(self.downloader.range_pool.shutdown)
+        self.downloader.finish_download = MagicMock()
+        self.downloader.handle_download_stopped = MagicMock()
+
+        self.downloader.download(job=job)
 
-    @patch('DownloaderForReddit.core.download.downloader.requests.get')
+        self.downloader.handle_download_stopped.assert_called_once_with(job)
+        self.assertFalse(os.path.exists(job.file_path))
+        self.assertTrue(os.path.exists(f'{job.file_path}.part.json'))
+
+        requested_ranges.clear()
+        attempt['resumed'] = True
+        self.mock_stop_run.is_set.return_value = False
+        self.downloader.download(job=job)
+
+        self.downloader.finish_download.assert_called_once_with(job, None)
+        with open(job.file_path, 'rb') as file:
+            self.assertEqual(body, file.read())
+        self.assertEqual(['video.mp4'], os.listdir(temp_dir.name))
+        # the partial file is checked with a range request rather than downloaded again from the start
+        self.assertEqual('bytes=4096-', requested_ranges[0])
+        self.assertNotIn(None, requested_ranges)
+
+    def test_is_duplicate_content_checks_unwritten_results(self):
+        self.downloader.status_writer.has_downloaded_hash.return_value = True
+
+        self.assertTrue(self.downloader.is_duplicate_content('a0uqlka0f9'))
+
+    @patch('DownloaderForReddit.core.download.downloader.session_pool.get')
     def test_download_successful(self, mock_get):
         self.setup_mock_downloader_methods()
         self.downloader.should_use_multi_part.return_value = False
@@ -178,12 +291,13 @@ class TestDownloader(TestCase):
         mock_response.status_code = 200
         mock_response.headers = {'Content-Length': self.multi_part_limit - 100}
         mock_get.return_value = mock_response
-        self.downloader.download(content_id=self.content3.id)
+        self.downloader.download(job=self.job)
 
-        mock_get.assert_called_once_with(self.content3.url, stream=True, timeout=10, headers={})
-        self.downloader.finish_download.assert_called_once_with(self.content3)
+        mock_get.assert_called_once_with(self.job.url, stream=True, timeout=10, headers={})
+        self.downloader.finish_download.assert_called_once_with(
+            self.job, self.downloader.download_without_hash.return_value)
 
-    @patch('DownloaderForReddit.core.download.downloader.requests.get')
+    @patch('DownloaderForReddit.core.download.downloader.session_pool.get')
     def test_download_with_small_file(self, mock_get):
         self.setup_mock_downloader_methods()
         mock_response = MagicMock()
@@ -191,38 +305,117 @@ class TestDownloader(TestCase):
         mock_response.headers = {'Content-Length': '512'}
         mock_get.return_value = mock_response
 
-        self.downloader.download(content_id=self.content3.id)
+        self.downloader.download(job=self.job)
 
         self.downloader.finish_download.assert_not_called()
-        self.downloader.handle_deleted_content_error.assert_called_once_with(self.content3)
+        self.downloader.handle_deleted_content_error.assert_called_once_with(self.job)
 
-    @patch('DownloaderForReddit.core.download.downloader.requests.get')
+    @patch('DownloaderForReddit.core.download.downloader.session_pool.get')
     def test_download_unsuccessful_response(self, mock_get):
         self.setup_mock_downloader_methods()
         mock_response = MagicMock()
         mock_response.status_code = 404
         mock_get.return_value = mock_response
 
-        self.downloader.download(content_id=self.content3.id)
+        self.downloader.download(job=self.job)
 
-        self.downloader.handle_unsuccessful_response.assert_called_once_with(self.content3, 404)
+        self.downloader.handle_unsuccessful_response.assert_called_once_with(self.job, 404)
         self.downloader.finish_download.assert_not_called()
 
 
-    @patch('DownloaderForReddit.core.download.downloader.requests.get')
+    @patch('DownloaderForReddit.core.download.downloader.session_pool.get')
     def test_download_connection_error(self, mock_get):
         self.setup_mock_downloader_methods()
         mock_get.side_effect = ConnectionError
 
-        self.downloader.download(content_id=self.content3.id)
+        self.downloader.download(job=self.job)
 
-        self.downloader.handle_connection_error.assert_called_once_with(self.content3)
+        self.downloader.handle_connection_error.assert_called_once_with(self.job)
 
-    @patch('DownloaderForReddit.core.download.downloader.requests.get')
+    @patch('DownloaderForReddit.core.download.downloader.session_pool.get')
     def test_download_unknown_error(self, mock_get):
         self.setup_mock_downloader_methods()
         mock_get.side_effect = Exception
 
-        self.downloader.download(content_id=self.content3.id)
+        self.downloader.download(job=self.job)
+
+        self.downloader.handle_unknown_error.assert_called_once_with(self.job)
+
+    def test_run_dispatches_all_queued_content(self):
+        for content in [self.content1, self.content2]:
+            content.url = 'http://example.com/other'
+            content.title = 'other'
+            content.extension = 'jpg'
+            content.directory_path = '/mock/path'
+        self.session.commit()
+        queue = Queue()
+        for item in ['HOLD', self.content1.id, 'RELEASE_HOLD', self.content2.id, self.content3.id, None]:
+            queue.put(item)
+        self.downloader.download_queue = queue
+        self.downloader.should_use_hash = MagicMock(return_value=False)
+        self.downloader.download = MagicMock()
+
+        self.downloader.run()
+
+        downloaded = sorted(x.kwargs['job'].content_id for x in self.downloader.download.call_args_list)
+        self.assertEqual(sorted([self.content1.id, self.content2.id, self.content3.id]), downloaded)
+        self.assertEqual(0, len(self.downloader.futures))
+        self.assertEqual(0, self.downloader.scheduler.pending_count)
+        self.assertEqual(0, self.downloader.scheduler.active_count)
+        self.assertTrue(self.downloader.range_pool.executor._shutdown)
+
+    def test_run_leaves_pooled_sessions_open(self):
+        # extractors may still be using the pooled sessions when the downloader finishes
+        queue = Queue()
+        queue.put(None)
+        self.downloader.download_queue = queue
+        with patch('DownloaderForReddit.core.download.downloader.session_pool.close_all') as close_all:
+            self.downloader.run()
+        close_all.assert_not_called()
+        self.downloader.status_writer.close.assert_called_once()
+
+    def test_resolve_jobs_uses_one_session_per_batch(self):
+        self.downloader.should_use_hash = MagicMock(return_value=True)
+        self.downloader.schedule(self.content3.id)
+        self.downloader.schedule(self.content3.id + 100)
+
+        self.downloader.resolve_jobs()
+
+        self.downloader.db.get_scoped_session.assert_called_once()
+        job, host = self.downloader.scheduler.pop_ready()
+        self.assertEqual(self.content3.id, job.content_id)
+        self.assertEqual('example.com', host)
+        self.assertTrue(job.use_hash)
+        self.assertEqual([], self.downloader.unresolved)
+
+    def test_resolved_jobs_do_not_share_file_paths(self):
+        content = Content(url='http://example.com/other', title='example', extension='txt',
+                          directory_path='/mock/path')
+        self.session.add(content)
+        self.session.commit()
+        self.downloader.should_use_hash = MagicMock(return_value=False)
+        self.downloader.schedule(self.content3.id)
+        self.downloader.schedule(content.id)
+
+        original = type(self)._original_ensure_content_download_path
+        with patch.object(general_utils, 'ensure_content_download_path', original), \
+                patch('DownloaderForReddit.utils.general_utils.system_util.create_directory'):
+            self.downloader.resolve_jobs()
+
+        jobs = [self.downloader.scheduler.pop_ready()[0] for _ in range(2)]
+        self.assertEqual(['example', 'example(1)'], sorted(x.download_title for x in jobs))
+
+        self.downloader.release_path(jobs[0].file_path)
+
+        self.assertEqual({jobs[1].file_path}, self.downloader.reserved_paths)
+
+    def test_too_many_requests_response_throttles_host(self):
+        self.setup_mock_downloader_methods()
+        response = MagicMock(status_code=429, headers={'Retry-After': '30'})
+        self.downloader.scheduler = MagicMock()
+        self.downloader.scheduler.get_host.return_value = 'example.com'
+
+        self.downloader.handle_response(self.job, response)
 
-        self.downloader.handle_unknown_error.assert_called_once_with(self.content3)
+        self.downloader.scheduler.throttle.assert_called_once_with('example.com', 30)
+        self.downloader.handle_unsuccessful_response.assert_called_once_with(self.job, 429)
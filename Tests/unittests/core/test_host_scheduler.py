@@ -0,0 +1,120 @@
+from unittest import TestCase
+
+from DownloaderForReddit.core.download.host_scheduler import HostScheduler, TokenBucket
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_consume_until_empty(self):
+        bucket = TokenBucket(2, clock=self.clock)
+        self.assertTrue(bucket.consume())
+        self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+        self.assertAlmostEqual(0.5, bucket.time_until_available())
+
+    def test_refill_over_time(self):
+        bucket = TokenBucket(1, clock=self.clock)
+        bucket.consume()
+        self.assertFalse(bucket.consume())
+        self.clock.now = 1.0
+        self.assertTrue(bucket.consume())
+
+    def test_refill_does_not_exceed_capacity(self):
+        bucket = TokenBucket(1, capacity=2, clock=self.clock)
+        self.clock.now = 100
+        self.assertTrue(bucket.consume())
+        self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+
+    def test_pause(self):
+        bucket = TokenBucket(5, clock=self.clock)
+        bucket.pause(10)
+        self.assertFalse(bucket.consume())
+        self.assertEqual(10, bucket.time_until_available())
+        self.clock.now = 10
+        self.assertTrue(bucket.consume())
+
+
+class TestHostScheduler(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_get_host_matches_configured_sub_domains(self):
+        scheduler = HostScheduler(4, host_limits={'imgur.com': 2})
+        self.assertEqual('imgur.com', scheduler.get_host('https://i.imgur.com/abc.jpg'))
+        self.assertEqual('imgur.com', scheduler.get_host('https://www.imgur.com/abc'))
+        self.assertEqual('i.redd.it', scheduler.get_host('https://i.redd.it/abc.jpg'))
+        self.assertEqual('', scheduler.get_host(None))
+
+    def test_host_limit_lets_other_hosts_through(self):
+        scheduler = HostScheduler(4, host_limits={'imgur.com': 2})
+        for x in range(4):
+            scheduler.add(f'imgur_{x}', f'https://i.imgur.com/{x}.jpg')
+        scheduler.add('reddit_0', 'https://i.redd.it/0.jpg')
+        scheduler.add('reddit_1', 'https://i.redd.it/1.jpg')
+
+        started = [scheduler.pop_ready() for _ in range(4)]
+
+        self.assertEqual(['imgur_0', 'reddit_0', 'imgur_1', 'reddit_1'], [x[0] for x in started])
+        self.assertIsNone(scheduler.pop_ready())
+        self.assertEqual(2, scheduler.pending_count)
+        self.assertEqual(4, scheduler.active_count)
+
+    def test_release_frees_host_capacity(self):
+        scheduler = HostScheduler(1)
+        scheduler.add(1, 'https://i.redd.it/1.jpg')
+        scheduler.add(2, 'https://i.redd.it/2.jpg')
+        item, host = scheduler.pop_ready()
+        self.assertIsNone(scheduler.pop_ready())
+
+        scheduler.release(host)
+
+        self.assertEqual((2, 'i.redd.it'), scheduler.pop_ready())
+
+    def test_rate_limit(self):
+        scheduler = HostScheduler(4, host_rates={'redgifs.com': 1}, clock=self.clock)
+        scheduler.add(1, 'https://thumbs.redgifs.com/1.mp4')
+        scheduler.add(2, 'https://thumbs.redgifs.com/2.mp4')
+        self.assertEqual(1, scheduler.pop_ready()[0])
+        self.assertIsNone(scheduler.pop_ready())
+        self.assertEqual(1, scheduler.time_until_ready())
+
+        self.clock.now = 1
+
+        self.assertEqual(2, scheduler.pop_ready()[0])
+
+    def test_time_until_ready_ignores_hosts_at_concurrency_limit(self):
+        scheduler = HostScheduler(1, clock=self.clock)
+        self.assertIsNone(scheduler.time_until_ready())
+        scheduler.add(1, 'https://i.redd.it/1.jpg')
+        self.assertEqual(0, scheduler.time_until_ready())
+        scheduler.add(2, 'https://i.redd.it/2.jpg')
+        scheduler.pop_ready()
+        self.assertIsNone(scheduler.time_until_ready())
+
+    def test_throttle(self):
+        scheduler = HostScheduler(4, clock=self.clock)
+        scheduler.throttle('i.imgur.com', 30)
+        scheduler.add(1, 'https://i.imgur.com/1.jpg')
+        scheduler.add(2, 'https://i.redd.it/2.jpg')
+
+        self.assertEqual(2, scheduler.pop_ready()[0])
+        self.assertIsNone(scheduler.pop_ready())
+        self.assertEqual(30, scheduler.time_until_ready())
+
+        self.clock.now = 30
+
+        self.assertEqual(1, scheduler.pop_ready()[0])
@@ -0,0 +1,211 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from DownloaderForReddit.core.download.multipart_downloader import MultipartDownloader, RangeFetchPool
+from DownloaderForReddit.core.download.partial_download import PartialDownload
+from DownloaderForReddit.utils import injector
+
+
+FILE_BODY = os.urandom(100 * 1024 + 17)
+
+
+def make_range_response(url, headers, **kwargs):
+    start, end = (int(x) for x in headers['Range'][len('bytes='):].split('-'))
+    body = FILE_BODY[start:end + 1]
+    response = MagicMock(status_code=206)
+    response.__enter__.return_value = response
+    response.iter_content.side_effect = lambda size: (body[x:x + size] for x in range(0, len(body), size))
+    return response
+
+
+class TestMultipartDownloader(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'file.bin')
+        injector.settings_manager = MagicMock(multi_part_thread_count=4, multi_part_chunk_size=30 * 1024)
+        self.stop_run = MagicMock()
+        self.stop_run.is_set.return_value = False
+        self.job = MagicMock(url='https://i.redd.it/file.bin', headers=None)
+        self.range_pool = RangeFetchPool(4)
+        self.downloader = MultipartDownloader(self.stop_run, self.range_pool)
+        self.downloader.STREAM_BUFFER_SIZE = 4 * 1024
+        self.partial = PartialDownload(self.path, self.job.url, etag='"file"')
+
+    def tearDown(self):
+        self.range_pool.shutdown()
+        self.temp_dir.cleanup()
+
+    @patch('DownloaderForReddit.core.download.multipart_downloader.session_pool.get')
+    def test_ranges_are_written_to_their_offsets(self, mock_get):
+        mock_get.side_effect = make_range_response
+
+        self.downloader.run(self.job, self.partial, len(FILE_BODY))
+
+        with open(self.path, 'rb') as file:
+            self.assertEqual(FILE_BODY, file.read())
+        self.assertEqual(4, self.downloader.part_count)
+        self.assertEqual(0, self.downloader.failed_parts)
+        self.assertTrue(self.downloader.complete)
+        self.assertEqual(['file.bin'], os.listdir(self.temp_dir.name))
+        last_range = sorted(x.kwargs['headers']['Range'] for x in mock_get.call_args_list)[-1]
+        self.assertEqual(f'bytes=92160-{len(FILE_BODY) - 1}', last_range)
+        self.assertEqual(0, self.range_pool.in_flight)
+        self.assertEqual(4, self.range_pool.fetched)
+
+    @patch('DownloaderForReddit.core.download.multipart_downloader.session_pool.get')
+    def test_downloads_share_the_range_pool(self, mock_get):
+        mock_get.side_effect = make_range_response
+        other_path = os.path.join(self.temp_dir.name, 'other.bin')
+        other = MultipartDownloader(self.stop_run, self.range_pool)
+
+        self.downloader.run(self.job, self.partial, len(FILE_BODY))
+        other.run(self.job, PartialDownload(other_path, self.job.url), len(FILE_BODY))
+
+        self.assertEqual(8, self.range_pool.fetched)
+        self.assertLessEqual(len(self.range_pool.executor._threads), 4)
+
+    @patch('DownloaderForReddit.core.download.multipart_downloader.session_pool.get')
+    def test_incomplete_range_is_resumed_then_counted_as_failed(self, mock_get):
+        def short_response(url, headers, **kwargs):
+            response = make_range_response(url, headers)
+            start = int(headers['Range'][len('bytes='):].split('-')[0])
+            if start < 30 * 1024:
+                response.iter_content.side_effect = lambda size: iter([FILE_BODY[start:start + 10]])
+            return response
+        mock_get.side_effect = short_response
+
+        self.downloader.run(self.job, self.partial, len(FILE_BODY))
+
+        self.assertEqual(1, self.downloader.failed_parts)
+        self.assertFalse(self.downloader.complete)
+        self.assertEqual(len(FILE_BODY), os.path.getsize(self.partial.part_path))
+        first_part_ranges = [x.kwargs['headers']['Range'] for x in mock_get.call_args_list
+                             if int(x.kwargs['headers']['Range'][len('bytes='):].split('-')[0]) < 30 * 1024]
+        self.assertEqual(['bytes=0-30719', 'bytes=10-30719', 'bytes=20-30719'], first_part_ranges)
+
+    @patch('DownloaderForReddit.core.download.multipart_downloader.session_pool.get')
+    def test_part_stopped_before_it_is_finished_is_counted_as_failed(self, mock_get):
+        def stopped_first_part(url, headers, **kwargs):
+            response = make_range_response(url, headers)
+            if headers['Range'].startswith('bytes=0-'):
+                def dropped_chunks(size):
+                    yield FILE_BODY[:10]
+                    # the session is stopped while the part's connection is lost, so the part is not retried
+                    self.stop_run.is_set.return_value = True
+                    raise requests.exceptions.ChunkedEncodingError()
+                response.iter_content.side_effect = dropped_chunks
+            return response
+        mock_get.side_effect = stopped_first_part
+
+        self.downloader.run(self.job, self.partial, len(FILE_BODY))
+
+        # parts that had not finished when the session was stopped are failed as well as the interrupted part
+        self.assertGreaterEqual(self.downloader.failed_parts, 1)
+        self.assertFalse(self.downloader.complete)
+        first_part_ranges = [x.kwargs['headers']['Range'] for x in mock_get.call_args_list
+                             if x.kwargs['headers']['Range'].startswith('bytes=0-')]
+        self.assertEqual(['bytes=0-30719'], first_part_ranges)
+
+    @patch('DownloaderForReddit.core.download.multipart_downloader.session_pool.get')
+    def test_stopped_download_is_resumed_from_its_written_ranges(self, mock_get):
+        def stopped_first_part(url, headers, **kwargs):
+            response = make_range_response(url, headers)
+            if headers['Range'].startswith('bytes=0-'):
+                def dropped_chunks(size):
+                    yield FILE_BODY[:10]
+                    self.stop_run.is_set.return_value = True
+                    raise requests.exceptions.ChunkedEncodingError()
+                response.iter_content.side_effect = dropped_chunks
+            return response
+        mock_get.side_effect = stopped_first_part
+        self.downloader.run(self.job, self.partial, len(FILE_BODY))
+        self.assertFalse(os.path.exists(self.path))
+
+        partial = PartialDownload.load(self.path, self.job.url)
+        self.assertTrue(partial.multipart)
+        self.assertIn((0, 9), partial.ranges)
+        self.assertEqual(10, partial.resume_offset)
+        self.stop_run.is_set.return_value = False
+        mock_get.reset_mock()
+        mock_get.side_effect = make_range_response
+        downloader = MultipartDownloader(self.stop_run, self.range_pool)
+        downloader.run(self.job, partial, len(FILE_BODY))
+
+        self.assertTrue(downloader.complete)
+        with open(self.path, 'rb') as file:
+            self.assertEqual(FILE_BODY, file.read())
+        self.assertEqual(['file.bin'], os.listdir(self.temp_dir.name))
+        requested = [x.kwargs['headers'] for x in mock_get.call_args_list]
+        self.assertTrue(all(x['If-Range'] == '"file"' for x in requested))
+        starts = [int(x['Range'][len('bytes='):].split('-')[0]) for x in requested]
+        self.assertEqual(10, min(starts))
+        # the ranges that were written before the stop are not requested again
+        self.assertLess(sum(int(x['Range'].split('-')[1]) + 1 - start for x, start in zip(requested, starts)),
+                        len(FILE_BODY))
+
+    @patch('DownloaderForReddit.core.download.multipart_downloader.session_pool.get')
+    def test_partial_written_start_to_end_is_finished_in_parts(self, mock_get):
+        mock_get.side_effect = make_range_response
+        with open(self.partial.part_path, 'wb') as file:
+            file.write(FILE_BODY[:50 * 1024])
+        self.partial.offset = 50 * 1024
+
+        self.downloader.run(self.job, self.partial, len(FILE_BODY))
+
+        with open(self.path, 'rb') as file:
+            self.assertEqual(FILE_BODY, file.read())
+        starts = [int(x.kwargs['headers']['Range'][len('bytes='):].split('-')[0]) for x in mock_get.call_args_list]
+        self.assertEqual(50 * 1024, min(starts))
+
+    @patch('DownloaderForReddit.core.download.multipart_downloader.session_pool.get')
+    def test_straggling_part_is_split(self, mock_get):
+        injector.settings_manager.multi_part_chunk_size = 4 * 1024
+        self.downloader = MultipartDownloader(self.stop_run, self.range_pool)
+        self.downloader.STREAM_BUFFER_SIZE = 1024
+
+        def slow_first_part(url, headers, **kwargs):
+            response = make_range_response(url, headers)
+            if headers['Range'].startswith('bytes=0-'):
+                chunks = response.iter_content.side_effect
+
+                def slow_chunks(size):
+                    for chunk in chunks(size):
+                        time.sleep(0.01)
+                        yield chunk
+                response.iter_content.side_effect = slow_chunks
+            return response
+        mock_get.side_effect = slow_first_part
+
+        self.downloader.run(self.job, self.partial, len(FILE_BODY))
+
+        with open(self.path, 'rb') as file:
+            self.assertEqual(FILE_BODY, file.read())
+        self.assertGreater(self.downloader.part_count, 4)
+        self.assertEqual(0, self.downloader.failed_parts)
+
+    def test_plan_parts_without_measurements_splits_between_free_workers(self):
+        parts = self.downloader.plan_parts(500 * 1024 * 1024, 'https://v.redd.it')
+
+        self.assertEqual(16, len(parts))
+        self.assertEqual(0, parts[0].start)
+        self.assertEqual(500 * 1024 * 1024 - 1, parts[-1].end)
+
+    def test_plan_parts_grows_parts_on_fast_links(self):
+        self.range_pool.throughput.record('https://v.redd.it', 50 * 1024 * 1024, 1, 0.05)
+
+        parts = self.downloader.plan_parts(500 * 1024 * 1024, 'https://v.redd.it')
+
+        self.assertEqual(4, len(parts))
+
+    def test_plan_parts_keeps_parts_above_latency_floor(self):
+        self.range_pool.throughput.record('https://v.redd.it', 1024 * 1024, 1, 1)
+
+        parts = self.downloader.plan_parts(20 * 1024 * 1024, 'https://v.redd.it')
+
+        self.assertEqual(2, len(parts))
@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from DownloaderForReddit.core.download.partial_download import PartialDownload, get_total_size, merge_ranges
+
+
+class TestPartialDownload(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, 'example.jpg')
+        self.url = 'https://i.redd.it/example.jpg'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_partial(self, data=b'12345', url=None, etag='"abc"', last_modified=None):
+        with open(f'{self.file_path}.part', 'wb') as file:
+            file.write(data)
+        with open(f'{self.file_path}.part.json', 'w') as file:
+            json.dump({'url': url or self.url, 'etag': etag, 'last_modified': last_modified}, file)
+
+    def test_load_no_partial_file(self):
+        self.assertIsNone(PartialDownload.load(self.file_path, self.url))
+
+    def test_load_resumable_partial(self):
+        self.write_partial()
+
+        partial = PartialDownload.load(self.file_path, self.url)
+
+        self.assertEqual(5, partial.offset)
+        self.assertEqual({'Range': 'bytes=5-', 'If-Range': '"abc"'}, partial.get_range_headers())
+
+    def test_load_discards_partial_for_different_url(self):
+        self.write_partial(url='https://i.redd.it/other.jpg')
+
+        self.assertIsNone(PartialDownload.load(self.file_path, self.url))
+        self.assertFalse(os.path.exists(f'{self.file_path}.part'))
+        self.assertFalse(os.path.exists(f'{self.file_path}.part.json'))
+
+    def test_load_discards_partial_without_strong_validator(self):
+        self.write_partial(etag='W/"abc"')
+
+        self.assertIsNone(PartialDownload.load(self.file_path, self.url))
+        self.assertFalse(os.path.exists(f'{self.file_path}.part'))
+
+    def test_weak_etag_falls_back_to_last_modified(self):
+        self.write_partial(etag='W/"abc"', last_modified='Wed, 21 Oct 2015 07:28:00 GMT')
+
+        partial = PartialDownload.load(self.file_path, self.url)
+
+        self.assertEqual('Wed, 21 Oct 2015 07:28:00 GMT', partial.get_range_headers()['If-Range'])
+
+    def test_load_discards_partial_with_corrupt_state(self):
+        self.write_partial()
+        with open(f'{self.file_path}.part.json', 'w') as file:
+            file.write('not json')
+
+        self.assertIsNone(PartialDownload.load(self.file_path, self.url))
+        self.assertFalse(os.path.exists(f'{self.file_path}.part'))
+
+    def test_start_without_resume_restarts_partial(self):
+        self.write_partial()
+        partial = PartialDownload.load(self.file_path, self.url)
+
+        partial.start({'ETag': '"def"'}, resuming=False)
+
+        self.assertEqual(0, partial.offset)
+        self.assertEqual('"def"', partial.etag)
+        with open(partial.state_path, 'r') as file:
+            self.assertEqual('"def"', json.load(file)['etag'])
+
+    def test_complete(self):
+        self.write_partial()
+        partial = PartialDownload.load(self.file_path, self.url)
+        with partial.open() as file:
+            file.write(b'6789')
+
+        partial.complete()
+
+        with open(self.file_path, 'rb') as file:
+            self.assertEqual(b'123456789', file.read())
+        self.assertFalse(os.path.exists(partial.part_path))
+        self.assertFalse(os.path.exists(partial.state_path))
+
+    def test_multi_part_ranges_are_saved_and_loaded(self):
+        with open(f'{self.file_path}.part', 'wb') as file:
+            file.truncate(100)
+        partial = PartialDownload(self.file_path, self.url, etag='"abc"')
+        partial.start_multipart(100)
+        partial.add_ranges([(30, 49), (0, 9), (10, 19)])
+        partial.save()
+
+        loaded = PartialDownload.load(self.file_path, self.url)
+
+        self.assertTrue(loaded.multipart)
+        self.assertEqual([(0, 19), (30, 49)], loaded.ranges)
+        self.assertEqual([(20, 29), (50, 99)], loaded.get_missing_ranges())
+        self.assertEqual({'Range': 'bytes=20-', 'If-Range': '"abc"'}, loaded.get_range_headers())
+
+    def test_multi_part_partial_of_wrong_size_is_discarded(self):
+        with open(f'{self.file_path}.part', 'wb') as file:
+            file.truncate(50)
+        partial = PartialDownload(self.file_path, self.url, etag='"abc"', size=100, ranges=[(0, 9)])
+        partial.save()
+
+        self.assertIsNone(PartialDownload.load(self.file_path, self.url))
+
+    def test_partial_written_start_to_end_becomes_first_range(self):
+        self.write_partial()
+        partial = PartialDownload.load(self.file_path, self.url)
+
+        partial.start_multipart(100)
+
+        self.assertEqual([(0, 4)], partial.ranges)
+        self.assertEqual([(5, 99)], partial.get_missing_ranges())
+
+    def test_merge_ranges(self):
+        self.assertEqual([(0, 9), (20, 29)], merge_ranges([[20, 25], [0, 4], [5, 9], [22, 29]]))
+
+    def test_get_total_size(self):
+        self.assertEqual(100, get_total_size(200, {'Content-Length': '100'}))
+        self.assertEqual(100, get_total_size(206, {'Content-Length': '40', 'Content-Range': 'bytes 60-99/100'}))
+        self.assertEqual(40, get_total_size(206, {'Content-Length': '40', 'Content-Range': 'bytes 60-99/*'}))
@@ -0,0 +1,72 @@
+import time
+from queue import Empty
+from unittest import TestCase
+from datetime import datetime, timedelta
+
+from DownloaderForReddit.core.download_runner import RunPair
+from DownloaderForReddit.core.poll_scheduler import PollScheduler
+from DownloaderForReddit.database.database_handler import DatabaseHandler
+from DownloaderForReddit.database.models import Post
+
+
+class TestPollScheduler(TestCase):
+
+    def setUp(self):
+        self.db = DatabaseHandler(in_memory=True)
+        self.session = self.db.get_session()
+
+    def tearDown(self):
+        self.session.close()
+
+    def add_history(self, reddit_object_id, gap, count=10, last_post_age=timedelta(0)):
+        last = datetime.now() - last_post_age
+        self.session.bulk_insert_mappings(Post, [
+            {'title': f'post {x}', 'significant_reddit_object_id': reddit_object_id, 'date_posted': last - gap * x}
+            for x in range(count)
+        ])
+        self.session.commit()
+
+    def test_interval_is_estimated_from_post_history(self):
+        self.add_history(1, timedelta(hours=2))
+        scheduler = PollScheduler(self.db, min_interval=60, max_interval=86400)
+        self.assertAlmostEqual(3600, scheduler.get_next_interval(1, 0), delta=5)
+
+    def test_quiet_object_interval_grows_with_time_since_last_post(self):
+        self.add_history(1, timedelta(hours=1), last_post_age=timedelta(days=10))
+        scheduler = PollScheduler(self.db, min_interval=60, max_interval=86400 * 30)
+        self.assertAlmostEqual(5 * 86400, scheduler.get_next_interval(1, 0), delta=5)
+
+    def test_interval_is_clamped(self):
+        self.add_history(1, timedelta(seconds=5))
+        self.add_history(2, timedelta(days=30))
+        scheduler = PollScheduler(self.db, min_interval=60, max_interval=3600)
+        self.assertEqual(60, scheduler.get_next_interval(1, 0))
+        self.assertEqual(3600, scheduler.get_next_interval(2, 0))
+
+    def test_object_without_history_starts_between_bounds(self):
+        scheduler = PollScheduler(self.db, min_interval=100, max_interval=10000)
+        self.assertAlmostEqual(1000, scheduler.get_next_interval(1, 0))
+
+    def test_found_posts_speed_up_and_empty_checks_back_off(self):
+        scheduler = PollScheduler(self.db, min_interval=10, max_interval=100000)
+        scheduler.intervals[1] = 1000
+        self.assertEqual(500, scheduler.get_next_interval(1, 3))
+        self.assertEqual(750, scheduler.get_next_interval(1, 0))
+
+    def test_pairs_are_returned_in_due_order(self):
+        scheduler = PollScheduler(self.db, min_interval=0, max_interval=1000)
+        scheduler.intervals.update({1: 0.3, 2: 0.02})
+        scheduler.put(RunPair(1, 'USER', 'user_1'), found_count=0)
+        scheduler.put(RunPair(2, 'USER', 'user_2'), found_count=1)
+
+        self.assertEqual(2, scheduler.get(timeout=1).reddit_object_id)
+        self.assertEqual(1, scheduler.get(timeout=1).reddit_object_id)
+
+    def test_get_raises_empty_when_nothing_is_due(self):
+        scheduler = PollScheduler(self.db, min_interval=60, max_interval=1000)
+        scheduler.put(RunPair(1, 'USER', 'user_1'))
+        start = time.monotonic()
+        with self.assertRaises(Empty):
+            scheduler.get(timeout=0.05)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(1, len(scheduler))
@@ -0,0 +1,92 @@
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from Tests.mockobjects.mock_reddit import MockReddit
+from DownloaderForReddit.core.score_updater import ScoreUpdater
+from DownloaderForReddit.database.database_handler import DatabaseHandler
+from DownloaderForReddit.database.models import Post
+
+
+class TestScoreUpdater(TestCase):
+
+    def setUp(self):
+        self.db = DatabaseHandler(in_memory=True)
+        self.session = self.db.get_session()
+        self.message_patcher = patch('DownloaderForReddit.core.score_updater.Message')
+        self.message_patcher.start()
+
+    def tearDown(self):
+        self.message_patcher.stop()
+        self.session.close()
+
+    def add_posts(self, count):
+        self.session.bulk_insert_mappings(Post, [{'reddit_id': f'p{x}', 'score': 1, 'title': f'post {x}'}
+                                                 for x in range(count)])
+        self.session.commit()
+        return [x for x, in self.session.query(Post.id).order_by(Post.id)]
+
+    def get_scores(self):
+        self.session.expire_all()
+        return {x.reddit_id: x.score for x in self.session.query(Post)}
+
+    def test_scores_are_requested_in_batches_of_one_hundred(self):
+        post_ids = self.add_posts(250)
+        reddit = MockReddit({f'p{x}': x for x in range(250)})
+        updater = ScoreUpdater(reddit, self.db)
+
+        result = updater.update(post_ids)
+
+        self.assertEqual([100, 100, 50], sorted((len(x) for x in reddit.info_calls), reverse=True))
+        self.assertTrue(all(x.startswith('t3_') for call in reddit.info_calls for x in call))
+        self.assertEqual({f'p{x}': x for x in range(250)}, self.get_scores())
+        self.assertEqual(249, result.updated)
+        self.assertEqual(1, result.unchanged)
+
+    def test_scores_are_written_with_one_update_per_batch(self):
+        post_ids = self.add_posts(200)
+        reddit = MockReddit({f'p{x}': 5 for x in range(200)})
+        updater = ScoreUpdater(reddit, self.db)
+
+        with patch.object(self.db, 'get_scoped_update_session', wraps=self.db.get_scoped_update_session) as update:
+            updater.update(post_ids)
+
+        self.assertEqual(2, update.call_count)
+
+    def test_deleted_and_failed_posts_are_counted(self):
+        post_ids = self.add_posts(150)
+        reddit = MockReddit({f'p{x}': 3 for x in range(140)})
+        reddit.fail_next = 1
+        updater = ScoreUpdater(reddit, self.db, max_concurrency=1)
+
+        result = updater.update(post_ids)
+
+        self.assertEqual(100, result.failed)
+        self.assertEqual(40, result.updated)
+        self.assertEqual(10, result.missing)
+
+    def test_concurrent_requests_are_bounded(self):
+        post_ids = self.add_posts(1000)
+        reddit = MockReddit({f'p{x}': 2 for x in range(1000)}, latency=0.05)
+        updater = ScoreUpdater(reddit, self.db, max_concurrency=3)
+
+        start = time.perf_counter()
+        updater.update(post_ids)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(10, len(reddit.info_calls))
+        self.assertEqual(3, reddit.max_active_requests)
+        # ten requests of 50ms take half a second one at a time
+        self.assertLess(elapsed, 0.4)
+
+    def test_stopped_update_makes_no_requests(self):
+        post_ids = self.add_posts(300)
+        reddit = MockReddit({f'p{x}': 2 for x in range(300)})
+        stop_run = MagicMock()
+        stop_run.is_set.return_value = True
+        updater = ScoreUpdater(reddit, self.db, stop_run=stop_run)
+
+        result = updater.update(post_ids)
+
+        self.assertEqual([], reddit.info_calls)
+        self.assertEqual(300, result.failed)
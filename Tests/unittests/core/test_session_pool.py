@@ -0,0 +1,64 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from threading import Thread
+
+from DownloaderForReddit.core.download import session_pool
+from DownloaderForReddit.utils import injector
+
+
+class TestSessionPool(TestCase):
+
+    def setUp(self):
+        self.settings_manager = MagicMock(connection_pool_size=4)
+        injector.settings_manager = self.settings_manager
+        session_pool.close_all()
+
+    def tearDown(self):
+        session_pool.close_all()
+
+    def test_get_host_key(self):
+        self.assertEqual('https://i.redd.it', session_pool.get_host_key('https://i.redd.it/abc123.jpg'))
+        self.assertEqual('https://i.imgur.com', session_pool.get_host_key('https://I.IMGUR.com/xyz.png?x=1'))
+        self.assertEqual('http://i.imgur.com', session_pool.get_host_key('http://i.imgur.com/xyz.png'))
+
+    def test_same_host_shares_session(self):
+        first = session_pool.get_session('https://i.redd.it/abc123.jpg')
+        second = session_pool.get_session('https://i.redd.it/def456.jpg')
+        self.assertIs(first, second)
+
+    def test_different_hosts_get_different_sessions(self):
+        reddit = session_pool.get_session('https://i.redd.it/abc123.jpg')
+        imgur = session_pool.get_session('https://i.imgur.com/abc123.jpg')
+        self.assertIsNot(reddit, imgur)
+
+    def test_pool_size_taken_from_settings(self):
+        session = session_pool.get_session('https://i.redd.it/abc123.jpg')
+        adapter = session.get_adapter('https://i.redd.it/abc123.jpg')
+        self.assertEqual(4, adapter._pool_maxsize)
+
+    def test_invalid_pool_size_uses_default(self):
+        self.settings_manager.connection_pool_size = 0
+        self.assertEqual(session_pool.DEFAULT_POOL_SIZE, session_pool.get_pool_size())
+
+    def test_concurrent_access_creates_one_session(self):
+        sessions = []
+        threads = [Thread(target=lambda: sessions.append(session_pool.get_session('https://v.redd.it/a')))
+                   for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(set(id(x) for x in sessions)))
+
+    def test_get_uses_host_session(self):
+        session = MagicMock()
+        with patch.object(session_pool, 'get_session', return_value=session) as get_session:
+            session_pool.get('https://i.redd.it/abc123.jpg', timeout=10)
+        get_session.assert_called_once_with('https://i.redd.it/abc123.jpg')
+        session.get.assert_called_once_with('https://i.redd.it/abc123.jpg', timeout=10)
+
+    def test_close_all_clears_sessions(self):
+        first = session_pool.get_session('https://i.redd.it/abc123.jpg')
+        session_pool.close_all()
+        second = session_pool.get_session('https://i.redd.it/abc123.jpg')
+        self.assertIsNot(first, second)
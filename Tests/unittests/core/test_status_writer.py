@@ -0,0 +1,44 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from DownloaderForReddit.core.download.download_job import DownloadJob
+from DownloaderForReddit.core.download.status_writer import DownloadStatusWriter
+from DownloaderForReddit.core.errors import Error
+from DownloaderForReddit.database.models import Content
+
+
+class TestDownloadStatusWriter(TestCase):
+
+    def setUp(self):
+        self.persistence_queue = MagicMock()
+        self.writer = DownloadStatusWriter(download_session_id=7, persistence_queue=self.persistence_queue)
+        self.job = DownloadJob(12, 'https://i.redd.it/x.jpg', 'content_title', '/path', None, False, None, 'content',
+                               None, None, None, None)
+
+    def test_set_downloaded_queues_content_changes(self):
+        self.writer.set_downloaded(self.job, 'abc')
+
+        self.persistence_queue.update.assert_called_once_with(Content, 12, download_title='content_title',
+                                                              md5_hash='abc')
+        self.persistence_queue.call.assert_called_once_with(Content, 12, 'set_downloaded', 7)
+
+    def test_set_download_error_queues_content_changes(self):
+        self.writer.set_download_error(self.job, Error.CONNECTION_ERROR, 'failed')
+
+        self.persistence_queue.update.assert_called_once_with(Content, 12, download_title='content_title')
+        self.persistence_queue.call.assert_called_once_with(Content, 12, 'set_download_error',
+                                                            Error.CONNECTION_ERROR, 'failed')
+
+    def test_downloaded_hashes_are_remembered_for_the_session(self):
+        self.writer.set_downloaded(self.job, 'abc')
+        self.writer.set_downloaded(self.job)
+
+        self.writer.flush()
+
+        self.assertTrue(self.writer.has_downloaded_hash('abc'))
+        self.assertFalse(self.writer.has_downloaded_hash('xyz'))
+
+    def test_close_flushes_queue(self):
+        self.writer.close()
+
+        self.persistence_queue.flush.assert_called_once()
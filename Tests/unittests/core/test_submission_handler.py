@@ -6,6 +6,7 @@ import prawcore.exceptions
 from Tests.mockobjects import mock_objects
 from DownloaderForReddit.core.submission_handler import SubmissionHandler
 from DownloaderForReddit.core.errors import Error
+from DownloaderForReddit.database.models import Post
 from DownloaderForReddit.utils import injector
 
 
@@ -38,10 +39,13 @@ class TestSubmissionHandler(TestCase):
         self.submission = MagicMock()
         self.post = MagicMock()
         self.mock_queue = MagicMock()
+        self.persistence_queue = MagicMock()
+        injector.persistence_queue = self.persistence_queue
         self.handler = SubmissionHandler(self.submission, self.post, 0, MagicMock(), self.mock_queue, stop_run)
 
     def tearDown(self):
         self.settings.extractor_dict = self.extractor_dict
+        injector.persistence_queue = None
 
     def test_assign_extractor_direct(self):
         post = mock_objects.get_unsupported_direct_post()
@@ -95,11 +99,7 @@ class TestSubmissionHandler(TestCase):
     @patch(f'{PATH}.parse_html_links')
     def test_extract_text_links_single(self, get_links, extract_link):
         url = 'https://gfycat.com/KindlyElderlyCony'
-        link = MagicMock()
-        link.has_attr.return_value = True
-        d = {'href': url}
-        link.__getitem__.side_effect = d.__getitem__
-        get_links.return_value = [link]
+        get_links.return_value = (1, [(0, url)])
 
         self.handler.extract_text_links(None)
 
@@ -110,14 +110,7 @@ class TestSubmissionHandler(TestCase):
     def test_extract_text_links_multiple(self, get_links, extract_link):
         urls = ['https://gfycat.com/KindlyElderlyCony', 'https://invalid_site.com/image/3jfd9nlksd.jpg',
                 'https://vidble.com/XOwqxH6Xz9.jpg']
-        links = []
-        for url in urls:
-            link = MagicMock()
-            link.has_attr.return_value = True
-            d = {'href': url}
-            link.__getitem__.side_effect = d.__getitem__
-            links.append(link)
-        get_links.return_value = links
+        get_links.return_value = (len(urls), list(enumerate(urls)))
 
         self.handler.extract_text_links(None)
 
@@ -139,7 +132,8 @@ class TestSubmissionHandler(TestCase):
         self.handler.extract_link(url, extra_arg='extra')
 
         assign.assert_called_with(url)
-        extractor_class.assert_called_with(self.post, url=url, submission=self.submission, extra_arg='extra')
+        extractor_class.assert_called_with(self.post, url=url, submission=self.submission,
+                                           stop_run=self.handler.stop_run, extra_arg='extra')
         finish.assert_called_with(extractor, text_link_extraction=False)
 
     @patch(f'{PATH}.handle_unsupported_domain')
@@ -196,8 +190,7 @@ class TestSubmissionHandler(TestCase):
         self.handler.finish_extractor(extractor)
 
         extractor.extract_content.assert_called()
-        self.post.set_extracted.assert_called()
-        self.post.set_extraction_failed.assert_not_called()
+        self.persistence_queue.call.assert_called_once_with(Post, self.post.id, 'set_extracted')
         self.mock_queue.put.assert_called_with(482)
 
     def test_finish_extractor_unsuccessful(self):
@@ -209,14 +202,13 @@ class TestSubmissionHandler(TestCase):
         self.handler.finish_extractor(extractor)
 
         extractor.extract_content.assert_called()
-        self.post.set_extracted.assert_not_called()
-        self.post.set_extraction_failed.assert_called_with(Error.FAILED_TO_LOCATE, extractor.failed_extraction_message)
+        self.persistence_queue.call.assert_called_once_with(Post, self.post.id, 'set_extraction_failed',
+                                                            Error.FAILED_TO_LOCATE, extractor.failed_extraction_message)
         self.mock_queue.put.assert_not_called()
 
     def test_finish_extractor_null_extractor_value(self):
         self.handler.finish_extractor(None)
-        self.post.set_extracted.assert_not_called()
-        self.post.set_extraction_failed.assert_not_called()
+        self.persistence_queue.call.assert_not_called()
         self.mock_queue.put.assert_not_called()
 
     @patch(f'{PATH}.handle_too_many_requests_error')
@@ -0,0 +1,86 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from DownloaderForReddit.core.submission_record import SubmissionRecord
+from Tests.mockobjects.mock_objects import MockPrawSubmission, MockPrawSubreddit
+
+
+REDDIT_INSTANCE = 'DownloaderForReddit.utils.reddit_utils.get_reddit_instance'
+
+
+class TestSubmissionRecord(TestCase):
+
+    def get_submission(self, **kwargs):
+        submission = MockPrawSubmission(url='https://i.redd.it/abc.jpg', title='Test Post', created=1600000000.0,
+                                        score=25, over_18=False, author=MagicMock(), _id='xyz1',
+                                        subreddit=MockPrawSubreddit(name='pics'), **kwargs)
+        submission.author.name = 'test_user'
+        submission.is_self = False
+        submission.selftext = ''
+        submission.selftext_html = None
+        return submission
+
+    @patch(REDDIT_INSTANCE)
+    def test_record_copies_listed_fields(self, get_reddit_instance):
+        record = SubmissionRecord.from_submission(self.get_submission())
+
+        self.assertEqual('xyz1', record.id)
+        self.assertEqual('https://i.redd.it/abc.jpg', record.url)
+        self.assertEqual(1600000000.0, record.created)
+        self.assertEqual('test_user', record.author.name)
+        self.assertEqual('pics', record.subreddit.display_name)
+        self.assertFalse(hasattr(record, '__dict__'))
+        get_reddit_instance.assert_not_called()
+
+    @patch(REDDIT_INSTANCE)
+    def test_missing_fields_stay_missing_without_a_request(self, get_reddit_instance):
+        record = SubmissionRecord.from_submission(self.get_submission())
+        self.assertFalse(hasattr(record, 'media_metadata'))
+
+        crosspost = SubmissionRecord.from_submission(self.get_submission(crosspost_parent='t3_abc'))
+        self.assertEqual('t3_abc', crosspost.crosspost_parent)
+        get_reddit_instance.assert_not_called()
+
+    def test_deleted_author_is_none(self):
+        submission = self.get_submission()
+        submission.author = None
+        record = SubmissionRecord.from_submission(submission)
+        self.assertIsNone(record.author)
+
+    @patch(REDDIT_INSTANCE)
+    def test_other_attributes_are_served_by_the_full_submission(self, get_reddit_instance):
+        reddit = MagicMock()
+        full_submission = MagicMock()
+        reddit.submission.return_value = full_submission
+        record = SubmissionRecord.from_submission(self.get_submission(), reddit=reddit)
+
+        record.comment_sort = 'top'
+        comments = record.comments
+
+        reddit.submission.assert_called_once_with(id='xyz1')
+        self.assertEqual('top', full_submission.comment_sort)
+        self.assertIs(full_submission.comments, comments)
+        get_reddit_instance.assert_not_called()
+
+    @patch(REDDIT_INSTANCE)
+    def test_records_share_the_listing_reddit_instance(self, get_reddit_instance):
+        reddit = MagicMock()
+        records = [SubmissionRecord.from_submission(self.get_submission(), reddit=reddit) for _ in range(5)]
+        for record in records:
+            record.comment_sort = 'top'
+            _ = record.comments
+
+        self.assertEqual(5, reddit.submission.call_count)
+        get_reddit_instance.assert_not_called()
+
+    @patch(REDDIT_INSTANCE)
+    def test_submission_own_reddit_instance_is_used_by_default(self, get_reddit_instance):
+        reddit = MagicMock()
+        submission = self.get_submission()
+        submission._reddit = reddit
+        record = SubmissionRecord.from_submission(submission)
+
+        _ = record.comments
+
+        reddit.submission.assert_called_once_with(id='xyz1')
+        get_reddit_instance.assert_not_called()
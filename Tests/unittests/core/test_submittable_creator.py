@@ -0,0 +1,80 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from DownloaderForReddit.core.submittable_creator import SubmittableCreator
+from DownloaderForReddit.database.database_handler import DatabaseHandler
+from DownloaderForReddit.database.models import User, Subreddit, Post, Comment
+from DownloaderForReddit.utils import injector
+
+
+class TestSubmittableCreator(TestCase):
+
+    def setUp(self):
+        self.db = DatabaseHandler(in_memory=True)
+        injector.database_handler = self.db
+        injector.seen_filter = None
+        SubmittableCreator.db = None
+        SubmittableCreator.identity_cache.clear()
+        self.session = self.db.get_session()
+
+    def tearDown(self):
+        self.session.close()
+        SubmittableCreator.db = None
+        SubmittableCreator.identity_cache.clear()
+
+    def make_submission(self, submission_id, author='Author', subreddit='Pics'):
+        submission = MagicMock(id=submission_id, url=f'https://i.redd.it/{submission_id}.jpg', title='title',
+                               created=1600000000, domain='i.redd.it', score=1, over_18=False, is_self=False,
+                               selftext='', selftext_html=None)
+        submission.author.name = author
+        submission.subreddit.display_name = subreddit
+        return submission
+
+    def test_create_post_assigns_reddit_object_ids(self):
+        post = SubmittableCreator.create_post(self.make_submission('abc'), None, self.session, None)
+
+        author = self.session.query(User).filter(User.name == 'Author').one()
+        subreddit = self.session.query(Subreddit).filter(Subreddit.name == 'Pics').one()
+        self.assertEqual(author.id, post.author_id)
+        self.assertEqual(subreddit.id, post.subreddit_id)
+        self.assertEqual(author, post.author)
+
+    def test_reddit_objects_are_cached_by_case_insensitive_name(self):
+        with patch.object(self.db, 'get_or_create', wraps=self.db.get_or_create) as get_or_create:
+            SubmittableCreator.create_post(self.make_submission('abc'), None, self.session, None)
+            SubmittableCreator.create_post(self.make_submission('def', author='AUTHOR', subreddit='pics'), None,
+                                           self.session, None)
+
+        self.assertEqual(2, get_or_create.call_count)
+        self.assertEqual(1, self.session.query(User).count())
+        self.assertEqual(1, self.session.query(Subreddit).count())
+        posts = self.session.query(Post).all()
+        self.assertEqual(posts[0].author_id, posts[1].author_id)
+
+    def test_missing_author_uses_deleted_user(self):
+        submission = self.make_submission('abc')
+        submission.author = None
+
+        post = SubmittableCreator.create_post(submission, None, self.session, None)
+
+        self.assertEqual('deleted', post.author.name)
+
+    def make_comment(self, comment_id):
+        comment = MagicMock(id=comment_id, body='body', body_html='<p>body</p>', score=1, created=1600000000)
+        comment.author.name = 'Author'
+        comment.subreddit.display_name = 'Pics'
+        return comment
+
+    def test_comments_stored_by_another_thread_are_skipped_on_retry(self):
+        post = SubmittableCreator.create_post(self.make_submission('abc'), None, self.session, None)
+        # the first comment is stored by another thread after the existing comments are checked
+        self.session.add(Comment(reddit_id='c1', post_id=post.id))
+        self.session.commit()
+        existing_ids = SubmittableCreator.get_existing_comment_ids
+        with patch.object(SubmittableCreator, 'get_existing_comment_ids',
+                          side_effect=[set(), existing_ids(['c1', 'c2'], self.session)]):
+            stored = SubmittableCreator.create_comments([(self.make_comment('c1'), None),
+                                                         (self.make_comment('c2'), None)], post, self.session, None)
+
+        self.assertEqual(['c2'], [comment.reddit_id for _, comment in stored])
+        self.assertEqual(['c1', 'c2'], sorted(x.reddit_id for x in self.session.query(Comment)))
@@ -0,0 +1,46 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from Tests.mockobjects.mock_objects import get_user, get_post
+from Tests.mockobjects.mock_reddit import MockReddit
+from DownloaderForReddit.core.update_runner import UpdateRunner
+from DownloaderForReddit.database.database_handler import DatabaseHandler
+from DownloaderForReddit.database.models import Post
+from DownloaderForReddit.utils import injector
+
+
+class TestUpdateRunner(TestCase):
+
+    def setUp(self):
+        injector.settings_manager = MagicMock(score_update_concurrency=2)
+        injector.database_handler = DatabaseHandler(in_memory=True)
+        self.session = injector.database_handler.get_session()
+        user = get_user()
+        self.session.add_all([get_post(user=user, significant_reddit_object=user, reddit_id=f'abc{x}', score=1)
+                              for x in range(3)])
+        self.session.commit()
+        self.user_id = user.id
+        self.reddit = MockReddit({'abc0': 10, 'abc1': 20, 'abc2': 1})
+        patcher = patch('DownloaderForReddit.core.update_runner.reddit_utils.get_reddit_instance',
+                        return_value=self.reddit)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('DownloaderForReddit.core.score_updater.Message')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('DownloaderForReddit.core.update_runner.Message')
+        self.message = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_update_scores_for_reddit_objects(self):
+        runner = UpdateRunner('UPDATE_SCORES', reddit_object_id_list=[self.user_id])
+
+        runner.run()
+
+        self.assertEqual(1, len(self.reddit.info_calls))
+        self.session.expire_all()
+        self.assertEqual([10, 20, 1], [x.score for x in self.session.query(Post).order_by(Post.id)])
+        self.message.send_info.assert_called_once()
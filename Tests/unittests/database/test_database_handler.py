@@ -0,0 +1,53 @@
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from sqlalchemy.pool import QueuePool, NullPool
+
+from DownloaderForReddit.database.database_handler import DatabaseHandler
+from DownloaderForReddit.utils import injector
+
+
+class TestDatabaseHandler(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = patch('DownloaderForReddit.database.database_handler.system_util.get_data_directory',
+                        return_value=self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        injector.settings_manager = MagicMock(database_pool_profile='threaded')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def get_pragma(self, db, name):
+        with db.engine.connect() as connection:
+            return connection.execute(f'PRAGMA {name}').scalar()
+
+    def test_file_database_uses_wal_and_tuned_pragmas(self):
+        db = DatabaseHandler()
+
+        self.assertEqual('wal', self.get_pragma(db, 'journal_mode'))
+        self.assertEqual(1, self.get_pragma(db, 'synchronous'))  # NORMAL
+        self.assertEqual(-64000, self.get_pragma(db, 'cache_size'))
+        self.assertEqual(2, self.get_pragma(db, 'temp_store'))  # MEMORY
+        self.assertEqual(10000, self.get_pragma(db, 'busy_timeout'))
+        db.engine.dispose()
+
+    def test_pool_profile_is_read_from_settings(self):
+        db = DatabaseHandler()
+        self.assertEqual('threaded', db.pool_profile)
+        self.assertIsInstance(db.engine.pool, QueuePool)
+        db.engine.dispose()
+
+        injector.settings_manager.database_pool_profile = 'unpooled'
+        db = DatabaseHandler()
+        self.assertIsInstance(db.engine.pool, NullPool)
+        db.engine.dispose()
+
+    def test_unknown_pool_profile_uses_default(self):
+        db = DatabaseHandler(pool_profile='unknown')
+        self.assertEqual('threaded', db.pool_profile)
+        db.engine.dispose()
@@ -0,0 +1,48 @@
+from threading import Thread, Barrier
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from DownloaderForReddit.database.identity_cache import IdentityCache
+
+
+class TestIdentityCache(TestCase):
+
+    def test_least_recently_used_entries_are_discarded(self):
+        cache = IdentityCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual(2, len(cache))
+
+    def test_get_or_load_only_loads_missing_keys(self):
+        cache = IdentityCache()
+        load = MagicMock(return_value=7)
+
+        self.assertEqual(7, cache.get_or_load('a', load))
+        self.assertEqual(7, cache.get_or_load('a', load))
+
+        load.assert_called_once()
+
+    def test_concurrent_misses_load_once(self):
+        cache = IdentityCache()
+        load = MagicMock(return_value=7)
+        barrier = Barrier(8)
+        results = []
+
+        def get():
+            barrier.wait()
+            results.append(cache.get_or_load('a', load))
+
+        threads = [Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        load.assert_called_once()
+        self.assertEqual([7] * 8, results)
@@ -0,0 +1,81 @@
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+import sqlalchemy
+from alembic import command
+
+from DownloaderForReddit import version
+from DownloaderForReddit.database.database_handler import DatabaseHandler
+from DownloaderForReddit.database.migration import Migrator
+from DownloaderForReddit.database.models import Post, Content, Version
+from DownloaderForReddit.utils import injector
+from DownloaderForReddit.utils.url_utils import url_hash
+
+
+PREVIOUS_REVISION = 'b838ef3372ca'
+
+
+class TestMigrator(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data_directory_patch = patch('DownloaderForReddit.utils.system_util.get_data_directory',
+                                          return_value=self.directory.name)
+        self.data_directory_patch.start()
+        injector.settings_manager = MagicMock()
+        self.db = DatabaseHandler(pool_profile='unpooled')
+        injector.database_handler = self.db
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        injector.database_handler = None
+        self.data_directory_patch.stop()
+        self.directory.cleanup()
+
+    def restart(self):
+        self.db.engine.dispose()
+        self.db = DatabaseHandler(pool_profile='unpooled')
+        injector.database_handler = self.db
+
+    def get_columns(self, table):
+        return {x['name'] for x in sqlalchemy.inspect(self.db.engine).get_columns(table)}
+
+    def get_revision(self):
+        with self.db.engine.connect() as connection:
+            return connection.execute('SELECT version_num FROM alembic_version').scalar()
+
+    def test_database_at_previous_revision_is_migrated_without_version_change(self):
+        # a database that was last used by the same application version, before the newest migration was added
+        migrator = Migrator()
+        head = migrator.get_current_version()
+        command.stamp(migrator.get_config(), head)
+        command.downgrade(migrator.get_config(), PREVIOUS_REVISION)
+        with self.db.get_scoped_update_session() as session:
+            session.add(Version(version=version.__version__))
+        with self.db.engine.connect() as connection:
+            connection.execute("INSERT INTO post (title, url) VALUES ('post', 'https://i.imgur.com/AbCd.jpg')")
+        self.assertNotIn('url_hash', self.get_columns('post'))
+        self.assertEqual(PREVIOUS_REVISION, self.get_revision())
+
+        # the application is restarted, which creates any tables that are missing before it migrates
+        self.restart()
+        Migrator().check_migration()
+
+        self.assertIn('url_hash', self.get_columns('post'))
+        self.assertIn('url_hash', self.get_columns('content'))
+        self.assertEqual(head, self.get_revision())
+        with self.db.get_scoped_session() as session:
+            post = session.query(Post).one()
+            self.assertEqual(url_hash('https://i.imgur.com/AbCd.jpg'), post.url_hash)
+            self.assertEqual(0, session.query(Content).count())
+
+    def test_database_at_head_is_not_migrated(self):
+        migrator = Migrator()
+        command.stamp(migrator.get_config(), 'head')
+        with self.db.get_scoped_update_session() as session:
+            session.add(Version(version=version.__version__))
+
+        with patch.object(Migrator, 'migrate') as migrate:
+            Migrator().check_migration()
+        migrate.assert_not_called()
@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from unittest import TestCase
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from DownloaderForReddit.core.errors import Error
+from DownloaderForReddit.database.models import Content, BaseModel
+from DownloaderForReddit.database.persistence_queue import PersistenceQueue
+
+
+class TestPersistenceQueue(TestCase):
+
+    def setUp(self):
+        engine = create_engine('sqlite:///:memory:', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        BaseModel.metadata.create_all(engine)
+        self.Session = sessionmaker(bind=engine)
+        self.db = MagicMock()
+        self.db.get_scoped_update_session = self.get_scoped_update_session
+        self.session = self.Session()
+        self.contents = [Content(title=f'content_{x}', retry_attempts=0) for x in range(3)]
+        self.session.add_all(self.contents)
+        self.session.commit()
+        self.queue = PersistenceQueue(self.db, flush_interval=60)
+        self.session_count = 0
+
+    def tearDown(self):
+        self.queue.stop()
+        self.session.close()
+
+    @contextmanager
+    def get_scoped_update_session(self):
+        self.session_count += 1
+        session = self.Session()
+        try:
+            yield session
+            session.commit()
+        except:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def get_content(self, content_id):
+        self.session.expire_all()
+        return self.session.query(Content).get(content_id)
+
+    def test_changes_are_coalesced_into_one_transaction(self):
+        first, second, third = self.contents
+        self.queue.update(Content, first.id, download_title='first_title')
+        self.queue.call(Content, first.id, 'set_downloaded', 7)
+        self.queue.call(Content, second.id, 'set_download_error', Error.CONNECTION_ERROR, 'failed')
+        self.queue.call(Content, second.id, 'set_download_error', Error.CONNECTION_ERROR, 'failed')
+        self.queue.update(Content, third.id, title='renamed')
+
+        self.queue.flush()
+
+        self.assertEqual(1, self.session_count)
+        downloaded = self.get_content(first.id)
+        self.assertTrue(downloaded.downloaded)
+        self.assertEqual(7, downloaded.download_session_id)
+        self.assertEqual('first_title', downloaded.download_title)
+        failed = self.get_content(second.id)
+        self.assertEqual(Error.CONNECTION_ERROR, failed.download_error)
+        self.assertEqual(2, failed.retry_attempts)
+        self.assertEqual('renamed', self.get_content(third.id).title)
+
+    def test_changes_to_the_same_row_are_applied_in_order(self):
+        content_id = self.contents[0].id
+        self.queue.call(Content, content_id, 'set_download_error', Error.CONNECTION_ERROR, 'failed')
+        self.queue.call(Content, content_id, 'set_downloaded', 3)
+
+        self.queue.flush()
+
+        content = self.get_content(content_id)
+        self.assertTrue(content.downloaded)
+        self.assertIsNone(content.download_error)
+        self.assertEqual(1, content.retry_attempts)
+
+    def test_batch_size_triggers_write(self):
+        self.queue.batch_size = 2
+
+        for content in self.contents:
+            self.queue.update(Content, content.id, title='renamed')
+        self.queue.stop()
+
+        self.assertEqual(2, self.session_count)
+        self.assertTrue(all(self.get_content(x.id).title == 'renamed' for x in self.contents))
+
+    def test_flush_interval_triggers_write(self):
+        self.queue.flush_interval = 0.01
+        self.queue.update(Content, self.contents[0].id, title='renamed')
+
+        self.queue.flush()
+        self.queue.update(Content, self.contents[1].id, title='renamed')
+        self.queue.flush()
+
+        self.assertEqual(2, self.session_count)
+
+    def test_flush_without_changes_does_not_write(self):
+        self.assertTrue(self.queue.flush())
+        self.assertEqual(0, self.session_count)
+
+    def test_missing_rows_are_skipped(self):
+        self.queue.update(Content, 9999, title='missing')
+        self.queue.update(Content, self.contents[0].id, title='renamed')
+
+        self.queue.flush()
+
+        self.assertEqual('renamed', self.get_content(self.contents[0].id).title)
+
+    def test_failed_change_does_not_lose_the_rest_of_its_batch(self):
+        first, second, third = self.contents
+        self.queue.update(Content, first.id, title='first_renamed')
+        self.queue.call(Content, second.id, 'missing_method')
+        self.queue.call(Content, third.id, 'set_downloaded', 7)
+
+        self.queue.flush()
+
+        # the failed batch is rolled back, then each change is written on its own
+        self.assertEqual(4, self.session_count)
+        self.assertEqual('first_renamed', self.get_content(first.id).title)
+        self.assertEqual('content_1', self.get_content(second.id).title)
+        self.assertTrue(self.get_content(third.id).downloaded)
@@ -0,0 +1,161 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from DownloaderForReddit.database.database_handler import DatabaseHandler
+from DownloaderForReddit.database.models import Post, Comment, Content
+from DownloaderForReddit.database.seen_filter import BloomFilter, SeenFilter
+from DownloaderForReddit.utils import injector
+from DownloaderForReddit.utils.url_utils import url_hash
+
+
+class TestBloomFilter(TestCase):
+
+    def test_added_keys_are_always_found(self):
+        bloom = BloomFilter(1000)
+        keys = [f'key_{x}'.encode() for x in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_false_positive_rate_is_near_error_rate(self):
+        bloom = BloomFilter(5000, error_rate=0.01)
+        for x in range(5000):
+            bloom.add(f'key_{x}'.encode())
+        false_positives = sum(f'other_{x}'.encode() in bloom for x in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class TestSeenFilter(TestCase):
+
+    def setUp(self):
+        self.db = DatabaseHandler(in_memory=True)
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.directory.name, 'seen_filter.bin')
+        self.seen_filter = SeenFilter(self.db, snapshot_path=self.snapshot_path)
+        injector.seen_filter = self.seen_filter
+        with self.db.get_scoped_update_session() as session:
+            post = Post(title='post', url='https://i.imgur.com/AbCd.jpg', reddit_id='abc123')
+            session.add(post)
+            session.add(Comment(reddit_id='Def456', post=post))
+            session.add(Content(url='https://i.redd.it/xyz.jpg', post=post))
+
+    def tearDown(self):
+        injector.seen_filter = None
+        self.directory.cleanup()
+
+    def test_unloaded_filter_reports_everything_as_possibly_seen(self):
+        self.assertTrue(self.seen_filter.might_contain_post_url(url_hash('https://new.com/x.jpg')))
+        self.assertTrue(self.seen_filter.might_contain_comment_id('zzz999'))
+
+    def test_loaded_filter_contains_stored_keys(self):
+        self.seen_filter.load()
+
+        self.assertTrue(self.seen_filter.might_contain_post_url(url_hash('http://www.i.imgur.com/AbCd.jpg')))
+        self.assertTrue(self.seen_filter.might_contain_post_id('ABC123'))
+        self.assertTrue(self.seen_filter.might_contain_comment_id('def456'))
+        self.assertTrue(self.seen_filter.might_contain_content_url(url_hash('https://i.redd.it/xyz.jpg')))
+        self.assertFalse(self.seen_filter.might_contain_post_url(url_hash('https://i.imgur.com/new.jpg')))
+        self.assertFalse(self.seen_filter.might_contain_post_id('new001'))
+        self.assertFalse(self.seen_filter.might_contain_content_url(url_hash('https://i.redd.it/new.jpg')))
+
+    def test_inserted_rows_are_added_to_loaded_filter(self):
+        self.seen_filter.load()
+
+        with self.db.get_scoped_update_session() as session:
+            session.add(Post(title='new', url='https://i.imgur.com/new.jpg', reddit_id='new001'))
+            session.add(Content(url='https://i.redd.it/new.jpg'))
+
+        self.assertTrue(self.seen_filter.might_contain_post_url(url_hash('https://i.imgur.com/new.jpg')))
+        self.assertTrue(self.seen_filter.might_contain_post_id('new001'))
+        self.assertTrue(self.seen_filter.might_contain_content_url(url_hash('https://i.redd.it/new.jpg')))
+
+    def test_snapshot_is_loaded_and_caught_up(self):
+        self.seen_filter.load()
+        self.seen_filter.unload()
+        self.assertTrue(os.path.isfile(self.snapshot_path))
+        with self.db.get_scoped_update_session() as session:
+            session.add(Comment(reddit_id='new002'))
+
+        seen_filter = SeenFilter(self.db, snapshot_path=self.snapshot_path)
+        snapshot = seen_filter.read_snapshot()
+        seen_filter.load()
+
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(snapshot[0].capacity, seen_filter.bloom.capacity)
+        self.assertTrue(seen_filter.might_contain_post_id('abc123'))
+        self.assertTrue(seen_filter.might_contain_comment_id('new002'))
+
+    def test_snapshot_from_a_larger_database_is_rebuilt(self):
+        self.seen_filter.load()
+        self.seen_filter.max_ids[Post] = 1000
+        self.seen_filter.save()
+
+        seen_filter = SeenFilter(self.db, snapshot_path=self.snapshot_path)
+        seen_filter.load()
+
+        self.assertEqual(1, seen_filter.max_ids[Post])
+        self.assertTrue(seen_filter.might_contain_post_id('abc123'))
+
+    def save_snapshot_with_ghost_key(self):
+        # a key that is only in the snapshot, so a filter that was rebuilt from the database will not contain it
+        self.seen_filter.load()
+        self.seen_filter.bloom.add(SeenFilter.post_id_key('ghost1'))
+        self.seen_filter.save()
+
+    def load_snapshot(self):
+        seen_filter = SeenFilter(self.db, snapshot_path=self.snapshot_path)
+        seen_filter.load()
+        return seen_filter
+
+    def test_matching_snapshot_is_used(self):
+        self.save_snapshot_with_ghost_key()
+        with self.db.get_scoped_update_session() as session:
+            session.add(Post(title='new', url='https://i.imgur.com/new.jpg', reddit_id='new001'))
+
+        seen_filter = self.load_snapshot()
+
+        self.assertTrue(seen_filter.might_contain_post_id('ghost1'))
+        self.assertTrue(seen_filter.might_contain_post_id('new001'))
+        self.assertEqual(2, seen_filter.row_counts[Post])
+
+    def test_snapshot_is_rebuilt_when_rows_were_deleted(self):
+        self.save_snapshot_with_ghost_key()
+        with self.db.get_scoped_update_session() as session:
+            session.query(Comment).delete()
+
+        seen_filter = self.load_snapshot()
+
+        self.assertFalse(seen_filter.might_contain_post_id('ghost1'))
+        self.assertTrue(seen_filter.might_contain_post_id('abc123'))
+
+    def test_snapshot_from_a_different_database_is_rebuilt(self):
+        self.save_snapshot_with_ghost_key()
+        # a database with the same highest ids and row counts, but different rows
+        self.db = DatabaseHandler(in_memory=True)
+        with self.db.get_scoped_update_session() as session:
+            post = Post(title='other', url='https://i.imgur.com/other.jpg', reddit_id='oth001')
+            session.add(post)
+            session.add(Comment(reddit_id='oth002', post=post))
+            session.add(Content(url='https://i.redd.it/other.jpg', post=post))
+
+        seen_filter = self.load_snapshot()
+
+        self.assertNotEqual(self.seen_filter.database_id, seen_filter.database_id)
+        self.assertFalse(seen_filter.might_contain_post_id('ghost1'))
+        self.assertFalse(seen_filter.might_contain_post_id('abc123'))
+        self.assertTrue(seen_filter.might_contain_post_id('oth001'))
+
+    def test_database_id_is_kept(self):
+        database_id = self.seen_filter.get_database_id()
+
+        self.assertEqual(32, len(database_id))
+        self.assertEqual(database_id, self.seen_filter.get_database_id())
+
+    def test_corrupt_snapshot_is_ignored(self):
+        with open(self.snapshot_path, 'wb') as file:
+            file.write(b'not a snapshot')
+
+        self.seen_filter.load()
+
+        self.assertTrue(self.seen_filter.might_contain_post_id('abc123'))
@@ -15,7 +15,7 @@ class TestDownloadRunner(TestCase):
         cls.settings = MagicMock()
         injector.settings_manager = cls.settings
 
-    @patch('requests.get')
+    @patch('DownloaderForReddit.core.download.session_pool.get')
     def test_successful_json_retrieval(self, get):
         response = MagicMock()
         response.status_code = 200
@@ -32,7 +32,7 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(json, response_json)
 
     @patch(f'{PATH}.handle_failed_extract')
-    @patch('requests.get')
+    @patch('DownloaderForReddit.core.download.session_pool.get')
     def test_unsuccessful_json_retrieval_bad_status_code(self, get, handle_failed):
         response = MagicMock()
         response.status_code = 404
@@ -50,7 +50,7 @@ class TestDownloadRunner(TestCase):
         handle_failed.assert_called()
 
     @patch(f'{PATH}.handle_failed_extract')
-    @patch('requests.get')
+    @patch('DownloaderForReddit.core.download.session_pool.get')
     def test_unsuccessful_json_retrieval_no_json_in_response(self, get, handle_failed):
         response = MagicMock()
         response.status_code = 200
@@ -67,7 +67,7 @@ class TestDownloadRunner(TestCase):
         self.assertIsNone(response_json)
         handle_failed.assert_called()
 
-    @patch('requests.get')
+    @patch('DownloaderForReddit.core.download.session_pool.get')
     def test_successful_text_retrieval(self, get):
         response = MagicMock()
         response.status_code = 200
@@ -84,7 +84,7 @@ class TestDownloadRunner(TestCase):
         self.assertEqual(text, response_text)
 
     @patch(f'{PATH}.handle_failed_extract')
-    @patch('requests.get')
+    @patch('DownloaderForReddit.core.download.session_pool.get')
     def test_unsuccessful_text_retrieval_bad_status_code(self, get, handle_failed):
         response = MagicMock()
         response.status_code = 500
@@ -102,7 +102,7 @@ class TestDownloadRunner(TestCase):
         handle_failed.assert_called()
 
     @patch(f'{PATH}.handle_failed_extract')
-    @patch('requests.get')
+    @patch('DownloaderForReddit.core.download.session_pool.get')
     def test_unsuccessful_text_retrieval_no_text_in_request(self, get, handle_failed):
         response = MagicMock()
         response.status_code = 200
@@ -0,0 +1,84 @@
+import os
+import time
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from DownloaderForReddit.extractors.erome_extractor import locate_album
+from DownloaderForReddit.extractors.extraction_pool import (ExtractionPool, LocatedContent, ExtractionTimeout,
+                                                             ExtractionCancelled)
+from DownloaderForReddit.utils import injector
+
+
+EROME_ALBUM = '''
+<div class="media-group"><div class="img" ><img class="img-back" data-src="https://s1.erome.com/1/abc.jpg?v=1"></div>
+</div>
+<div class="media-group"><div class="video"><video><source src="https://v1.erome.com/1/def_720p.mp4"></video></div>
+</div>
+'''
+
+
+def raise_timeout_error():
+    raise TimeoutError('raised by the function')
+
+
+class TestExtractionPool(TestCase):
+
+    def setUp(self):
+        self.settings = MagicMock()
+        injector.settings_manager = self.settings
+        self.pool = ExtractionPool()
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_functions_run_in_the_calling_thread_when_pool_is_off(self):
+        self.settings.extraction_process_count = 0
+        self.assertEqual(os.getpid(), self.pool.run(os.getpid))
+        self.assertIsNone(self.pool.executor)
+
+    def test_invalid_process_count_turns_pool_off(self):
+        self.settings.extraction_process_count = MagicMock()
+        self.assertEqual(0, self.pool.get_process_count())
+        self.settings.extraction_process_count = -2
+        self.assertEqual(0, self.pool.get_process_count())
+
+    def test_functions_run_in_worker_process(self):
+        self.settings.extraction_process_count = 1
+        self.assertNotEqual(os.getpid(), self.pool.run(os.getpid))
+        located = self.pool.run(locate_album, EROME_ALBUM)
+        self.assertEqual([
+            LocatedContent('https://s1.erome.com/1/abc.jpg?v=1', 'jpg', 1, {'media_id': 'abc'}),
+            LocatedContent('https://v1.erome.com/1/def_720p.mp4', 'mp4', 2, {'media_id': 'def_720p'}),
+        ], located)
+
+        with self.assertRaises(TypeError):
+            self.pool.run(locate_album, None)
+
+        # arguments that can not be sent to a worker process are run in the calling thread instead
+        self.assertEqual(os.getpid(), self.pool.run(lambda x: os.getpid(), lambda: None))
+
+        self.settings.extraction_process_count = 0
+        self.assertEqual(os.getpid(), self.pool.run(os.getpid))
+        self.assertIsNone(self.pool.executor)
+
+    def test_call_past_its_deadline_raises_extraction_timeout(self):
+        self.settings.extraction_process_count = 0
+        start = time.monotonic()
+        with self.assertRaises(ExtractionTimeout):
+            self.pool.run(time.sleep, 5, timeout=0.1)
+        self.assertLess(time.monotonic() - start, 2)
+
+        self.assertEqual(os.getpid(), self.pool.run(os.getpid, timeout=5))
+        with self.assertRaises(TimeoutError) as context:
+            self.pool.run(raise_timeout_error, timeout=5)
+        self.assertNotIsInstance(context.exception, ExtractionTimeout)
+
+    def test_call_is_cancelled_when_session_is_stopped(self):
+        self.settings.extraction_process_count = 0
+        stop_run = Event()
+        stop_run.set()
+        start = time.monotonic()
+        with self.assertRaises(ExtractionCancelled):
+            self.pool.run(time.sleep, 5, stop_run=stop_run)
+        self.assertLess(time.monotonic() - start, 2)
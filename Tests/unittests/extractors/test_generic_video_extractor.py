@@ -0,0 +1,142 @@
+import time
+from threading import Event
+from unittest.mock import patch, MagicMock
+
+from .abstract_extractor_test import ExtractorTest
+from Tests.mockobjects.mock_objects import get_post
+from DownloaderForReddit.core.errors import Error
+from DownloaderForReddit.extractors.extraction_pool import LocatedContent
+from DownloaderForReddit.extractors.generic_video_extractor import (GenericVideoExtractor, VideoLocateError,
+                                                                    YoutubeDLPool, locate_videos)
+
+
+def hang(url):
+    time.sleep(5)
+
+
+@patch('DownloaderForReddit.extractors.base_extractor.BaseExtractor.make_dir_path')
+@patch('DownloaderForReddit.extractors.base_extractor.BaseExtractor.make_title')
+@patch('DownloaderForReddit.extractors.base_extractor.BaseExtractor.filter_content')
+class TestGenericVideoExtractor(ExtractorTest):
+
+    PATH = 'DownloaderForReddit.extractors.generic_video_extractor'
+
+    def setUp(self):
+        super().setUp()
+        self.settings.extraction_process_count = 0
+        self.settings.video_extraction_timeout = 0.2
+        GenericVideoExtractor.failed_urls.clear()
+
+    def test_playlist_entries_are_numbered(self, filter_content, make_title, make_dir_path):
+        with patch(f'{self.PATH}.ydl_pool', YoutubeDLPool()) as pool, patch(f'{self.PATH}.YoutubeDL') as ydl_class:
+            ydl_class.return_value.extract_info.return_value = {'entries': [{'url': 'https://a.mp4'},
+                                                                            {'url': 'https://b.mp4'}]}
+            located = locate_videos('https://example.com/playlist')
+            locate_videos('https://example.com/playlist')
+
+        self.assertEqual([LocatedContent('https://a.mp4', 'mp4', 1), LocatedContent('https://b.mp4', 'mp4', 2)],
+                         located)
+        # the instance that made the first extraction is reused for the second
+        ydl_class.assert_called_once()
+        self.assertEqual(1, len(pool.idle))
+
+    def test_unsupported_url_is_a_permanent_error(self, filter_content, make_title, make_dir_path):
+        with self.assertRaises(VideoLocateError) as context:
+            locate_videos('not a url')
+        self.assertTrue(context.exception.permanent)
+
+    def test_content_is_made_from_located_videos(self, filter_content, make_title, make_dir_path):
+        post = get_post(session=self.session, url='https://www.youtube.com/watch?v=abc')
+        filter_content.return_value = True
+        make_title.return_value = post.title
+        make_dir_path.return_value = 'content_dir_path'
+        with patch(f'{self.PATH}.locate_videos') as locate:
+            locate.return_value = [LocatedContent('https://video.mp4', 'mp4')]
+            extractor = GenericVideoExtractor(post)
+            extractor.extract_content()
+
+        self.assertFalse(extractor.failed_extraction)
+        self.check_output(extractor, 'https://video.mp4', post)
+
+    @patch(f'{PATH}.locate_videos', new=hang)
+    def test_timed_out_url_is_not_tried_again(self, filter_content, make_title, make_dir_path):
+        post = get_post(session=self.session, url='https://hanging.site/video')
+        start = time.monotonic()
+        extractor = GenericVideoExtractor(post)
+        extractor.extract_content()
+
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertTrue(extractor.failed_extraction)
+        self.assertTrue(GenericVideoExtractor.has_failed(post.url))
+        # a timeout is only remembered briefly, as the url may just have been slow
+        expires = GenericVideoExtractor.failed_urls[post.url] - time.monotonic()
+        self.assertLessEqual(expires, GenericVideoExtractor.TIMED_OUT_URL_EXPIRY)
+        self.assertLess(expires, GenericVideoExtractor.FAILED_URL_EXPIRY)
+
+        with patch(f'{self.PATH}.locate_videos') as locate:
+            extractor = GenericVideoExtractor(post)
+            extractor.extract_content()
+            locate.assert_not_called()
+        self.assertTrue(extractor.failed_extraction)
+
+    @patch(f'{PATH}.locate_videos', new=hang)
+    def test_stopped_session_cancels_extraction(self, filter_content, make_title, make_dir_path):
+        self.settings.video_extraction_timeout = 60
+        stop_run = Event()
+        stop_run.set()
+        post = get_post(session=self.session, url='https://hanging.site/video')
+        start = time.monotonic()
+        extractor = GenericVideoExtractor(post, stop_run=stop_run)
+        extractor.extract_content()
+
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(Error.DOWNLOAD_STOPPED, extractor.extraction_error)
+        self.assertFalse(GenericVideoExtractor.has_failed(post.url))
+
+    def test_only_permanent_errors_are_remembered(self, filter_content, make_title, make_dir_path):
+        post = get_post(session=self.session, url='https://flaky.site/video')
+        with patch(f'{self.PATH}.locate_videos') as locate:
+            locate.side_effect = VideoLocateError('connection reset', permanent=False)
+            GenericVideoExtractor(post).extract_content()
+            self.assertFalse(GenericVideoExtractor.has_failed(post.url))
+
+            locate.side_effect = VideoLocateError('unsupported url', permanent=True)
+            GenericVideoExtractor(post).extract_content()
+            self.assertTrue(GenericVideoExtractor.has_failed(post.url))
+
+    @patch(f'{PATH}.locate_videos', new=hang)
+    def test_timed_out_url_is_tried_again_after_short_expiry(self, filter_content, make_title, make_dir_path):
+        post = get_post(session=self.session, url='https://slow.site/video')
+        GenericVideoExtractor(post).extract_content()
+        self.assertTrue(GenericVideoExtractor.has_failed(post.url))
+
+        with patch('DownloaderForReddit.extractors.generic_video_extractor.monotonic',
+                   return_value=time.monotonic() + GenericVideoExtractor.TIMED_OUT_URL_EXPIRY + 1):
+            self.assertFalse(GenericVideoExtractor.has_failed(post.url))
+            with patch(f'{self.PATH}.locate_videos') as locate:
+                locate.return_value = [LocatedContent('https://video.mp4', 'mp4')]
+                filter_content.return_value = True
+                make_title.return_value = post.title
+                make_dir_path.return_value = 'content_dir_path'
+                extractor = GenericVideoExtractor(post)
+                extractor.extract_content()
+                locate.assert_called_once()
+        self.assertFalse(extractor.failed_extraction)
+
+    def test_permanent_failures_are_kept_for_hours(self, filter_content, make_title, make_dir_path):
+        GenericVideoExtractor.add_failed_url('https://a.site/video')
+        with patch('DownloaderForReddit.extractors.generic_video_extractor.monotonic',
+                   return_value=time.monotonic() + GenericVideoExtractor.TIMED_OUT_URL_EXPIRY + 1):
+            self.assertTrue(GenericVideoExtractor.has_failed('https://a.site/video'))
+
+    def test_failed_urls_expire(self, filter_content, make_title, make_dir_path):
+        GenericVideoExtractor.add_failed_url('https://a.site/video')
+        GenericVideoExtractor.failed_urls['https://a.site/video'] = time.monotonic() - 1
+        self.assertFalse(GenericVideoExtractor.has_failed('https://a.site/video'))
+        self.assertNotIn('https://a.site/video', GenericVideoExtractor.failed_urls)
+
+    def test_invalid_timeout_setting_uses_default(self, filter_content, make_title, make_dir_path):
+        self.settings.video_extraction_timeout = MagicMock()
+        extractor = GenericVideoExtractor(get_post(session=self.session))
+        self.assertEqual(120, extractor.get_timeout())
+
@@ -1,107 +1,90 @@
-# from unittest.mock import patch, MagicMock
-#
-# from .abstract_extractor_test import ExtractorTest
-# from Tests.mockobjects import mock_objects
-# from DownloaderForReddit.extractors.redgifs_extractor import RedgifsExtractor
-#
-#
-# @patch('DownloaderForReddit.extractors.base_extractor.BaseExtractor.make_dir_path')
-# @patch('DownloaderForReddit.extractors.base_extractor.BaseExtractor.make_title')
-# @patch('DownloaderForReddit.extractors.base_extractor.BaseExtractor.filter_content')
-# class TestRedgifsExtractor(ExtractorTest):
-#
-#     @patch('DownloaderForReddit.extractors.redgifs_extractor.RedgifsExtractor.get_json')
-#     def test_redgifs_single_extraction(self, get_json, filter_content, make_title, make_dir_path):
-#         filter_content.return_value = True
-#         post = mock_objects.get_mock_post_gfycat(session=self.session)
-#         post.url = 'https://www.redgifs.com/watch/decisivecleanfallowdeer'
-#         expected_output = 'https://thumbs4.redgifs.com/subparmauveevisceratingkracken.mp4?expires=1663866000&signature=670633f059f90e83cc10cf8aea5518ae77f202b312ea5ab9ef8563b4c560f652&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b'
-#
-#         get_json.return_value = {
-#           "gif": {
-#             "id": "subparmauveevisceratingkracken",
-#             "createDate": 1663770890,
-#             "hasAudio": "true",
-#             "width": 1920,
-#             "height": 1080,
-#             "likes": 22657,
-#             "tags": [],
-#             "verified": "false",
-#             "views": "null",
-#             "duration": 51.433,
-#             "published": "true",
-#             "urls": {
-#               "vthumbnail": "https://thumbs4.redgifs.com/subparmauveevisceratingkracken-mobile.mp4?expires=1663866000&signature=81e59342b722ea7c63fa9f566616fd7d1f7607adadcb928d532fb3b5d2c84ef7&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b",
-#               "thumbnail": "https://thumbs4.redgifs.com/subparmauveevisceratingkracken-mobile.jpg?expires=1663866000&signature=f65b0ea25ac3c3798430b22c97912c662d5d968d2ea415ae9afa2f8eba12f84b&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b",
-#               "sd": "https://thumbs4.redgifs.com/subparmauveevisceratingkracken-mobile.mp4?expires=1663866000&signature=81e59342b722ea7c63fa9f566616fd7d1f7607adadcb928d532fb3b5d2c84ef7&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b",
-#               "hd": "https://thumbs4.redgifs.com/subparmauveevisceratingkracken.mp4?expires=1663866000&signature=670633f059f90e83cc10cf8aea5518ae77f202b312ea5ab9ef8563b4c560f652&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b",
-#               "poster": "https://thumbs4.redgifs.com/subparmauveevisceratingkracken-poster.jpg?expires=1663866000&signature=a7962fec746ef4ccae9b9c110c1e6aea9300c4330907aae76a55809ddd856c19&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b"
-#             },
-#             "type": 1,
-#             "avgColor": "#000000",
-#             "gallery": "null",
-#             "hideHome": "false",
-#             "hideTrending": "false"
-#           },
-#           "user": "null"
-#         }
-#
-#         make_title.return_value = post.title
-#         make_dir_path.return_value = 'content_dir_path'
-#
-#         ex = RedgifsExtractor(post)
-#         ex.extract_content()
-#         self.check_output(ex, expected_output, post)
-#
-#     @patch('DownloaderForReddit.extractors.redgifs_extractor.RedgifsExtractor.get_json')
-#     def test_redgifs_non_hd_fallback_url(self, get_json, filter_content, make_title, make_dir_path):
-#         filter_content.return_value = True
-#         post = mock_objects.get_mock_post_gfycat(session=self.session)
-#         post.url = 'https://www.redgifs.com/watch/subparmauveevisceratingkracken'
-#         expected_output = 'https://thumbs4.redgifs.com/subparmauveevisceratingkracken-mobile.mp4?expires=1663866000&signature=81e59342b722ea7c63fa9f566616fd7d1f7607adadcb928d532fb3b5d2c84ef7&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b'
-#
-#         get_json.return_value = {
-#             "gif": {
-#                 "id": "subparmauveevisceratingkracken",
-#                 "createDate": 1663770890,
-#                 "hasAudio": "true",
-#                 "width": 1920,
-#                 "height": 1080,
-#                 "likes": 22657,
-#                 "tags": [],
-#                 "verified": "false",
-#                 "views": "null",
-#                 "duration": 51.433,
-#                 "published": "true",
-#                 "urls": {
-#                     "vthumbnail": "https://thumbs4.redgifs.com/subparmauveevisceratingkracken-mobile.mp4?expires=1663866000&signature=81e59342b722ea7c63fa9f566616fd7d1f7607adadcb928d532fb3b5d2c84ef7&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b",
-#                     "thumbnail": "https://thumbs4.redgifs.com/subparmauveevisceratingkracken-mobile.jpg?expires=1663866000&signature=f65b0ea25ac3c3798430b22c97912c662d5d968d2ea415ae9afa2f8eba12f84b&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b",
-#                     "sd": "https://thumbs4.redgifs.com/subparmauveevisceratingkracken-mobile.mp4?expires=1663866000&signature=81e59342b722ea7c63fa9f566616fd7d1f7607adadcb928d532fb3b5d2c84ef7&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b",
-#                     "poster": "https://thumbs4.redgifs.com/subparmauveevisceratingkracken-poster.jpg?expires=1663866000&signature=a7962fec746ef4ccae9b9c110c1e6aea9300c4330907aae76a55809ddd856c19&for=2603:6011:5b03:6a00:8dfa:6499:fe39:8c0b"
-#                 },
-#                 "type": 1,
-#                 "avgColor": "#000000",
-#                 "gallery": "null",
-#                 "hideHome": "false",
-#                 "hideTrending": "false"
-#             },
-#             "user": "null"
-#         }
-#
-#         make_title.return_value = post.title
-#         make_dir_path.return_value = 'content_dir_path'
-#
-#         ex = RedgifsExtractor(post)
-#         ex.extract_content()
-#         self.check_output(ex, expected_output, post)
-#
-#     @patch('DownloaderForReddit.extractors.redgifs_extractor.RedgifsExtractor.extract_single')
-#     def test_failed_connection(self, es_mock, filter_content, make_title, make_dir_path):
-#         es_mock.side_effect = ConnectionError()
-#         post = mock_objects.get_mock_redgifs()
-#
-#         ge = RedgifsExtractor(post)
-#         ge.extract_content()
-#
-#         self.assertTrue(ge.failed_extraction)
-#         self.assertIsNotNone(ge.failed_extraction_message)
+import json
+import base64
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests
+from redgifs.errors import HTTPException
+
+from DownloaderForReddit.core.download import HEADERS, get_headers
+from DownloaderForReddit.extractors.redgifs_extractor import RedgifsClient
+
+
+def make_token(expires_in):
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': time.time() + expires_in}).encode()).decode().rstrip('=')
+    return f'Bearer header.{payload}.signature'
+
+
+def make_http_exception(status):
+    response = requests.Response()
+    response.status_code = status
+    return HTTPException(response, {'error': {'code': 'Unauthorized', 'message': 'expired'}})
+
+
+@patch('DownloaderForReddit.extractors.redgifs_extractor.redgifs.API')
+class TestRedgifsClient(TestCase):
+
+    def setUp(self):
+        self.client = RedgifsClient()
+
+    def setup_api(self, api_class, lifetime=3600):
+        api = api_class.return_value
+        api.http.headers = {'User-Agent': 'agent'}
+        tokens = iter(range(100))
+
+        def login():
+            api.http.headers['authorization'] = make_token(lifetime + next(tokens))
+
+        api.login.side_effect = login
+        return api
+
+    def test_token_is_shared_between_requests(self, api_class):
+        api = self.setup_api(api_class)
+        for gif_id in ('a', 'b', 'c'):
+            self.client.get_gif(gif_id)
+
+        api_class.assert_called_once()
+        api.login.assert_called_once()
+        self.assertEqual(3, api.get_gif.call_count)
+
+    def test_token_is_replaced_when_it_expires(self, api_class):
+        api = self.setup_api(api_class, lifetime=RedgifsClient.EXPIRY_MARGIN + 3600)
+        self.client.get_gif('a')
+        self.assertAlmostEqual(time.monotonic() + 3600, self.client.expires, delta=5)
+
+        self.client.expires = time.monotonic() - 1
+        self.client.get_gif('b')
+        self.assertEqual(2, api.login.call_count)
+
+    def test_rejected_token_is_replaced_and_request_retried(self, api_class):
+        api = self.setup_api(api_class)
+        api.get_gif.side_effect = [make_http_exception(401), 'gif']
+
+        self.assertEqual('gif', self.client.get_gif('a'))
+        self.assertEqual(2, api.login.call_count)
+
+    def test_other_errors_are_raised(self, api_class):
+        api = self.setup_api(api_class)
+        api.get_gif.side_effect = make_http_exception(404)
+
+        with self.assertRaises(HTTPException):
+            self.client.get_gif('a')
+        api.login.assert_called_once()
+
+    def test_unreadable_token_uses_default_lifetime(self, api_class):
+        self.assertEqual(RedgifsClient.DEFAULT_TOKEN_LIFETIME, self.client.get_token_lifetime('Bearer opaque'))
+        self.assertEqual(RedgifsClient.DEFAULT_TOKEN_LIFETIME, self.client.get_token_lifetime(None))
+
+
+class TestHostHeaders(TestCase):
+
+    def tearDown(self):
+        HEADERS.clear()
+
+    def test_headers_apply_to_sub_domains(self):
+        HEADERS['redgifs.com'] = {'authorization': 'token'}
+        self.assertEqual({'authorization': 'token'}, get_headers('https://media.redgifs.com/Abc.mp4'))
+        self.assertEqual({'authorization': 'token'}, get_headers('https://redgifs.com/watch/abc'))
+        self.assertIsNone(get_headers('https://notredgifs.com/abc.mp4'))
+        self.assertIsNone(get_headers('https://i.imgur.com/abc.jpg'))
@@ -1,8 +1,6 @@
 from os import path
 from unittest.mock import patch
 
-from bs4 import BeautifulSoup
-
 from .abstract_extractor_test import ExtractorTest
 from Tests.mockobjects.mock_objects import (get_post, get_mock_post_vidble, get_mock_post_vidible_album,
                                             get_mock_post_vidble_direct)
@@ -16,9 +14,9 @@ class TestVidbleExtractor(ExtractorTest):
 
     PATH = 'DownloaderForReddit.extractors.vidble_extractor.VidbleExtractor'
 
-    @patch(f'{PATH}.get_imgs')
+    @patch(f'{PATH}.get_text')
     def test_extract_single_show(self, s_mock, filter_content, make_title, make_dir_path):
-        s_mock.return_value = self.get_single_soup()
+        s_mock.return_value = self.get_single_html()
         out_url = 'https://vidble.com/XOwqxH6Xz9.jpg'
         post = get_mock_post_vidble(session=self.session)
         filter_content.return_value = True
@@ -30,9 +28,9 @@ class TestVidbleExtractor(ExtractorTest):
 
         self.check_output(ve, out_url, post)
 
-    @patch(f'{PATH}.get_imgs')
+    @patch(f'{PATH}.get_text')
     def test_extract_single_explore(self, s_mock, filter_content, make_title, make_dir_path):
-        s_mock.return_value = self.get_single_soup()
+        s_mock.return_value = self.get_single_html()
         out_url = 'https://vidble.com/XOwqxH6Xz9.jpg'
         post = get_post(session=self.session, url='https://vidble.com/explore/XOwqxH6Xz9')
         filter_content.return_value = True
@@ -104,9 +102,8 @@ class TestVidbleExtractor(ExtractorTest):
 
         es_mock.assert_called()
 
-    def get_single_soup(self):
+    def get_single_html(self):
         current_file_path = path.dirname(path.abspath(__file__))
-        current_file_path = path.join(current_file_path, 'Resources/vidble_single_test.html')
+        current_file_path = path.join(current_file_path, 'resources/vidble_single_test.html')
         with open(current_file_path, 'r') as file:
-            soup = BeautifulSoup(file, 'html.parser')
-        return soup.find_all('img')
+            return file.read()
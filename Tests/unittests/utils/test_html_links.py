@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from DownloaderForReddit.utils.html_links import get_html_links
+
+
+class TestHtmlLinks(TestCase):
+
+    def test_links_are_returned_with_their_anchor_index(self):
+        html = ('<div class="md"><p>First <a href="https://imgur.com/a/abc">album</a> then an '
+                '<a name="anchor">anchor</a> and <A HREF="https://i.redd.it/xyz.jpg">image</A></p></div>')
+        self.assertEqual((3, [(0, 'https://imgur.com/a/abc'), (2, 'https://i.redd.it/xyz.jpg')]), get_html_links(html))
+
+    def test_duplicate_links_keep_their_own_index(self):
+        html = '<p><a href="https://x.com/1">one</a> <a href="https://x.com/1">one</a></p>'
+        self.assertEqual((2, [(0, 'https://x.com/1'), (1, 'https://x.com/1')]), get_html_links(html))
+
+    def test_entities_in_hrefs_are_unescaped(self):
+        html = '<a href="https://example.com/a?b=1&amp;c=2">link</a>'
+        self.assertEqual((1, [(0, 'https://example.com/a?b=1&c=2')]), get_html_links(html))
+
+    def test_text_without_links(self):
+        self.assertEqual((0, []), get_html_links(None))
+        self.assertEqual((0, []), get_html_links(''))
+        self.assertEqual((0, []), get_html_links('<div class="md"><p>no links &lt;a here</p></div>'))
+        self.assertEqual((0, []), get_html_links('<p><abbr>abbr</abbr> <area href="x"></p>'))
+
+    def test_hrefs_match_beautiful_soup(self):
+        html = ('<!-- SC_OFF --><div class="md"><p>see <a href="https://gfycat.com/KindlyElderlyCony">this</a></p>'
+                '<ul><li><a href="https://v.redd.it/abc" rel="nofollow">video</a></li><li><a>empty</a></li>'
+                '<li><a href="/r/pics">sub</a> <a href="https://e.com/&quot;q&quot;">q</a></li></ul></div>'
+                '<!-- SC_ON -->')
+        soup = BeautifulSoup(html, parse_only=SoupStrainer('a'), features='html.parser')
+        expected = [(i, x['href']) for i, x in enumerate(soup) if x.has_attr('href')]
+        self.assertEqual((len(soup), expected), get_html_links(html))
@@ -0,0 +1,112 @@
+import time
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from DownloaderForReddit.utils import injector
+from DownloaderForReddit.utils.reddit_rate_limiter import RedditRateLimiter, RequestPriority, ScheduledRequestor, \
+    request_priority, get_request_priority
+
+
+class TestRedditRateLimiter(TestCase):
+
+    def test_remaining_budget_is_spread_over_the_reset_window(self):
+        limiter = RedditRateLimiter()
+        limiter.update({'x-ratelimit-remaining': '10', 'x-ratelimit-reset': '20', 'x-ratelimit-used': '90'})
+        self.assertAlmostEqual(2, limiter.get_interval(time.monotonic()), places=1)
+
+    def test_default_pace_is_used_before_headers_are_received(self):
+        limiter = RedditRateLimiter(default_requests_per_minute=120)
+        self.assertEqual(0.5, limiter.get_interval(time.monotonic()))
+        limiter.update({'content-type': 'application/json'})
+        self.assertIsNone(limiter.remaining)
+
+    def test_spent_budget_holds_requests_until_reset(self):
+        limiter = RedditRateLimiter()
+        limiter.update({'x-ratelimit-remaining': '0', 'x-ratelimit-reset': '30'})
+        self.assertGreater(limiter.next_request_time, time.monotonic() + 29)
+
+    def test_back_off_holds_requests(self):
+        limiter = RedditRateLimiter()
+        limiter.back_off(15)
+        self.assertGreater(limiter.next_request_time, time.monotonic() + 14)
+        self.assertEqual(0, limiter.remaining)
+
+    def test_waiting_requests_are_granted_in_priority_order(self):
+        limiter = RedditRateLimiter(default_requests_per_minute=0)
+        limiter.next_request_time = time.monotonic() + 0.2
+        granted = []
+
+        def acquire(priority):
+            limiter.acquire(priority)
+            granted.append(priority)
+
+        threads = []
+        for priority in (RequestPriority.UPDATE, RequestPriority.EXTRACTION, RequestPriority.LISTING,
+                         RequestPriority.UPDATE):
+            thread = Thread(target=acquire, args=(priority,))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual([RequestPriority.LISTING, RequestPriority.EXTRACTION, RequestPriority.UPDATE,
+                          RequestPriority.UPDATE], granted)
+
+    def test_request_starts_are_paced(self):
+        limiter = RedditRateLimiter(default_requests_per_minute=1200)
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.acquire(RequestPriority.LISTING)
+        self.assertGreaterEqual(time.monotonic() - start, 0.14)
+
+    def test_thread_priority_is_nested(self):
+        self.assertEqual(RequestPriority.EXTRACTION, get_request_priority())
+        with request_priority(RequestPriority.UPDATE):
+            with request_priority(RequestPriority.INTERACTIVE):
+                self.assertEqual(RequestPriority.INTERACTIVE, get_request_priority())
+            self.assertEqual(RequestPriority.UPDATE, get_request_priority())
+        self.assertEqual(RequestPriority.EXTRACTION, get_request_priority())
+
+
+class TestScheduledRequestor(TestCase):
+
+    def setUp(self):
+        self.limiter = RedditRateLimiter(default_requests_per_minute=0)
+        self.limiter.back_off = MagicMock()
+        injector.reddit_rate_limiter = self.limiter
+        self.http = MagicMock()
+        self.http.headers = {}
+        self.requestor = ScheduledRequestor('test user agent', session=self.http)
+
+    def tearDown(self):
+        injector.reddit_rate_limiter = None
+
+    @staticmethod
+    def get_response(status_code, headers=None):
+        return MagicMock(status_code=status_code, headers=headers or {})
+
+    def test_too_many_requests_are_held_back_and_retried(self):
+        self.http.request.side_effect = [
+            self.get_response(429, {'retry-after': '3'}),
+            self.get_response(200, {'x-ratelimit-remaining': '50', 'x-ratelimit-reset': '100'}),
+        ]
+        response = self.requestor.request('GET', 'https://oauth.reddit.com/r/pics/new')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, self.http.request.call_count)
+        self.limiter.back_off.assert_called_once_with(3.0)
+        self.assertLessEqual(self.limiter.remaining, 50)
+
+    def test_retries_are_bounded(self):
+        self.http.request.return_value = self.get_response(429)
+        response = self.requestor.request('GET', 'https://oauth.reddit.com/r/pics/new')
+        self.assertEqual(429, response.status_code)
+        self.assertEqual(ScheduledRequestor.MAX_ATTEMPTS, self.http.request.call_count)
+
+    def test_token_requests_are_not_limited(self):
+        self.limiter.acquire = MagicMock()
+        self.http.request.return_value = self.get_response(200)
+        self.requestor.request('POST', 'https://www.reddit.com/api/v1/access_token')
+        self.limiter.acquire.assert_not_called()
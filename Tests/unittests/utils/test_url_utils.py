@@ -0,0 +1,28 @@
+from unittest import TestCase
+
+from DownloaderForReddit.utils import url_utils
+
+
+class TestUrlUtils(TestCase):
+
+    def test_canonical_url_normalizes_scheme_host_and_fragment(self):
+        self.assertEqual('https://imgur.com/a/AbCd', url_utils.canonical_url('HTTP://WWW.Imgur.com:80/a/AbCd/#comment'))
+        self.assertEqual('https://i.redd.it/xyz.jpg', url_utils.canonical_url(' https://i.redd.it/xyz.jpg '))
+
+    def test_canonical_url_keeps_path_case_query_and_custom_port(self):
+        self.assertEqual('https://example.com:8080/Path?b=2&a=1',
+                         url_utils.canonical_url('https://example.com:8080/Path?b=2&a=1'))
+
+    def test_canonical_url_returns_unparsable_urls_unchanged(self):
+        self.assertEqual('not a url', url_utils.canonical_url('not a url'))
+        self.assertIsNone(url_utils.canonical_url(None))
+
+    def test_url_hash_matches_for_canonically_equal_urls(self):
+        self.assertEqual(url_utils.url_hash('http://www.reddit.com/r/pics/'),
+                         url_utils.url_hash('https://reddit.com/r/pics'))
+        self.assertNotEqual(url_utils.url_hash('https://imgur.com/AbCd'), url_utils.url_hash('https://imgur.com/abcd'))
+
+    def test_url_hash_fits_in_a_signed_64_bit_integer(self):
+        value = url_utils.url_hash('https://i.redd.it/xyz.jpg')
+        self.assertTrue(-2 ** 63 <= value < 2 ** 63)
+        self.assertIsNone(url_utils.url_hash(None))
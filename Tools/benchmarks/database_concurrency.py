@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+"""
+Measures the concurrent read and write throughput of the application's database with the engine configuration used
+before write-ahead logging was enabled (rollback journal, a new connection for every session) and with the current
+configuration (WAL with tuned pragmas and a pooled connection per thread).
+
+Reader threads run the kind of paged queries that the database view makes while a single writer thread applies
+batches of status updates the way the persistence queue does during a download session.
+
+Usage (from the repository root):
+    python -m Tools.benchmarks.database_concurrency --posts 200000 --seconds 10
+    python -m Tools.benchmarks.database_concurrency --database /path/to/dfr.db
+
+A supplied database is copied before it is used, the original is never modified.
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import argparse
+from datetime import datetime
+
+import sqlalchemy
+from sqlalchemy import event, text
+from sqlalchemy.pool import NullPool
+
+from DownloaderForReddit.database.models import BaseModel
+from DownloaderForReddit.database.database_handler import POOL_PROFILES, DEFAULT_POOL_PROFILE, set_pragmas
+
+
+READ_QUERIES = (
+    'SELECT post.id, post.title, post.score FROM post WHERE post.significant_reddit_object_id = :ro '
+    'ORDER BY post.date_posted DESC LIMIT 50 OFFSET :offset',
+    'SELECT count(content.id) FROM content WHERE content.downloaded = 1 AND content.user_id = :ro',
+    'SELECT content.id, content.title, content.url FROM content WHERE content.post_id BETWEEN :low AND :low + 50',
+)
+WRITE_BATCH_SIZE = 50
+
+
+def build_database(path, post_count, contents_per_post=2, reddit_object_count=200):
+    engine = sqlalchemy.create_engine(f'sqlite:///{path}')
+    BaseModel.metadata.create_all(engine)
+    now = datetime.now()
+    with engine.begin() as connection:
+        connection.execute(
+            BaseModel.metadata.tables['reddit_object'].insert(),
+            [{'id': x, 'name': f'object_{x}', 'object_type': 'USER', 'significant': True}
+             for x in range(1, reddit_object_count + 1)]
+        )
+        posts = []
+        contents = []
+        for post_id in range(1, post_count + 1):
+            ro = random.randint(1, reddit_object_count)
+            posts.append({'id': post_id, 'title': f'post {post_id}', 'date_posted': now, 'score': post_id % 1000,
+                          'url': f'https://i.redd.it/{post_id}.jpg', 'extracted': True, 'retry_attempts': 0,
+                          'author_id': ro, 'significant_reddit_object_id': ro})
+            for index in range(contents_per_post):
+                contents.append({'title': f'content {post_id}-{index}', 'url': f'https://i.redd.it/{post_id}.jpg',
+                                 'downloaded': False, 'retry_attempts': 0, 'user_id': ro, 'post_id': post_id})
+        connection.execute(BaseModel.metadata.tables['post'].insert(), posts)
+        connection.execute(BaseModel.metadata.tables['content'].insert(), contents)
+    engine.dispose()
+
+
+def make_legacy_engine(path):
+    def set_rollback_journal(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA journal_mode=DELETE')
+
+    engine = sqlalchemy.create_engine(f'sqlite:///{path}', connect_args={'check_same_thread': False},
+                                      poolclass=NullPool)
+    event.listen(engine, 'connect', set_rollback_journal)
+    return engine
+
+
+def make_tuned_engine(path):
+    engine = sqlalchemy.create_engine(f'sqlite:///{path}', connect_args={'check_same_thread': False},
+                                      **POOL_PROFILES[DEFAULT_POOL_PROFILE])
+    event.listen(engine, 'connect', set_pragmas)
+    return engine
+
+
+def run_workload(engine, post_count, reader_count, seconds):
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    content_count = engine.execute(text('SELECT max(id) FROM content')).scalar()
+
+    def read():
+        done = 0
+        errors = 0
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text(random.choice(READ_QUERIES)),
+                                       ro=random.randint(1, 200), offset=random.randint(0, 20) * 50,
+                                       low=random.randint(1, post_count)).fetchall()
+                done += 1
+            except sqlalchemy.exc.OperationalError:
+                errors += 1
+        with lock:
+            counts['reads'] += done
+            counts['errors'] += errors
+
+    def write():
+        done = 0
+        errors = 0
+        while not stop.is_set():
+            ids = [random.randint(1, content_count) for _ in range(WRITE_BATCH_SIZE)]
+            try:
+                with engine.begin() as connection:
+                    for content_id in ids:
+                        connection.execute(
+                            text('UPDATE content SET downloaded = 1, retry_attempts = retry_attempts + 1 '
+                                 'WHERE id = :id'), id=content_id)
+                done += 1
+            except sqlalchemy.exc.OperationalError:
+                errors += 1
+        with lock:
+            counts['writes'] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=read) for _ in range(reader_count)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {key: value / seconds for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', help='An existing dfr.db to benchmark against.  A copy is used.')
+    parser.add_argument('--posts', type=int, default=200000, help='The number of posts to generate.')
+    parser.add_argument('--readers', type=int, default=4, help='The number of reader threads.')
+    parser.add_argument('--seconds', type=float, default=10, help='The length of each run in seconds.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        source = os.path.join(directory, 'source.db')
+        if args.database:
+            shutil.copyfile(args.database, source)
+        else:
+            print(f'Building a database with {args.posts} posts...')
+            build_database(source, args.posts)
+        post_count = sqlite3.connect(source).execute('SELECT max(id) FROM post').fetchone()[0] or 1
+
+        print(f'{"configuration":<16}{"reads/s":>12}{"write batches/s":>18}{"errors/s":>12}')
+        for name, make_engine in (('legacy', make_legacy_engine), ('wal + pooled', make_tuned_engine)):
+            path = os.path.join(directory, f'{name.replace(" ", "")}.db')
+            shutil.copyfile(source, path)
+            engine = make_engine(path)
+            result = run_workload(engine, post_count, args.readers, args.seconds)
+            engine.dispose()
+            print(f'{name:<16}{result["reads"]:>12.1f}{result["writes"]:>18.1f}{result["errors"]:>12.1f}')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
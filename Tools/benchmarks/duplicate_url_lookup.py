@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+"""
+Measures the latency of a single duplicate post url check against the size of the post table, comparing the previous
+unindexed url equality query with the indexed canonical url hash lookup.
+
+Usage (from the repository root):
+    python -m Tools.benchmarks.duplicate_url_lookup --sizes 10000 100000 1000000 --checks 200
+"""
+
+import time
+import random
+import argparse
+
+import sqlalchemy
+from sqlalchemy.orm import sessionmaker
+
+from DownloaderForReddit.database.models import BaseModel, Post
+from DownloaderForReddit.utils.url_utils import url_hash
+
+
+INSERT_BATCH_SIZE = 50000
+
+
+def make_url(number):
+    return f'https://i.imgur.com/{number:x}{random.getrandbits(24):06x}.jpg'
+
+
+def fill_posts(engine, start, stop):
+    table = BaseModel.metadata.tables['post']
+    urls = []
+    for first in range(start, stop, INSERT_BATCH_SIZE):
+        rows = []
+        for number in range(first, min(first + INSERT_BATCH_SIZE, stop)):
+            url = make_url(number)
+            urls.append(url)
+            rows.append({'id': number + 1, 'url': url, 'url_hash': url_hash(url)})
+        with engine.begin() as connection:
+            connection.execute(table.insert(), rows)
+    return urls
+
+
+def time_checks(check, urls):
+    start = time.perf_counter()
+    for url in urls:
+        check(url)
+    return (time.perf_counter() - start) / len(urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000],
+                        help='The post table sizes to measure at.')
+    parser.add_argument('--checks', type=int, default=200, help='The number of checks timed at each size.')
+    args = parser.parse_args()
+
+    engine = sqlalchemy.create_engine('sqlite:///:memory:')
+    BaseModel.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    def check_by_url(url):
+        return session.query(Post.id).filter(Post.url == url).first() is None
+
+    def check_by_hash(url):
+        return not Post.url_exists(url, session)
+
+    urls = []
+    print(f'{"posts":>10}{"url scan (ms)":>16}{"hash index (ms)":>18}')
+    for size in sorted(args.sizes):
+        urls.extend(fill_posts(engine, len(urls), size))
+        # half of the checked urls are duplicates and half are new, as during a normal extraction
+        sample = random.sample(urls, args.checks // 2) + [make_url(size + x) for x in range(args.checks // 2)]
+        random.shuffle(sample)
+        scan = time_checks(check_by_url, sample)
+        indexed = time_checks(check_by_hash, sample)
+        print(f'{size:>10}{scan * 1000:>16.3f}{indexed * 1000:>18.3f}')
+    session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""
+Measures the throughput of parsing Erome album pages from a number of extraction threads, with the parsing done in the
+threads themselves and with the parsing sent to the extraction process pool.  Page fetches are not included, so this
+shows how far the CPU bound part of extraction scales with the worker process count.
+
+Usage (from the repository root):
+    python -m Tools.benchmarks.extraction_pool --pages 400 --threads 8 --processes 1 4 8
+"""
+
+import os
+import time
+import random
+import string
+import argparse
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+from DownloaderForReddit.extractors.erome_extractor import locate_album
+from DownloaderForReddit.extractors.extraction_pool import ExtractionPool
+from DownloaderForReddit.utils import injector
+
+
+def random_id(length=8):
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
+
+
+def make_page(item_count):
+    items = []
+    for _ in range(item_count):
+        if random.random() < 0.3:
+            media = f'<div class="video"><video><source src="https://v1.erome.com/1/{random_id()}_720p.mp4"></video>'
+        else:
+            media = f'<div class="img"><img class="img-back" data-src="https://s1.erome.com/1/{random_id()}.jpg?v=1">'
+        items.append(f'<div class="media-group"><div class="media-title">{random_id(30)}</div>{media}</div></div>')
+    filler = ''.join(f'<div class="nav"><a href="/{random_id()}">{random_id(12)}</a></div>' for _ in range(150))
+    return f'<html><head><title>{random_id()}</title></head><body>{filler}{"".join(items)}</body></html>'
+
+
+def run(pool, pages, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda x: pool.run(locate_album, x), pages))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    pages = [make_page(random.randint(5, 60)) for _ in range(args.pages)]
+    settings = SimpleNamespace(extraction_process_count=0)
+    injector.settings_manager = settings
+    pool = ExtractionPool()
+
+    print(f'{args.pages} pages, {args.threads} extraction threads, {os.cpu_count()} cpus')
+    print(f'{"processes":<10}{"pages/s":>10}')
+    baseline = args.pages / run(pool, pages, args.threads)
+    print(f'{"off":<10}{baseline:>10.1f}')
+    for process_count in args.processes:
+        settings.extraction_process_count = process_count
+        run(pool, pages[:process_count * 2], args.threads)  # start the worker processes before timing
+        rate = args.pages / run(pool, pages, args.threads)
+        print(f'{process_count:<10}{rate:>10.1f}  ({rate / baseline:.1f}x)')
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
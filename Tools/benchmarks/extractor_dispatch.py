@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""
+Measures the time taken to select the extractor for a url, comparing the previous scan of every url key of every
+enabled extractor with the precompiled extractor index.  The url corpus is weighted towards the hosts that reddit
+submissions most often link to, with a share of supported video sites, direct links to other hosts, and links that no
+extractor supports.  Both methods are checked to select the same extractor for every url.
+
+Usage (from the repository root):
+    python -m Tools.benchmarks.extractor_dispatch --urls 20000 --repeat 3
+"""
+
+import time
+import random
+import string
+import argparse
+from types import SimpleNamespace
+
+from DownloaderForReddit.extractors import GenericVideoExtractor  # importing the package registers every extractor
+from DownloaderForReddit.extractors.base_extractor import BaseExtractor
+from DownloaderForReddit.extractors.extractor_index import ExtractorIndex
+from DownloaderForReddit.utils import injector
+
+
+def random_id(length=7):
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
+
+
+def make_corpus(count, video_sites):
+    templates = [
+        (30, lambda: f'https://i.redd.it/{random_id(13).lower()}.jpg'),
+        (12, lambda: f'https://v.redd.it/{random_id(13).lower()}'),
+        (10, lambda: f'https://www.reddit.com/gallery/{random_id(6).lower()}'),
+        (12, lambda: f'https://i.imgur.com/{random_id()}.jpg'),
+        (4, lambda: f'https://imgur.com/a/{random_id(5)}'),
+        (8, lambda: f'https://www.redgifs.com/watch/{random_id(12).lower()}'),
+        (2, lambda: f'https://gfycat.com/{random_id(12).lower()}'),
+        (6, lambda: f'https://www.youtube.com/watch?v={random_id(11)}'),
+        (4, lambda: f'https://{random.choice(video_sites)}.com/video/{random_id()}'),
+        (6, lambda: f'https://cdn{random.randint(1, 9)}.example-host.net/{random_id(10)}.'
+                    f'{random.choice(["jpg", "png", "mp4"])}'),
+        (6, lambda: f'https://news.example.org/{random_id(8)}/{random_id(12)}.html'),
+    ]
+    weights = [weight for weight, _ in templates]
+    makers = [maker for _, maker in templates]
+    return [random.choices(makers, weights)[0]() for _ in range(count)]
+
+
+def legacy_assign(url, extractor_dict):
+    for extractor in BaseExtractor.__subclasses__():
+        if extractor_dict[extractor.__name__]:
+            key = extractor.get_url_key()
+            if key is not None and any(x in url.lower() for x in key):
+                return extractor
+    return None
+
+
+def time_method(method, urls, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for url in urls:
+            method(url)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--urls', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    # a plain stand-in for the settings manager, whose settings are plain attributes
+    settings = SimpleNamespace(supported_videos_updated=0,
+                               extractor_dict={x.__name__: True for x in BaseExtractor.__subclasses__()})
+    injector.settings_manager = settings
+    video_sites = [x for x in GenericVideoExtractor.get_url_key() or () if x.isalnum()] or ['vimeo']
+    urls = make_corpus(args.urls, video_sites)
+
+    index = ExtractorIndex.get_index(settings)
+    mismatches = [x for x in urls if legacy_assign(x, settings.extractor_dict) is not index.match(x)]
+    if mismatches:
+        raise SystemExit(f'{len(mismatches)} urls were matched differently, for example: {mismatches[0]}')
+
+    build_start = time.perf_counter()
+    ExtractorIndex(index.extractors, [x.get_url_key() for x in index.extractors])
+    build_time = time.perf_counter() - build_start
+
+    legacy = time_method(lambda x: legacy_assign(x, settings.extractor_dict), urls, args.repeat)
+    indexed = time_method(lambda x: ExtractorIndex.get_index(settings).match(x), urls, args.repeat)
+    key_count = sum(len(x.get_url_key() or ()) for x in index.extractors)
+    print(f'{len(urls)} urls, {key_count} url keys, index built in {build_time * 1000:.1f}ms')
+    print(f'{"method":<10}{"per url (us)":>14}')
+    print(f'{"legacy":<10}{legacy * 1e6:>14.2f}')
+    print(f'{"indexed":<10}{indexed * 1e6:>14.2f}')
+    print(f'speed up: {legacy / indexed:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+"""
+Measures the time taken to find the links in the body_html of reddit comments, comparing the previous BeautifulSoup
+parse with the streaming anchor parser.  The corpus mixes comments without links, which are the large majority on a
+typical thread, with comments holding a few links and long self posts holding many.  Both methods are checked to find
+the same links for every text.
+
+Usage (from the repository root):
+    python -m Tools.benchmarks.html_links --texts 5000 --repeat 3
+"""
+
+import time
+import random
+import string
+import argparse
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from DownloaderForReddit.utils.html_links import get_html_links
+
+
+def random_words(count):
+    return ' '.join(''.join(random.choices(string.ascii_lowercase, k=random.randint(2, 9))) for _ in range(count))
+
+
+def make_paragraph(link_count):
+    parts = [random_words(random.randint(10, 40))]
+    for _ in range(link_count):
+        url = f'https://i.imgur.com/{"".join(random.choices(string.ascii_letters, k=7))}.jpg?a=1&amp;b=2'
+        parts.append(f'<a href="{url}" rel="nofollow">{random_words(2)}</a> {random_words(random.randint(3, 15))}')
+    return f'<p>{" ".join(parts)}</p>'
+
+
+def make_text(link_count, paragraph_count):
+    per_paragraph = [0] * paragraph_count
+    for _ in range(link_count):
+        per_paragraph[random.randrange(paragraph_count)] += 1
+    paragraphs = ''.join(make_paragraph(x) for x in per_paragraph)
+    return f'<!-- SC_OFF --><div class="md">{paragraphs}</div><!-- SC_ON -->'
+
+
+def make_corpus(count):
+    texts = []
+    for _ in range(count):
+        kind = random.random()
+        if kind < 0.8:
+            texts.append(make_text(0, random.randint(1, 3)))
+        elif kind < 0.98:
+            texts.append(make_text(random.randint(1, 4), random.randint(1, 3)))
+        else:
+            texts.append(make_text(random.randint(20, 150), random.randint(10, 40)))
+    return texts
+
+
+def legacy_links(html):
+    links = BeautifulSoup(html, parse_only=SoupStrainer('a'), features='html.parser')
+    return len(links), [(links.index(x), x['href']) for x in links if x.has_attr('href')]
+
+
+def time_method(method, texts, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            method(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--texts', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    texts = make_corpus(args.texts)
+    mismatches = [x for x in texts if legacy_links(x) != get_html_links(x)]
+    if mismatches:
+        raise SystemExit(f'{len(mismatches)} texts had different links, for example: {mismatches[0][:200]}')
+
+    legacy = time_method(legacy_links, texts, args.repeat)
+    streamed = time_method(get_html_links, texts, args.repeat)
+    link_count = sum(len(get_html_links(x)[1]) for x in texts)
+    print(f'{len(texts)} texts, {link_count} links')
+    print(f'{"method":<10}{"per text (us)":>15}')
+    print(f'{"legacy":<10}{legacy * 1e6:>15.2f}')
+    print(f'{"streamed":<10}{streamed * 1e6:>15.2f}')
+    print(f'speed up: {legacy / streamed:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Add url hash
+
+Revision ID: 3f9c1d2e7a64
+Revises: b838ef3372ca
+Create Date: 2026-10-18 10:12:41.503218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from DownloaderForReddit.utils.url_utils import url_hash
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c1d2e7a64'
+down_revision = 'b838ef3372ca'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    op.add_column('post', sa.Column('url_hash', sa.BigInteger(), nullable=True))
+    op.add_column('content', sa.Column('url_hash', sa.BigInteger(), nullable=True))
+    backfill_url_hash('post')
+    backfill_url_hash('content')
+    op.create_index(op.f('ix_post_url_hash'), 'post', ['url_hash'], unique=False)
+    op.create_index(op.f('ix_content_url_hash'), 'content', ['url_hash'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_content_url_hash'), table_name='content')
+    op.drop_index(op.f('ix_post_url_hash'), table_name='post')
+    with op.batch_alter_table('content') as batch_op:
+        batch_op.drop_column('url_hash')
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.drop_column('url_hash')
+
+
+def backfill_url_hash(table_name):
+    """
+    Hashes the url of every existing row of the table.  The hash is calculated in python because it is taken from the
+    canonical form of the url, which sqlite has no way to produce.
+    """
+    connection = op.get_bind()
+    table = sa.table(table_name, sa.column('id', sa.Integer), sa.column('url', sa.String),
+                     sa.column('url_hash', sa.BigInteger))
+    update = table.update().where(table.c.id == sa.bindparam('row_id')).values(url_hash=sa.bindparam('hash'))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select([table.c.id, table.c.url])
+            .where(sa.and_(table.c.id > last_id, table.c.url.isnot(None)))
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(update, [{'row_id': row_id, 'hash': url_hash(url)} for row_id, url in rows])
+        last_id = rows[-1][0]
@@ -0,0 +1,30 @@
+"""Add database identity
+
+Revision ID: 9a4e2b7c1d05
+Revises: 3f9c1d2e7a64
+Create Date: 2026-10-18 16:40:12.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4e2b7c1d05'
+down_revision = '3f9c1d2e7a64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the application creates any missing tables from the models before it migrates, so the table may already exist
+    if 'database_identity' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table('database_identity',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('uuid', sa.String(length=32), nullable=False),
+                    sa.PrimaryKeyConstraint('id'))
+
+
+def downgrade():
+    op.drop_table('database_identity')
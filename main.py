@@ -27,6 +27,7 @@ along with Downloader for Reddit.  If not, see <http://www.gnu.org/licenses/>.
 import ctypes
 import sys
 import logging
+import multiprocessing
 from PyQt5 import QtWidgets, QtCore
 
 from DownloaderForReddit.gui.downloader_for_reddit_gui import DownloaderForRedditGUI
@@ -60,6 +61,8 @@ def check_args(args):
 
 
 def main():
+    # lets the extraction worker processes start from the frozen executable
+    multiprocessing.freeze_support()
     check_args(sys.argv[1:])
 
     logger.make_logger()